@@ -5,8 +5,15 @@ from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import InMemoryTaskStore
 import uvicorn
+from mcp_server.Tools.Mechanics.indexes import bootstrap_database
+from mcp_server.Tools.Combat.mob_catalog import mob_catalog
 
 if __name__ == '__main__':
+    # 0. Make sure the Veritas indexes exist before serving traffic
+    bootstrap_database()
+    # Load the mob catalog once up front; later edits are hot reloaded
+    mob_catalog.reload()
+
     # 1. Request Handler
     request_handler = DefaultRequestHandler(
         agent_executor=AgentExecutor(),
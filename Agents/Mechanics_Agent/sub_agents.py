@@ -21,11 +21,16 @@ from mcp_server.Tools.Inventory.adk_tool import (
     unequip_item_tool,
     use_consumable_tool,
     transfer_item_tool,
+    transfer_batch_tool,
     sort_inventory_tool,
     get_equipment_stats_tool
 )
 from mcp_server.Tools.Combat.adk_tool import (
-    ensure_combat_session_tool
+    ensure_combat_session_tool,
+    apply_combat_action_tool,
+    resolve_combat_round_tool,
+    end_combat_session_tool,
+    get_combat_log_tool
 )
 from mcp_server.Tools.Item.adk_tool import (
     get_item_tool,
@@ -37,7 +42,7 @@ character_sub_agent = Agent(
     name="character_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to handle character interactions.",
-    instruction="You will take the users request and delegate it to the appropriate tools. Extract server_id and player_id (user_id) from the [CONTEXT] section of messages.",
+    instruction="You will take the users request and delegate it to the appropriate tools. Extract server_id and player_id (user_id) from the [CONTEXT] section of messages. Character tools return a short character_ref; pass that ref to other tools instead of the character record, and use the projection argument of get_character_tool to fetch only the part of the character you need.",
     tools=[create_character_tool, update_character_tool, get_character_tool, delete_character_tool],
 )
 
@@ -45,8 +50,8 @@ combat_sub_agent = Agent(
     name="combat_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to handle combat interactions.",
-    instruction="You will take the users request and delegate it to the appropriate tools. Extract server_id and player_id (user_id) from the [CONTEXT] section of messages.",
-    tools=[ensure_combat_session_tool],
+    instruction="You will take the users request and delegate it to the appropriate tools. Extract server_id and player_id (user_id) from the [CONTEXT] section of messages. Combat outcomes are computed by resolve_combat_round_tool; only narrate the events it returns.",
+    tools=[ensure_combat_session_tool, apply_combat_action_tool, resolve_combat_round_tool, end_combat_session_tool, get_combat_log_tool],
 )
 
 inventory_sub_agent = Agent(
@@ -54,7 +59,7 @@ inventory_sub_agent = Agent(
     model="gemini-1.5-flash",
     description="Agent designed to handle inventory interactions.",
     instruction="You will take the users request and delegate it to the appropriate tools. Extract server_id and player_id (user_id) from the [CONTEXT] section of messages.",
-    tools=[get_inventory_tool, add_item_tool, remove_item_tool, equip_item_tool, unequip_item_tool, use_consumable_tool, transfer_item_tool, sort_inventory_tool, get_equipment_stats_tool],
+    tools=[get_inventory_tool, add_item_tool, remove_item_tool, equip_item_tool, unequip_item_tool, use_consumable_tool, transfer_item_tool, transfer_batch_tool, sort_inventory_tool, get_equipment_stats_tool],
 )
 
 item_sub_agent = Agent(
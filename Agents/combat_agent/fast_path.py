@@ -0,0 +1,111 @@
+"""
+before_agent_callback hooks that answer combat sub-agents from the rule engine.
+
+ADK skips an agent's model call when its before_agent_callback returns Content.
+Each hook runs the deterministic rules from mcp_server.Tools.Combat.rules and
+returns the structured result when it is confident; otherwise it returns None
+and the Gemini sub-agent handles the request as before.
+"""
+import json
+import logging
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+# Ensure project root is on sys.path so `mcp_server` can be imported when ADK runs from Agents/
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from mcp_server.Tools.Combat.mob_catalog import mob_catalog
+from mcp_server.Tools.Combat.rules import parse_action, plan_mob_action
+from mcp_server.Tools.Combat.state import Combatant, CombatState, combat_state_store
+
+logger = logging.getLogger(__name__)
+
+# How many requests each hook answered locally vs handed to the LLM
+fast_path_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _request_text(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return "".join(part.text for part in content.parts if getattr(part, "text", None))
+
+
+def _user_request(text: str) -> str:
+    # Executors wrap the request in a [CONTEXT] block; only the request itself is parsed
+    return text.split("[USER REQUEST]", 1)[-1].strip()
+
+
+def _context_value(callback_context: CallbackContext, text: str, key: str) -> Optional[str]:
+    value = callback_context.state.get(key)
+    if value:
+        return str(value)
+    match = re.search(rf"{key}:\s*(\S+)", text)
+    return match.group(1) if match else None
+
+
+def _live_state(callback_context: CallbackContext, text: str) -> Optional[CombatState]:
+    # Only the in-memory state of this server's session is consulted; a miss falls through rather than hitting MongoDB
+    session_id = _context_value(callback_context, text, "session_id")
+    server_id = _context_value(callback_context, text, "server_id")
+    if not session_id or not server_id:
+        return None
+    return combat_state_store.get(session_id, server_id)
+
+
+def _live_combatants(callback_context: CallbackContext, text: str) -> Optional[List[Combatant]]:
+    state = _live_state(callback_context, text)
+    return list(state.combatants.values()) if state else None
+
+
+def _answer(callback_context: CallbackContext, hook: str, result: Dict[str, Any], confident: bool) -> Optional[types.Content]:
+    counts = fast_path_stats.setdefault(hook, {"local": 0, "llm": 0})
+    if not confident:
+        counts["llm"] += 1
+        logger.debug(f"{hook}: falling through to LLM ({result.get('reasons')})")
+        return None
+    counts["local"] += 1
+    callback_context.state["combat_fast_path"] = result
+    return types.Content(role="model", parts=[types.Part.from_text(text=json.dumps(result))])
+
+
+def action_parser_fast_path(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Parse the player's action locally when the rule engine is confident"""
+    text = _request_text(callback_context)
+    parsed = parse_action(_user_request(text), _live_combatants(callback_context, text))
+    return _answer(callback_context, "action_parser", parsed.to_dict(), parsed.confident)
+
+
+def target_selector_fast_path(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Resolve the target locally when it matches exactly one live combatant"""
+    text = _request_text(callback_context)
+    combatants = _live_combatants(callback_context, text)
+    if combatants is None:
+        return _answer(callback_context, "target_selector", {"reasons": ["no live session"]}, False)
+    parsed = parse_action(_user_request(text), combatants)
+    resolved = parsed.target in {c.combatant_id for c in combatants}
+    return _answer(callback_context, "target_selector", parsed.to_dict(), parsed.confident and resolved)
+
+
+def tactics_planner_fast_path(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Plan the acting mob's move from its tactics table"""
+    text = _request_text(callback_context)
+    state = _live_state(callback_context, text)
+    if state is None:
+        return _answer(callback_context, "tactics_planner", {"reasons": ["no live session"]}, False)
+    mob_id = _context_value(callback_context, text, "combatant_id") or state.current_turn
+    mob = state.combatants.get(mob_id) if mob_id else None
+    if mob is None or mob.side != "mob":
+        return _answer(callback_context, "tactics_planner", {"reasons": ["no mob is acting"]}, False)
+    # Tactics come from the request context, else from the mob's catalog entry
+    entry = mob_catalog.for_combatant(mob.combatant_id)
+    tactics = _context_value(callback_context, text, "tactics") or (entry.tactics if entry else None)
+    planned = plan_mob_action(mob, list(state.combatants.values()), tactics)
+    return _answer(callback_context, "tactics_planner", {"actor": mob.combatant_id, **planned.to_dict()}, planned.confident)
@@ -1,11 +1,14 @@
 from google.adk.agents import Agent
+from .fast_path import action_parser_fast_path, tactics_planner_fast_path, target_selector_fast_path
+from mcp_server.Tools.Combat.adk_tool import get_combat_log_tool
 
 action_parser_sub_agent = Agent(
     name="action_parser_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to parse actions for a roleplaying game.",
     instruction="You are an expert at parsing actions for a roleplaying game.",
-    tools=[]
+    tools=[],
+    before_agent_callback=action_parser_fast_path
 )
 
 tactics_planner_sub_agent = Agent(
@@ -13,7 +16,8 @@ tactics_planner_sub_agent = Agent(
     model="gemini-1.5-flash",
     description="Agent designed to plan tactics for a roleplaying game.",
     instruction="You are an expert at planning tactics for a roleplaying game.",
-    tools=[]
+    tools=[],
+    before_agent_callback=tactics_planner_fast_path
 )
 
 taget_selector_sub_agent = Agent(
@@ -21,21 +25,22 @@ taget_selector_sub_agent = Agent(
     model="gemini-1.5-flash",
     description="Agent designed to select targets for a roleplaying game.",
     instruction="You are an expert at selecting targets for a roleplaying game.",
-    tools=[]
+    tools=[],
+    before_agent_callback=target_selector_fast_path
 )
 
 narrative_writer_sub_agent = Agent(
     name="narrative_writer_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to write narratives for a roleplaying game.",
-    instruction="You are an expert at writing narratives for a roleplaying game.",
-    tools=[]
+    instruction="You are an expert at writing narratives for a roleplaying game. Use get_combat_log_tool to read the latest events of the fight and narrate only what they record.",
+    tools=[get_combat_log_tool]
 )
 
 summary_writer_sub_agent = Agent(
     name="summary_writer_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to write summaries for a roleplaying game.",
-    instruction="You are an expert at writing summaries for a roleplaying game.",
-    tools=[]
+    instruction="You are an expert at writing summaries for a roleplaying game. Use get_combat_log_tool to read the fight's recent events instead of asking for the session record.",
+    tools=[get_combat_log_tool]
 )
\ No newline at end of file
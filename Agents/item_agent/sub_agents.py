@@ -12,9 +12,14 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 from mcp_server.Tools.Item import (
     create_item_tool,
+    create_items_tool,
     read_item_tool,
     update_item_tool,
-    delete_item_tool
+    delete_item_tool,
+    search_items_tool,
+    find_items_tool,
+    craftable_items_tool,
+    get_recipe_tool
 )
 query_normalizer_sub_agent = Agent(
     name="query_normalizer_sub_agent",
@@ -28,23 +33,23 @@ modifier_sub_agent = Agent(
     model="gemini-1.5-flash",
     description="Agent designed to modify items for a roleplaying game.",
     instruction="You are an expert at modifying items for a roleplaying game.",
-    tools=[create_item_tool, update_item_tool, delete_item_tool]
+    tools=[create_item_tool, create_items_tool, update_item_tool, delete_item_tool]
 )
 
 search_sub_agent = Agent(
     name="search_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to search for items for a roleplaying game.",
-    instruction="You are an expert at searching for items for a roleplaying game. You can get any information of an item the user asks for.",
-    tools=[read_item_tool]
+    instruction="You are an expert at searching for items for a roleplaying game. You can get any information of an item the user asks for. Use search_items_tool for partial or misspelled names, find_items_tool when the user describes an item by what it is or does, and read_item_tool once you know the item.",
+    tools=[search_items_tool, find_items_tool, read_item_tool]
 )
 
 tool_tip_sub_agent = Agent(
     name="tool_tip_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to provide tool tips for a roleplaying game.",
-    instruction="You are an expert at providing tool tips for a roleplaying game.",
-    tools=[read_item_tool]
+    instruction="You are an expert at providing tool tips for a roleplaying game. Use search_items_tool to find the item the user means, even from a partial or misspelled name.",
+    tools=[search_items_tool, read_item_tool]
 )
 
 flavor_writer_sub_agent = Agent(
@@ -59,6 +64,6 @@ recipe_suggestion_sub_agent = Agent(
     name="recipe_suggestion_sub_agent",
     model="gemini-1.5-flash",
     description="Agent designed to suggest recipes for a roleplaying game.",
-    instruction="You are an expert at suggesting recipes for a roleplaying game.",
-    tools=[read_item_tool]
+    instruction="You are an expert at suggesting recipes for a roleplaying game. Call craftable_items_tool to find what the character can craft and get_recipe_tool for an item's ingredients, then explain the result; do not work out recipes yourself.",
+    tools=[craftable_items_tool, get_recipe_tool, read_item_tool]
 )
\ No newline at end of file
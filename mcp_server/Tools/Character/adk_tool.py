@@ -34,39 +34,53 @@ async def create_character_tool(
     )
 
 
-def get_character_tool(
+async def get_character_tool(
     player_id: str,
     server_id: str,
     character_name: Optional[str],
-    character_id: Optional[str]
+    character_id: Optional[str],
+    projection: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Retrieve a character record by name or ID."""
-    return get_character_function(
+    """Retrieve a character record by name or ID.
+
+    Set projection to 'stats', 'combat', 'inventory' or 'profile' to fetch only that part.
+    """
+    return await get_character_function(
         player_id=player_id,
         server_id=server_id,
         character_name=character_name,
-        character_id=character_id
+        character_id=character_id,
+        projection=projection
     )
 
 
-def update_character_tool(
+async def update_character_tool(
+    server_id: str,
+    player_id: str,
     request: Dict[str, Any],
-    character_data: Dict[str, Any]
+    character_ref: str
 ) -> Dict[str, Any]:
-    """Update character fields using structured request dict."""
-    return update_character_function(
+    """Update character fields using structured request dict.
+
+    Use {"field": ..., "value": ...} for one field, or
+    {"updates": [{"field": ..., "value": ...}, ...]} to change several fields in one write.
+    character_ref is the short reference returned by get_character_tool or create_character_tool.
+    """
+    return await update_character_function(
+        server_id=server_id,
+        player_id=player_id,
         request=request,
-        character_data=character_data
+        character_ref=character_ref
     )
 
 
-def delete_character_tool(
+async def delete_character_tool(
     player_id: str,
     server_id: str,
     character_name: Optional[str],
 ) -> Dict[str, Any]:
     """Delete a character record by name or ID."""
-    return delete_character_function(
+    return await delete_character_function(
         player_id=player_id,
         server_id=server_id,
         character_name=character_name
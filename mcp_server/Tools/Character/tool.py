@@ -1,15 +1,85 @@
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
-import sys
-import os
-from pymongo import MongoClient
+from typing import Dict, Any, List, Optional, Tuple
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import logging
 from config.logging_config import setup_logging
+from ..Mechanics.connection import mongo_registry
+from ..Mechanics.character_cache import character_cache
+from ..Mechanics.indexes import CHARACTER_NAME_INDEX, CHARACTER_ACTIVE_UNIQUE_INDEX, ensure_collection_indexes
+from ..Mechanics.projections import resolve_projection, apply_projection
+from ..Mechanics.handles import encode_character_ref, decode_character_ref, character_ref_filter
+from ..Mechanics.derived_stats import DERIVED_STATS_STAGE, compute_derived_stats, touches_derived_sources
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Map field names to their MongoDB paths
+FIELD_MAPPINGS = {
+    # Character basic info
+    "first_name": "character.first_name",
+    "last_name": "character.last_name", 
+    "characters_name": "character.characters_name",
+    "character_name": "character.characters_name",
+    "name": "character.characters_name",
+    "class_name": "character.class_name",
+    "class": "character.class_name",
+    "cursor_color": "character.cursor_color",
+    "height": "character.height",
+    "physique": "character.physique",
+    "age": "character.age",
+    "bio": "character.bio",
+    "level": "character.level",
+    "experience": "character.experience",
+    "exp": "character.experience",
+    "experience_to_next_level": "character.experience_to_next_level",
+    
+    # Stats
+    "hp": "stats.hp",
+    "str": "stats.str",
+    "strength": "stats.str",
+    "def": "stats.def",
+    "defense": "stats.def",
+    "spe": "stats.spe",
+    "speed": "stats.spe",
+    "dex": "stats.dex",
+    "dexterity": "stats.dex",
+    "cha": "stats.cha",
+    "charisma": "stats.cha",
+    "points_to_distribute": "stats.points_to_distribute",
+    
+    # Combat stats
+    "damage": "combat.damage",
+    "combat_defense": "combat.defense",
+    "current_hp": "combat.current_hp",
+    "status_ailment": "combat.status_ailment",
+    "battle_status": "combat.battle_status",
+    
+    # Currency
+    "currency": "inventory.currency",
+    "money": "inventory.currency",
+    "gold": "inventory.currency",
+    
+    # Special handling for birthday
+    "birthday": "character.birthday.date",
+    "birth_date": "character.birthday.date",
+    
+    # Player status
+    "active": "player.active"
+}
+
+AVAILABLE_FIELDS = ", ".join(sorted(FIELD_MAPPINGS.keys()))
+
+# Validate value type for specific fields
+NUMERIC_FIELDS = frozenset([
+    "character.age", "character.level", "character.experience", "character.experience_to_next_level",
+    "stats.hp", "stats.str", "stats.def", "stats.spe", "stats.dex", "stats.cha", "stats.points_to_distribute",
+    "combat.damage", "combat.defense", "combat.current_hp", "inventory.currency"
+])
+
+BOOLEAN_FIELDS = frozenset(["combat.battle_status", "player.active"])
+
 async def create_character_tool(
     server_id: str,
     player_id: str, 
@@ -39,7 +109,6 @@ async def create_character_tool(
     Returns:
     - Dict with success status and character ID or error message
     """
-    client = None
     try:
         # Validate UUIDs
         try:
@@ -51,22 +120,9 @@ async def create_character_tool(
                 "error": f"Invalid UUID format: {str(e)}"
             }
         
-        # Create database connection
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        characters_collection = db.characters
-        
-        # Check if character name already exists on this server
-        existing_character = characters_collection.find_one({
-            "characters_name": character_name, 
-            "player.server_id": server_id
-        })
-        
-        if existing_character:
-            return {
-                "success": False,
-                "error": f"Character name '{character_name}' already exists on this server"
-            }
+        characters_collection = mongo_registry.get_collection("characters")
+        # The unique indexes below decide name and active-character conflicts; make sure they exist
+        await mongo_registry.run(ensure_collection_indexes, "characters")
         
         # Create character document following the specified schema
         character_doc = {
@@ -135,22 +191,42 @@ async def create_character_tool(
             },
             "created_at": datetime.utcnow()
         }
-        has_active = _has_active_character_assistant_function(player_id, server_id)
-        if has_active:
+        character_doc["derived"] = compute_derived_stats(character_doc)
+        # Insert character into MongoDB. The unique (server, name) index rejects taken names
+        # and the partial unique index on active characters rejects a second active character,
+        # so the insert itself decides both without any prior reads.
+        try:
+            result = await mongo_registry.run(characters_collection.insert_one, character_doc)
+        except DuplicateKeyError as e:
+            if _duplicate_index(e) != CHARACTER_ACTIVE_UNIQUE_INDEX:
+                return {
+                    "success": False,
+                    "error": f"Character name '{character_name}' already exists on this server"
+                }
+            # Player already has an active character: store this one inactive
+            character_doc.pop("_id", None)
             character_doc["player"]["active"] = False
-        # Insert character into MongoDB
-        result = characters_collection.insert_one(character_doc)
+            try:
+                result = await mongo_registry.run(characters_collection.insert_one, character_doc)
+            except DuplicateKeyError:
+                return {
+                    "success": False,
+                    "error": f"Character name '{character_name}' already exists on this server"
+                }
         character_id = str(result.inserted_id)
+        character_cache.invalidate(server_id, player_id)
         
         return {
             "success": True,
             "message": f"Character '{character_name}' created successfully",
             "character_id": character_id,
+            "character_ref": encode_character_ref(character_id),
             "character_name": character_name,
             "class_name": character_class,
             "level": 1,
             "server_id": server_id,
-            "player_id": player_id
+            "player_id": player_id,
+            "active": character_doc["player"]["active"]
         }
         
     except Exception as e:
@@ -158,15 +234,13 @@ async def create_character_tool(
             "success": False,
             "error": f"Failed to create character: {str(e)}"
         }
-    finally:
-        if client:
-            client.close()
 
 async def get_character_tool(
     player_id: str,
     server_id: str,
     character_name: Optional[str],
-    character_id: Optional[str]
+    character_id: Optional[str],
+    projection: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Retrieve a character record from MongoDB.
@@ -177,12 +251,15 @@ async def get_character_tool(
     
     Optional fields (at least one must be provided):
     - character_name: Name of the character to retrieve
-    - character_id: MongoDB ObjectId of the character
+    - character_id: character_ref (or MongoDB ObjectId) of the character
+    
+    Optional fields:
+    - projection: Only return part of the character: 'stats', 'combat', 'inventory',
+      'profile' or 'full' (default)
     
     Returns:
     - Dict with success status and character data or error message
     """
-    client = None
     try:
         # Validate UUIDs
         try:
@@ -201,10 +278,37 @@ async def get_character_tool(
                 "error": "Either character_name or character_id must be provided"
             }
         
-        # Create database connection
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        characters_collection = db.characters
+        try:
+            fields = resolve_projection(projection)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        
+        # Accept character_refs as well as raw ObjectIds; the lookup below is scoped to the player either way
+        if character_id:
+            try:
+                character_id = character_id if ObjectId.is_valid(character_id) else str(decode_character_ref(character_id))
+            except ValueError:
+                return {
+                    "success": False,
+                    "error": "Invalid character_id format"
+                }
+        
+        # Serve repeated reads from the character cache
+        cache_key = character_cache.key(server_id, player_id, character_name, character_id)
+        character = character_cache.get(cache_key)
+        if character:
+            character = apply_projection(character, fields)
+            character["_id"] = str(character["_id"])
+            return {
+                "success": True,
+                "character_ref": encode_character_ref(character["_id"]),
+                "character": character
+            }
+        
+        characters_collection = mongo_registry.get_collection("characters")
         
         # Build query based on provided parameters
         query = {
@@ -213,18 +317,12 @@ async def get_character_tool(
         }
         
         if character_id:
-            try:
-                query["_id"] = ObjectId(character_id)
-            except Exception:
-                return {
-                    "success": False,
-                    "error": "Invalid character_id format"
-                }
+            query["_id"] = ObjectId(character_id)
         elif character_name:
             query["character.characters_name"] = character_name
         
-        # Find the character
-        character = characters_collection.find_one(query)
+        # Find the character, letting MongoDB trim the document when a projection is requested
+        character = await mongo_registry.run(characters_collection.find_one, query, fields)
         
         if not character:
             identifier = character_id if character_id else character_name
@@ -232,12 +330,16 @@ async def get_character_tool(
                 "success": False,
                 "error": f"Character not found: {identifier}"
             }
+        # Only full documents are cached
+        if not fields:
+            character_cache.set(cache_key, character)
         
         # Convert ObjectId to string for JSON serialization
         character["_id"] = str(character["_id"])
         
         return {
             "success": True,
+            "character_ref": encode_character_ref(character["_id"]),
             "character": character
         }
         
@@ -246,162 +348,106 @@ async def get_character_tool(
             "success": False,
             "error": f"Failed to retrieve character: {str(e)}"
         }
-    finally:
-        if client:
-            client.close()
 
 
 async def update_character_tool(
+    server_id: str,
+    player_id: str,
     request: dict,
-    character_data: Dict[str, Any]
+    character_ref: str
 ) -> Dict[str, Any]:
     """
     Update a character record based on structured request input.
     
     Required fields:
-    - request: Dictionary containing field and value to update
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player that owns the character
+    - request: Dictionary containing the field(s) and value(s) to update, either a single pair
       Example: {"field": "age", "value": 25} or {"field": "character.first_name", "value": "John"}
-    - character_data: Character record dictionary (from get_character_tool)
+      or a batch applied in one atomic write
+      Example: {"updates": [{"field": "level", "value": 5}, {"field": "exp", "value": 0}]}
+    - character_ref: Character reference returned by get_character_tool or create_character_tool
     
     Returns:
-    - Dict with success status and update details or error message
+    - Dict with success status, the updated values and the character_ref, or error message
     """
-    client = None
     try:
-        # Validate character data
-        if not character_data or "_id" not in character_data:
+        # Validate character reference; only the player's own character on this server can match
+        try:
+            character_filter = character_ref_filter(character_ref, server_id, player_id)
+        except ValueError:
             return {
                 "success": False,
-                "error": "Invalid character data provided"
+                "error": "Invalid character_ref provided"
             }
         
         # Validate request structure
-        if not isinstance(request, dict) or "field" not in request or "value" not in request:
+        pairs = _update_pairs(request)
+        if not pairs:
             return {
                 "success": False,
-                "error": "Request must be a dictionary with 'field' and 'value' keys"
+                "error": "Request must be a dictionary with 'field' and 'value' keys, or 'updates' with a list of them"
             }
         
-        character_obj_id = ObjectId(character_data["_id"])
-        field = request["field"]
-        value = request["value"]
-        
-        # Map field names to their MongoDB paths
-        field_mappings = {
-            # Character basic info
-            "first_name": "character.first_name",
-            "last_name": "character.last_name", 
-            "characters_name": "character.characters_name",
-            "character_name": "character.characters_name",
-            "name": "character.characters_name",
-            "class_name": "character.class_name",
-            "class": "character.class_name",
-            "cursor_color": "character.cursor_color",
-            "height": "character.height",
-            "physique": "character.physique",
-            "age": "character.age",
-            "bio": "character.bio",
-            "level": "character.level",
-            "experience": "character.experience",
-            "exp": "character.experience",
-            "experience_to_next_level": "character.experience_to_next_level",
-            
-            # Stats
-            "hp": "stats.hp",
-            "str": "stats.str",
-            "strength": "stats.str",
-            "def": "stats.def",
-            "defense": "stats.def",
-            "spe": "stats.spe",
-            "speed": "stats.spe",
-            "dex": "stats.dex",
-            "dexterity": "stats.dex",
-            "cha": "stats.cha",
-            "charisma": "stats.cha",
-            "points_to_distribute": "stats.points_to_distribute",
-            
-            # Combat stats
-            "damage": "combat.damage",
-            "combat_defense": "combat.defense",
-            "current_hp": "combat.current_hp",
-            "status_ailment": "combat.status_ailment",
-            "battle_status": "combat.battle_status",
-            
-            # Currency
-            "currency": "inventory.currency",
-            "money": "inventory.currency",
-            "gold": "inventory.currency",
-            
-            # Special handling for birthday
-            "birthday": "character.birthday.date",
-            "birth_date": "character.birthday.date",
-            
-            # Player status
-            "active": "player.active"
-        }
-        
-        # Check if field exists in mapping or is already a valid MongoDB path
-        if field in field_mappings:
-            mongo_field = field_mappings[field]
-        elif "." in field:
-            # Assume it's already a valid MongoDB path (e.g., "character.first_name")
-            mongo_field = field
-        else:
-            return {
-                "success": False,
-                "error": f"Unknown field: {field}. Available fields include: {', '.join(sorted(field_mappings.keys()))}"
-            }
-        
-        # Validate value type for specific fields
-        numeric_fields = [
-            "character.age", "character.level", "character.experience", "character.experience_to_next_level",
-            "stats.hp", "stats.str", "stats.def", "stats.spe", "stats.dex", "stats.cha", "stats.points_to_distribute",
-            "combat.damage", "combat.defense", "combat.current_hp", "inventory.currency"
-        ]
-        
-        boolean_fields = ["combat.battle_status", "player.active"]
-        
-        if mongo_field in numeric_fields:
+        # Resolve every field against the precompiled mappings before touching the database
+        updates = {}
+        for field, value in pairs:
+            mongo_field, value, error = _resolve_update(field, value)
+            if error:
+                return {
+                    "success": False,
+                    "error": error
+                }
+            updates[mongo_field] = value
+        
+        # Changing base or combat stats also recomputes the stored derived stats in the same write
+        update_spec = {"$set": updates}
+        if touches_derived_sources(list(updates)):
+            update_spec = [{"$set": {field: {"$literal": value} for field, value in updates.items()}}, DERIVED_STATS_STAGE]
+        
+        # Apply all updates and fetch the post-image in a single round trip
+        characters_collection = mongo_registry.get_collection("characters")
+        async def apply_update():
+            return await mongo_registry.run(
+                characters_collection.find_one_and_update,
+                character_filter,
+                update_spec,
+                return_document=ReturnDocument.AFTER
+            )
+        try:
+            updated_character = await apply_update()
+        except DuplicateKeyError as e:
+            if _duplicate_index(e) != CHARACTER_ACTIVE_UNIQUE_INDEX:
+                return {
+                    "success": False,
+                    "error": "Another character on this server already has that name"
+                }
+            # Making this character active: deactivate the player's current one, then retry once
+            await _deactivate_characters(server_id, player_id, character_filter["_id"])
             try:
-                value = int(value)
-            except (ValueError, TypeError):
+                updated_character = await apply_update()
+            except DuplicateKeyError:
                 return {
                     "success": False,
-                    "error": f"Field '{field}' requires a numeric value, got: {value}"
+                    "error": "Player already has an active character"
                 }
-        elif mongo_field in boolean_fields:
-            if isinstance(value, str):
-                value = value.lower() in ["true", "1", "yes", "on"]
-            else:
-                value = bool(value)
-        
-        updates = {mongo_field: value}
-        
-        # Perform the update
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        characters_collection = db.characters
-        
-        result = characters_collection.update_one(
-            {"_id": character_obj_id},
-            {"$set": updates}
-        )
         
-        if result.modified_count == 0:
+        if not updated_character:
             return {
                 "success": False,
-                "error": "No changes were made to the character"
+                "error": "Character not found"
             }
         
-        # Get the updated character to return current state
-        updated_character = characters_collection.find_one({"_id": character_obj_id})
+        character_cache.refresh(updated_character)
         updated_character["_id"] = str(updated_character["_id"])
         
+        # Only echo the touched fields back; the full record stays server side
         return {
             "success": True,
             "message": f"Character updated successfully",
+            "character_ref": character_ref,
             "updates_made": updates,
-            "character": updated_character
+            "character": apply_projection(updated_character, {**{field: 1 for field in updates}, "character.characters_name": 1})
         }
         
     except Exception as e:
@@ -409,9 +455,6 @@ async def update_character_tool(
             "success": False,
             "error": f"Failed to update character: {str(e)}"
         }
-    finally:
-        if client:
-            client.close()
 
 
 async def delete_character_tool(
@@ -432,7 +475,6 @@ async def delete_character_tool(
     Returns:
     - Dict with success status and deletion details or error message
     """
-    client = None
     try:
         # Validate UUIDs
         try:
@@ -452,10 +494,7 @@ async def delete_character_tool(
                 "error": "Either character_name or character_id must be provided"
             }
         
-        # Create database connection
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        characters_collection = db.characters
+        characters_collection = mongo_registry.get_collection("characters")
         
         # Build query based on provided parameters
         query = {
@@ -465,8 +504,9 @@ async def delete_character_tool(
         }
                 
         # Delete the character
-        result = characters_collection.delete_one(query)
+        result = await mongo_registry.run(characters_collection.delete_one, query)
         logger.info(f"result: {result}")
+        character_cache.invalidate(server_id, player_id, character_name=character_name)
         if result.deleted_count == 0:
             logger.info("Failed to delete character")
             return {
@@ -486,35 +526,66 @@ async def delete_character_tool(
             "success": False,
             "error": f"Failed to delete character: {str(e)}"
         }
-    finally:
-        if client:
-            client.close()
 
 
-async def _has_active_character_assistant_function(player_id: str, server_id: str):
-    # Call the database to find if a players player_id and server_id have a character where active is true
-    client = None
-    try:
-        # Create database connection
-        client = MongoClient(MONGO_URI) 
-        db = client[DB_NAME]
-        characters_collection = db.characters
-        
-        # Check if player has an active character on the server
-        existing_character = characters_collection.find_one({
-            "player.player_id": player_id,
-            "player.server_id": server_id,
-            "active": True
-        })
-        
-        if existing_character:
-            return True
-        
-    except Exception as e:
-        return False
-    finally:
-        if client:
-            client.close()
+def _update_pairs(request: Any) -> List[Tuple[str, Any]]:
+    """Normalize a single {"field", "value"} request or an {"updates": [...]} batch into pairs"""
+    if not isinstance(request, dict):
+        return []
+    if "updates" in request:
+        updates = request["updates"]
+        if isinstance(updates, dict):
+            return list(updates.items())
+        if isinstance(updates, list) and all(isinstance(u, dict) and "field" in u and "value" in u for u in updates):
+            return [(u["field"], u["value"]) for u in updates]
+        return []
+    if "field" in request and "value" in request:
+        return [(request["field"], request["value"])]
+    return []
+
+
+def _resolve_update(field: str, value: Any) -> Tuple[Optional[str], Any, Optional[str]]:
+    """Map a field to its MongoDB path and coerce its value; returns (path, value, error)"""
+    # Check if field exists in mapping or is already a valid MongoDB path
+    if field in FIELD_MAPPINGS:
+        mongo_field = FIELD_MAPPINGS[field]
+    elif "." in field:
+        # Assume it's already a valid MongoDB path (e.g., "character.first_name")
+        mongo_field = field
+    else:
+        return None, value, f"Unknown field: {field}. Available fields include: {AVAILABLE_FIELDS}"
+    
+    if mongo_field in NUMERIC_FIELDS:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            return None, value, f"Field '{field}' requires a numeric value, got: {value}"
+    elif mongo_field in BOOLEAN_FIELDS:
+        if isinstance(value, str):
+            value = value.lower() in ["true", "1", "yes", "on"]
+        else:
+            value = bool(value)
+    return mongo_field, value, None
+
+
+async def _deactivate_characters(server_id: str, player_id: str, keep_id: ObjectId) -> None:
+    """Mark the player's active characters other than keep_id inactive and drop their cached copies"""
+    characters_collection = mongo_registry.get_collection("characters")
+    active = {"player.server_id": server_id, "player.player_id": player_id, "player.active": True, "_id": {"$ne": keep_id}}
+    ids = [doc["_id"] for doc in await mongo_registry.run(lambda: list(characters_collection.find(active, {"_id": 1})))]
+    if not ids:
+        return
+    await mongo_registry.run(characters_collection.update_many, {"_id": {"$in": ids}}, {"$set": {"player.active": False}})
+    character_cache.invalidate(server_id, player_id)
+
+
+def _duplicate_index(error: DuplicateKeyError) -> Optional[str]:
+    """Return the name of the unique index that rejected a write, if it can be determined"""
+    message = (error.details or {}).get("errmsg", "") or str(error)
+    for index_name in (CHARACTER_ACTIVE_UNIQUE_INDEX, CHARACTER_NAME_INDEX):
+        if f"index: {index_name}" in message:
+            return index_name
+    return None
 
 # Export the synchronous functions
 __all__ = ["create_character_tool", "get_character_tool", "update_character_tool", "delete_character_tool"]
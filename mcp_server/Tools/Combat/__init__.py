@@ -1,5 +1,9 @@
-from .adk_tool import ensure_combat_session_tool
+from .adk_tool import ensure_combat_session_tool, apply_combat_action_tool, resolve_combat_round_tool, end_combat_session_tool, get_combat_log_tool
 
 TOOLS = [
     ensure_combat_session_tool,
+    apply_combat_action_tool,
+    resolve_combat_round_tool,
+    end_combat_session_tool,
+    get_combat_log_tool,
 ]
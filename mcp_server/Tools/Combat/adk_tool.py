@@ -6,6 +6,10 @@ This module provides simple callable functions for ADK agents.
 from typing import Dict, Any, Optional
 from .tool import (
     ensure_combat_session_function,
+    apply_combat_action_function,
+    resolve_combat_round_function,
+    end_combat_session_function,
+    get_combat_log_function,
 )
 
 async def ensure_combat_session_tool(
@@ -20,4 +24,50 @@ async def ensure_combat_session_tool(
         mob_name=mob_name,
     )
 
-__all__ = ["ensure_combat_session_tool"]
+async def apply_combat_action_tool(
+    server_id: str,
+    session_id: str,
+    action: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Apply a combat action (damage, heal, add_status, remove_status, end_turn) to a live session."""
+    return await apply_combat_action_function(
+        server_id=server_id,
+        session_id=session_id,
+        action=action,
+    )
+
+async def resolve_combat_round_tool(
+    server_id: str,
+    session_id: str,
+    targets: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Resolve a full round of attacks; narrate the returned events instead of inventing outcomes."""
+    return await resolve_combat_round_function(
+        server_id=server_id,
+        session_id=session_id,
+        targets=targets,
+    )
+
+async def end_combat_session_tool(
+    server_id: str,
+    session_id: str,
+) -> Dict[str, Any]:
+    """End a combat session and persist its final state."""
+    return await end_combat_session_function(
+        server_id=server_id,
+        session_id=session_id,
+    )
+
+async def get_combat_log_tool(
+    server_id: str,
+    session_id: str,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """Read the last events of a combat session (oldest first) for summaries and narration."""
+    return await get_combat_log_function(
+        server_id=server_id,
+        session_id=session_id,
+        limit=limit,
+    )
+
+__all__ = ["ensure_combat_session_tool", "apply_combat_action_tool", "resolve_combat_round_tool", "end_combat_session_tool", "get_combat_log_tool"]
@@ -0,0 +1,152 @@
+"""
+Vectorized combat math.
+
+A round is resolved for every combatant at once: each participant's stats live in
+parallel NumPy arrays, every living combatant attacks one living enemy, and all
+hits are computed against the HP at the start of the round (simultaneous
+resolution). Damage is summed per target with np.bincount, so a raid-sized round
+costs a handful of array operations rather than a Python loop per attack.
+
+The LLM sub-agents only narrate the summary this produces.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Tuning constants for the combat formula
+BASE_HIT_CHANCE = 0.8
+HIT_CHANCE_PER_SPEED = 0.03
+MIN_HIT_CHANCE = 0.3
+MAX_HIT_CHANCE = 0.97
+DEFENSE_MITIGATION = 0.5
+DAMAGE_VARIANCE = 0.15
+CRIT_CHANCE = 0.05
+CRIT_MULTIPLIER = 1.5
+
+SIDE_PLAYER = 0
+SIDE_MOB = 1
+SIDE_CODES = {"player": SIDE_PLAYER, "mob": SIDE_MOB}
+
+# Target value meaning "pick a random living enemy"
+AUTO_TARGET = -1
+
+
+@dataclass
+class CombatArrays:
+    """Structure-of-arrays view of a fight's combatants"""
+    ids: List[str]
+    hp: np.ndarray
+    max_hp: np.ndarray
+    damage: np.ndarray
+    defense: np.ndarray
+    speed: np.ndarray
+    side: np.ndarray
+
+    @classmethod
+    def from_combatants(cls, combatants: Sequence[Any]) -> "CombatArrays":
+        return cls(
+            ids=[c.combatant_id for c in combatants],
+            hp=np.fromiter((c.hp for c in combatants), dtype=np.int64, count=len(combatants)),
+            max_hp=np.fromiter((c.max_hp for c in combatants), dtype=np.int64, count=len(combatants)),
+            damage=np.fromiter((c.damage for c in combatants), dtype=np.float64, count=len(combatants)),
+            defense=np.fromiter((c.defense for c in combatants), dtype=np.float64, count=len(combatants)),
+            speed=np.fromiter((c.speed for c in combatants), dtype=np.float64, count=len(combatants)),
+            side=np.fromiter((SIDE_CODES[c.side] for c in combatants), dtype=np.int8, count=len(combatants)),
+        )
+
+
+@dataclass
+class RoundResult:
+    """Outcome of one resolved round"""
+    targets: np.ndarray
+    hits: np.ndarray
+    crits: np.ndarray
+    dealt: np.ndarray
+    hp: np.ndarray
+
+    def summary(self, arrays: CombatArrays) -> List[Dict[str, Any]]:
+        """Per-attack summary for narration"""
+        events = []
+        for attacker in np.flatnonzero(self.targets >= 0):
+            target = self.targets[attacker]
+            events.append({
+                "attacker": arrays.ids[attacker],
+                "target": arrays.ids[target],
+                "hit": bool(self.hits[attacker]),
+                "crit": bool(self.crits[attacker]),
+                "damage": int(self.dealt[attacker]),
+                "target_hp": int(self.hp[target]),
+                "target_defeated": bool(self.hp[target] <= 0),
+            })
+        return events
+
+
+def pick_targets(hp: np.ndarray, side: np.ndarray, rng: np.random.Generator, targets: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Give every living combatant a living enemy to attack.
+
+    Explicit targets are kept when they point at a living enemy; everything else
+    (AUTO_TARGET, dead or friendly targets) gets a random living enemy. Combatants
+    that are down, or have no enemy left, get -1.
+    """
+    n = hp.shape[0]
+    alive = hp > 0
+    chosen = np.full(n, AUTO_TARGET, dtype=np.int64) if targets is None else np.asarray(targets, dtype=np.int64).copy()
+    valid = (chosen >= 0) & (chosen < n)
+    safe = np.where(valid, chosen, 0)
+    valid &= alive[safe] & (side[safe] != side)
+    for code in np.unique(side):
+        attackers = np.flatnonzero(alive & (side == code) & ~valid)
+        enemies = np.flatnonzero(alive & (side != code))
+        if attackers.size == 0:
+            continue
+        if enemies.size == 0:
+            chosen[attackers] = -1
+            continue
+        chosen[attackers] = enemies[rng.integers(0, enemies.size, size=attackers.size)]
+    chosen[~alive] = -1
+    return chosen
+
+
+def resolve_attacks(
+    hp: np.ndarray,
+    damage: np.ndarray,
+    defense: np.ndarray,
+    speed: np.ndarray,
+    targets: np.ndarray,
+    rng: np.random.Generator,
+) -> RoundResult:
+    """
+    Resolve one attack per attacker (targets[i] >= 0) simultaneously.
+
+    Arrays are flat, so several independent fights can be resolved in one call by
+    concatenating them and offsetting their target indices.
+    """
+    n = hp.shape[0]
+    attacking = targets >= 0
+    safe_targets = np.where(attacking, targets, 0)
+
+    # Hit chance scales with the speed difference between attacker and target
+    hit_chance = np.clip(BASE_HIT_CHANCE + HIT_CHANCE_PER_SPEED * (speed - speed[safe_targets]), MIN_HIT_CHANCE, MAX_HIT_CHANCE)
+    rolls = rng.random((3, n))
+    hits = attacking & (rolls[0] < hit_chance)
+    crits = hits & (rolls[1] < CRIT_CHANCE)
+
+    # Damage after mitigation, with variance and crits; a landed hit always does at least 1
+    raw = np.maximum(damage - DEFENSE_MITIGATION * defense[safe_targets], 1.0)
+    raw *= 1.0 + DAMAGE_VARIANCE * (2.0 * rolls[2] - 1.0)
+    raw = np.where(crits, raw * CRIT_MULTIPLIER, raw)
+    dealt = np.where(hits, np.maximum(np.rint(raw), 1.0), 0.0).astype(np.int64)
+
+    # Sum all damage landing on each target in one pass
+    incoming = np.bincount(safe_targets[hits], weights=dealt[hits], minlength=n).astype(np.int64)
+    new_hp = np.maximum(hp - incoming, 0)
+    return RoundResult(targets=np.where(attacking, targets, -1), hits=hits, crits=crits, dealt=dealt, hp=new_hp)
+
+
+def resolve_round(arrays: CombatArrays, rng: Optional[np.random.Generator] = None, targets: Optional[np.ndarray] = None) -> RoundResult:
+    """Pick targets and resolve a full round for one fight"""
+    rng = rng or np.random.default_rng()
+    chosen = pick_targets(arrays.hp, arrays.side, rng, targets)
+    return resolve_attacks(arrays.hp, arrays.damage, arrays.defense, arrays.speed, chosen, rng)
@@ -0,0 +1,214 @@
+"""
+Append-only per-session combat event log.
+
+The hot tail of every session lives in a bounded in-memory ring buffer (a deque
+with maxlen), so reading the last N events is O(N) with no database access.
+Appended events are also queued and written in batches with insert_many to the
+capped `combat_events` collection for durability; a session whose tail is not in
+memory (e.g. after a restart) is restored from there with one indexed query,
+merged with any of its events still waiting to be written so sequence numbers
+carry on where they left off. While MongoDB is unreachable the write queue is
+capped; past the cap the oldest queued events are dropped and counted.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from ..Mechanics.connection import mongo_registry
+from ..Mechanics.indexes import ensure_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+COMBAT_EVENTS_COLLECTION = "combat_events"
+COMBAT_EVENT_RING_SIZE = int(os.environ.get("COMBAT_EVENT_RING_SIZE", "256"))
+COMBAT_EVENT_LOG_SESSIONS = int(os.environ.get("COMBAT_EVENT_LOG_SESSIONS", "10000"))
+COMBAT_EVENT_FLUSH_INTERVAL = float(os.environ.get("COMBAT_EVENT_FLUSH_INTERVAL", "2"))
+COMBAT_EVENT_MAX_PENDING = int(os.environ.get("COMBAT_EVENT_MAX_PENDING", "100000"))
+
+
+class SessionLog:
+    """Ring buffer and sequence counter for one session"""
+    __slots__ = ("events", "next_seq")
+
+    def __init__(self, ring_size: int, next_seq: int = 0):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=ring_size)
+        self.next_seq = next_seq
+
+
+class CombatEventLog:
+    """Process-wide combat event log: ring buffers in memory, capped collection on disk"""
+
+    def __init__(
+        self,
+        ring_size: int = COMBAT_EVENT_RING_SIZE,
+        max_sessions: int = COMBAT_EVENT_LOG_SESSIONS,
+        flush_interval: float = COMBAT_EVENT_FLUSH_INTERVAL,
+        max_pending: int = COMBAT_EVENT_MAX_PENDING,
+    ):
+        self.ring_size = ring_size
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # Least recently used sessions are dropped first; they can be restored from MongoDB
+        self._sessions: "OrderedDict[str, SessionLog]" = OrderedDict()
+        self._pending: List[Dict[str, Any]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.appended = 0
+        self.written = 0
+        self.restored = 0
+        self.dropped = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return str(session_id) in self._sessions
+
+    def append(self, server_id: str, session_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Append one event and return it with its sequence number"""
+        return self.extend(server_id, session_id, [(event_type, data)])[0]
+
+    def extend(self, server_id: str, session_id: str, events: List[Any]) -> List[Dict[str, Any]]:
+        """Append several (event_type, data) pairs to a session in order"""
+        log = self._log(str(session_id))
+        now = time.time()
+        appended = []
+        for event_type, data in events:
+            event = {
+                "session_id": str(session_id),
+                "server_id": server_id,
+                "seq": log.next_seq,
+                "type": event_type,
+                "ts": now,
+                "data": data or {},
+            }
+            log.next_seq += 1
+            log.events.append(event)
+            appended.append(event)
+        self._pending.extend(appended)
+        self._trim_pending()
+        self.appended += len(appended)
+        self._ensure_flusher()
+        return appended
+
+    def tail(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Last `limit` events of a session, oldest first; only reads the ring buffer"""
+        log = self._sessions.get(str(session_id))
+        if log is None or limit <= 0:
+            return []
+        self._sessions.move_to_end(str(session_id))
+        newest_first = list(itertools.islice(reversed(log.events), limit))
+        newest_first.reverse()
+        return newest_first
+
+    async def ensure_loaded(self, session_id: str, limit: Optional[int] = None) -> None:
+        """Restore a session's tail and sequence counter from MongoDB if it is not in memory"""
+        session_id = str(session_id)
+        if session_id in self._sessions:
+            return
+        # Queued events may be written while the query runs, so look at the queue before and after it
+        queued = self._pending_events(session_id)
+        collection = mongo_registry.get_collection(COMBAT_EVENTS_COLLECTION)
+        docs = await mongo_registry.run(lambda: list(
+            collection.find({"session_id": session_id}, {"_id": 0})
+            .sort("seq", -1)
+            .limit(limit or self.ring_size)
+        ))
+        # Events appended while the query was running already created the log
+        if session_id in self._sessions:
+            return
+        by_seq = {event["seq"]: event for event in docs}
+        by_seq.update((event["seq"], event) for event in queued + self._pending_events(session_id))
+        events = [by_seq[seq] for seq in sorted(by_seq)]
+        log = self._log(session_id, next_seq=events[-1]["seq"] + 1 if events else 0)
+        log.events.extend(events)
+        self.restored += len(docs)
+
+    async def read(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Last `limit` events, restoring the ring buffer from MongoDB on a miss"""
+        await self.ensure_loaded(session_id)
+        return self.tail(session_id, limit)
+
+    def _log(self, session_id: str, next_seq: Optional[int] = None) -> SessionLog:
+        log = self._sessions.get(session_id)
+        if log is None:
+            if next_seq is None:
+                # Rebuilt without a restore (e.g. dropped as least recently used): carry on after any queued events
+                queued = self._pending_events(session_id)
+                next_seq = queued[-1]["seq"] + 1 if queued else 0
+            log = self._sessions[session_id] = SessionLog(self.ring_size, next_seq)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return log
+
+    async def flush(self) -> int:
+        """Write queued events to the capped collection in one insert_many"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, []
+        collection = mongo_registry.get_collection(COMBAT_EVENTS_COLLECTION)
+        try:
+            # The first write must not auto-create an uncapped collection; no-op after the first call
+            await mongo_registry.run(ensure_collection_indexes, COMBAT_EVENTS_COLLECTION)
+            # insert_many adds _id to the dicts, so write copies and keep the ring buffer JSON-friendly
+            await mongo_registry.run(collection.insert_many, [dict(event) for event in batch], ordered=True)
+        except Exception:
+            # Keep the events for the next attempt, ahead of anything appended meanwhile
+            self._pending = batch + self._pending
+            self._trim_pending()
+            raise
+        self.written += len(batch)
+        return len(batch)
+
+    def _pending_events(self, session_id: str) -> List[Dict[str, Any]]:
+        # Queued events of one session, oldest first; only scanned when a ring buffer is rebuilt
+        return [event for event in self._pending if event["session_id"] == session_id]
+
+    def _trim_pending(self) -> None:
+        # Bound memory while MongoDB is unreachable; the ring buffers still hold the recent tail
+        excess = len(self._pending) - self.max_pending
+        if excess > 0:
+            del self._pending[:excess]
+            self.dropped += excess
+            logger.warning(f"Combat event queue over {self.max_pending} events, dropped the oldest {excess}")
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No running loop (e.g. offline tooling); callers flush explicitly
+            self._flusher = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush combat events: {e}")
+
+    async def stop(self) -> None:
+        """Cancel the background flusher and write any queued events"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "pending": len(self._pending),
+            "appended": self.appended,
+            "written": self.written,
+            "restored": self.restored,
+            "dropped": self.dropped,
+        }
+
+
+# Global combat event log shared by the combat tools
+combat_event_log = CombatEventLog()
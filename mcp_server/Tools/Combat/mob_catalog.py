@@ -0,0 +1,199 @@
+"""
+In-memory mob catalog.
+
+The catalog (config/mobs.yaml, or MOB_CATALOG_PATH) is parsed once into
+immutable indexes by id, normalized name/alias and tag. Lookups are plain dict
+reads with no database access. The file's mtime is checked at most every
+MOB_CATALOG_RELOAD_INTERVAL seconds on lookup; when it changed, a new set of
+indexes is built and swapped in with a single reference assignment, so readers
+never see a half-built catalog and a broken edit keeps the previous version.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .state import DEFAULT_MOB_STATS
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+MOB_CATALOG_PATH = os.environ.get("MOB_CATALOG_PATH", os.path.join(PROJECT_ROOT, "config", "mobs.yaml"))
+MOB_CATALOG_RELOAD_INTERVAL = float(os.environ.get("MOB_CATALOG_RELOAD_INTERVAL", "5"))
+
+MOB_COMBATANT_PREFIX = "mob:"
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase and collapse punctuation/whitespace: 'Orc  Warrior!' -> 'orc warrior'"""
+    return _NON_WORD.sub(" ", (name or "").lower()).strip()
+
+
+@dataclass(frozen=True)
+class MobEntry:
+    """One catalog entry"""
+    mob_id: str
+    name: str
+    stats: Dict[str, int]
+    tags: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    tactics: Optional[str] = None
+
+    @property
+    def combatant_id(self) -> str:
+        return f"{MOB_COMBATANT_PREFIX}{self.mob_id}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mob_id": self.mob_id,
+            "name": self.name,
+            "stats": dict(self.stats),
+            "tags": list(self.tags),
+            "aliases": list(self.aliases),
+            "tactics": self.tactics,
+        }
+
+
+@dataclass(frozen=True)
+class CatalogIndex:
+    """Immutable lookup tables built from one version of the catalog file"""
+    by_id: Dict[str, MobEntry] = field(default_factory=dict)
+    by_name: Dict[str, MobEntry] = field(default_factory=dict)
+    by_tag: Dict[str, Tuple[MobEntry, ...]] = field(default_factory=dict)
+    mtime: float = 0.0
+
+    @classmethod
+    def build(cls, mobs: List[Dict[str, Any]], mtime: float = 0.0) -> "CatalogIndex":
+        by_id: Dict[str, MobEntry] = {}
+        by_name: Dict[str, MobEntry] = {}
+        by_tag: Dict[str, List[MobEntry]] = {}
+        for raw in mobs:
+            mob_id = str(raw["id"])
+            if mob_id in by_id:
+                raise ValueError(f"Duplicate mob id: {mob_id}")
+            entry = MobEntry(
+                mob_id=mob_id,
+                name=raw.get("name", mob_id),
+                stats={**DEFAULT_MOB_STATS, **{k: int(v) for k, v in (raw.get("stats") or {}).items()}},
+                tags=tuple(normalize_name(t) for t in raw.get("tags") or []),
+                aliases=tuple(raw.get("aliases") or []),
+                tactics=raw.get("tactics"),
+            )
+            by_id[mob_id] = entry
+            for name in (entry.name, mob_id, *entry.aliases):
+                key = normalize_name(name)
+                if key in by_name and by_name[key] is not entry:
+                    raise ValueError(f"Mob name '{name}' is used by both {by_name[key].mob_id} and {mob_id}")
+                by_name[key] = entry
+            for tag in entry.tags:
+                by_tag.setdefault(tag, []).append(entry)
+        return cls(by_id=by_id, by_name=by_name, by_tag={t: tuple(e) for t, e in by_tag.items()}, mtime=mtime)
+
+
+class MobCatalog:
+    """Process-wide mob catalog with hot reload on file change"""
+
+    def __init__(self, path: str = MOB_CATALOG_PATH, reload_interval: float = MOB_CATALOG_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index: Optional[CatalogIndex] = None
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._failed_mtime: Optional[float] = None
+        self.reloads = 0
+        self.reload_errors = 0
+
+    @property
+    def index(self) -> CatalogIndex:
+        """Current indexes; loads on first use and reloads when the file changed"""
+        index = self._index
+        now = time.monotonic()
+        if index is None or now - self._checked_at >= self.reload_interval:
+            index = self._maybe_reload(now)
+        return index
+
+    def _maybe_reload(self, now: float) -> CatalogIndex:
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                if self._index is None:
+                    logger.warning(f"Mob catalog not found at {self.path}; using default mob stats")
+                    self._index = CatalogIndex()
+                return self._index
+            if self._index is not None and mtime in (self._index.mtime, self._failed_mtime):
+                return self._index
+            try:
+                self._index = self._load(mtime)
+                self.reloads += 1
+                logger.info(f"Loaded mob catalog: {len(self._index.by_id)} mobs from {self.path}")
+            except Exception as e:
+                # Keep serving the last good catalog
+                self.reload_errors += 1
+                self._failed_mtime = mtime
+                logger.error(f"Failed to load mob catalog {self.path}: {e}")
+                if self._index is None:
+                    self._index = CatalogIndex(mtime=mtime)
+            return self._index
+
+    def _load(self, mtime: float) -> CatalogIndex:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        return CatalogIndex.build(data.get("mobs") or [], mtime)
+
+    def reload(self) -> CatalogIndex:
+        """Force a reload check now (e.g. from an admin command)"""
+        return self._maybe_reload(time.monotonic())
+
+    def get(self, mob_id: str) -> Optional[MobEntry]:
+        return self.index.by_id.get(mob_id)
+
+    def find(self, name: str) -> Optional[MobEntry]:
+        """Look a mob up by id, name or alias, ignoring case and punctuation"""
+        index = self.index
+        return index.by_id.get(name) or index.by_name.get(normalize_name(name))
+
+    def by_tag(self, *tags: str) -> List[MobEntry]:
+        """Mobs carrying every given tag"""
+        index = self.index
+        if not tags:
+            return list(index.by_id.values())
+        groups = [index.by_tag.get(normalize_name(tag), ()) for tag in tags]
+        smallest = min(groups, key=len)
+        others = [set(e.mob_id for e in group) for group in groups if group is not smallest]
+        return [e for e in smallest if all(e.mob_id in ids for ids in others)]
+
+    def resolve(self, name: str) -> MobEntry:
+        """Catalog entry for a mob name, or an ad-hoc entry with default stats for unknown mobs"""
+        entry = self.find(name)
+        if entry is not None:
+            return entry
+        return MobEntry(mob_id=normalize_name(name).replace(" ", "_") or "mob", name=name, stats=dict(DEFAULT_MOB_STATS))
+
+    def for_combatant(self, combatant_id: str) -> Optional[MobEntry]:
+        """Catalog entry behind a mob combatant id such as 'mob:goblin'"""
+        if not combatant_id.startswith(MOB_COMBATANT_PREFIX):
+            return None
+        return self.get(combatant_id[len(MOB_COMBATANT_PREFIX):])
+
+    def stats(self) -> Dict[str, Any]:
+        index = self.index
+        return {
+            "mobs": len(index.by_id),
+            "names": len(index.by_name),
+            "tags": len(index.by_tag),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+# Global mob catalog shared by the combat tools and the combat agent fast path
+mob_catalog = MobCatalog()
@@ -0,0 +1,169 @@
+"""
+Background reaper for abandoned combat sessions.
+
+Every COMBAT_REAPER_INTERVAL seconds the reaper selects sessions whose
+meta.updated_at is older than COMBAT_SESSION_IDLE_SECONDS (range scan on the TTL
+index), detaches their characters with one update_many, deletes the sessions
+with one delete_many and drops their cached characters. Sessions still live in
+the combat state store are skipped. A slower sweep also clears characters whose
+instances.session_id points at a session that no longer exists (e.g. one removed
+by the TTL index itself).
+
+Run a single pass (including the orphan sweep) and print the counts with:
+    python -m mcp_server.Tools.Combat.reaper
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from ..Mechanics.character_cache import character_cache
+from ..Mechanics.DAO import CharacterDAO, SessionDAO
+from .state import CombatStateStore, combat_state_store
+
+logger = logging.getLogger(__name__)
+
+COMBAT_SESSION_IDLE_SECONDS = float(os.environ.get("COMBAT_SESSION_IDLE_SECONDS", "3600"))
+COMBAT_REAPER_INTERVAL = float(os.environ.get("COMBAT_REAPER_INTERVAL", "300"))
+COMBAT_REAPER_BATCH_SIZE = int(os.environ.get("COMBAT_REAPER_BATCH_SIZE", "500"))
+# Run the orphan sweep once every this many reaper passes
+COMBAT_REAPER_ORPHAN_EVERY = int(os.environ.get("COMBAT_REAPER_ORPHAN_EVERY", "12"))
+
+
+class CombatSessionReaper:
+    """Expires idle combat sessions and detaches their characters in batches"""
+
+    def __init__(
+        self,
+        idle_seconds: float = COMBAT_SESSION_IDLE_SECONDS,
+        interval: float = COMBAT_REAPER_INTERVAL,
+        batch_size: int = COMBAT_REAPER_BATCH_SIZE,
+        store: Optional[CombatStateStore] = None,
+    ):
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.batch_size = batch_size
+        self.store = store if store is not None else combat_state_store
+        self._task: Optional[asyncio.Task] = None
+        self._session_dao: Optional[SessionDAO] = None
+        self._character_dao: Optional[CharacterDAO] = None
+        self.runs = 0
+        self.sessions_reaped = 0
+        self.characters_detached = 0
+        self.orphans_detached = 0
+        self.skipped_live = 0
+        self.errors = 0
+        self.last_run: Optional[datetime] = None
+
+    @property
+    def session_dao(self) -> SessionDAO:
+        if self._session_dao is None:
+            self._session_dao = SessionDAO()
+        return self._session_dao
+
+    @property
+    def character_dao(self) -> CharacterDAO:
+        if self._character_dao is None:
+            self._character_dao = CharacterDAO()
+        return self._character_dao
+
+    async def reap_once(self, sweep_orphans: bool = False) -> Dict[str, int]:
+        """
+        Run one reaper pass, draining expired sessions batch by batch.
+
+        Returns:
+            Counts for this pass: sessions reaped, characters detached, orphans detached
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idle_seconds)
+        counts = {"sessions_reaped": 0, "characters_detached": 0, "orphans_detached": 0}
+        while True:
+            # Step 1: Oldest expired sessions first, ids only
+            expired = await self.session_dao.find_expired_sessions(cutoff, self.batch_size)
+            batch = [s for s in expired if str(s["_id"]) not in self.store]
+            self.skipped_live += len(expired) - len(batch)
+            if not batch:
+                break
+            session_ids = [s["_id"] for s in batch]
+            # Step 2: Detach every character of the batch in one update_many
+            counts["characters_detached"] += await self.character_dao.detach_sessions(session_ids)
+            character_cache.invalidate_ids(self._character_ids(batch))
+            # Step 3: Delete the batch in one delete_many
+            counts["sessions_reaped"] += await self.session_dao.delete_sessions(session_ids, cutoff)
+            if len(expired) < self.batch_size:
+                break
+        # Step 4: Clear pointers to sessions that are already gone
+        if sweep_orphans:
+            orphaned = await self.character_dao.find_orphaned_session_refs(self.batch_size)
+            if orphaned:
+                counts["orphans_detached"] = await self.character_dao.detach_sessions([o["_id"] for o in orphaned])
+                character_cache.invalidate_ids([i for o in orphaned for i in o["character_ids"]])
+
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        self.sessions_reaped += counts["sessions_reaped"]
+        self.characters_detached += counts["characters_detached"]
+        self.orphans_detached += counts["orphans_detached"]
+        if any(counts.values()):
+            logger.info(f"Combat session reaper: {counts}")
+        return counts
+
+    @staticmethod
+    def _character_ids(sessions: List[Dict[str, Any]]) -> List[str]:
+        return [str(i) for s in sessions for i in s.get("players", {}).get("character_ids", [])]
+
+    def ensure_started(self) -> None:
+        """Start the background loop on the running event loop if it is not running yet"""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+        except RuntimeError:
+            # No running loop (e.g. offline tooling); callers reap explicitly
+            self._task = None
+
+    async def _loop(self) -> None:
+        passes = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            passes += 1
+            try:
+                await self.reap_once(sweep_orphans=passes % COMBAT_REAPER_ORPHAN_EVERY == 0)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Combat session reaper failed: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def stats(self) -> Dict[str, Any]:
+        """Reaper counters plus the current size of the sessions collection"""
+        return {
+            "runs": self.runs,
+            "sessions_reaped": self.sessions_reaped,
+            "characters_detached": self.characters_detached,
+            "orphans_detached": self.orphans_detached,
+            "skipped_live": self.skipped_live,
+            "errors": self.errors,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "sessions": await self.session_dao.count_sessions(),
+            "live_sessions": len(self.store),
+        }
+
+
+# Global reaper shared by the combat tools
+session_reaper = CombatSessionReaper()
+
+
+if __name__ == "__main__":
+    import json
+    from config.logging_config import setup_logging
+    setup_logging()
+
+    async def _main() -> None:
+        counts = await session_reaper.reap_once(sweep_orphans=True)
+        print(json.dumps({**counts, **await session_reaper.stats()}, indent=2, default=str))
+
+    asyncio.run(_main())
@@ -0,0 +1,243 @@
+"""
+Deterministic combat rules: a fast path in front of the combat LLM sub-agents.
+
+`parse_action` turns common player input ("attack the goblin", "cast fireball at
+the orc", "drink a potion") into a structured action with a confidence score, and
+`plan_mob_action` picks a mob's move from a tactics table. Both run locally in
+microseconds. Callers only fall through to the action parser / tactics planner /
+target selector sub-agents when the confidence is below FAST_PATH_CONFIDENCE.
+"""
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .state import Combatant
+
+FAST_PATH_CONFIDENCE = float(os.environ.get("COMBAT_FAST_PATH_CONFIDENCE", "0.8"))
+
+# Verb lexicon: first word(s) of the request -> action type
+ACTION_VERBS = {
+    "attack": "attack", "hit": "attack", "strike": "attack", "slash": "attack", "stab": "attack",
+    "shoot": "attack", "punch": "attack", "kick": "attack", "smash": "attack", "swing": "attack",
+    "fight": "attack", "charge": "attack", "bash": "attack",
+    "defend": "defend", "block": "defend", "guard": "defend", "parry": "defend", "brace": "defend",
+    "cast": "use_skill", "use": "use_skill",
+    "drink": "use_item", "quaff": "use_item", "eat": "use_item", "throw": "use_item",
+    "flee": "flee", "run": "flee", "escape": "flee", "retreat": "flee",
+    "wait": "end_turn", "pass": "end_turn", "skip": "end_turn",
+}
+# Things that are items rather than skills when the verb is "use"
+ITEM_WORDS = frozenset(["potion", "elixir", "tonic", "bomb", "scroll", "ration", "herb", "bandage"])
+# Words that signal the player is unsure or asking, which the LLM handles better
+HEDGE_WORDS = frozenset(["maybe", "perhaps", "should", "could", "what", "which", "how", "why", "if", "or"])
+FILLER_WORDS = frozenset(["the", "a", "an", "my", "that", "this", "at", "on", "to", "with", "using", "please", "i", "me", "some", "of"])
+TARGET_PREPOSITIONS = ("at", "on", "against")
+TOOL_PREPOSITIONS = ("with", "using")
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+@dataclass
+class ParsedAction:
+    """Result of the rule engine; `confidence` decides whether the LLM is needed"""
+    action: Optional[str]
+    target: Optional[str] = None
+    skill: Optional[str] = None
+    item: Optional[str] = None
+    confidence: float = 0.0
+    reasons: List[str] = field(default_factory=list)
+    source: str = "rules"
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= FAST_PATH_CONFIDENCE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def normalize(text: str) -> str:
+    return " ".join(_TOKEN.findall((text or "").lower()))
+
+
+def _phrase(tokens: Sequence[str]) -> Optional[str]:
+    words = [t for t in tokens if t not in FILLER_WORDS]
+    return " ".join(words) or None
+
+
+def _split(tokens: List[str], prepositions: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    for i, token in enumerate(tokens):
+        if token in prepositions:
+            return tokens[:i], tokens[i + 1:]
+    return tokens, []
+
+
+def resolve_target(phrase: Optional[str], combatants: Iterable[Combatant], side: str = "mob") -> Tuple[Optional[str], float]:
+    """
+    Match a target phrase against living combatants on `side`.
+
+    Returns (combatant_id, confidence): an exact name match is certain, a unique
+    partial match is likely, several matches or none are ambiguous. With no phrase
+    and a single living enemy, that enemy is the obvious target.
+    """
+    candidates = [c for c in combatants if c.side == side and c.alive]
+    if not phrase:
+        if len(candidates) == 1:
+            return candidates[0].combatant_id, 0.9
+        return None, 0.5 if candidates else 0.0
+    exact = [c for c in candidates if normalize(c.name) == phrase]
+    if len(exact) == 1:
+        return exact[0].combatant_id, 1.0
+    words = set(phrase.split())
+    partial = [c for c in candidates if words & set(normalize(c.name).split())]
+    if len(partial) == 1:
+        return partial[0].combatant_id, 0.85
+    if len(exact) > 1 or len(partial) > 1:
+        # e.g. "attack the goblin" with two goblins standing
+        return None, 0.4
+    return None, 0.2
+
+
+def parse_action(text: str, combatants: Optional[Iterable[Combatant]] = None) -> ParsedAction:
+    """
+    Parse a player's combat request into a structured action.
+
+    Args:
+        text: The player's request
+        combatants: Live combatants of the session, used to resolve the target to a combatant_id
+
+    Returns:
+        ParsedAction with action, target/skill/item and a confidence in [0, 1]
+    """
+    tokens = normalize(text).split()
+    if not tokens:
+        return ParsedAction(action=None, reasons=["empty input"])
+
+    # Step 1: Find the verb; allow a short lead-in such as "i" or "please"
+    verb_index = next((i for i, t in enumerate(tokens[:3]) if t in ACTION_VERBS), None)
+    if verb_index is None:
+        return ParsedAction(action=None, reasons=["no known combat verb"])
+    verb = tokens[verb_index]
+    action = ACTION_VERBS[verb]
+    rest = tokens[verb_index + 1:]
+    parsed = ParsedAction(action=action, confidence=1.0)
+
+    # Step 2: Penalise hedged, compound or question-like requests
+    if HEDGE_WORDS & set(tokens) or "?" in (text or ""):
+        parsed.confidence *= 0.5
+        parsed.reasons.append("hedged or question-like input")
+    if any(t in ACTION_VERBS and ACTION_VERBS[t] != action for t in rest) or "then" in rest or "and" in rest:
+        parsed.confidence *= 0.5
+        parsed.reasons.append("more than one action requested")
+
+    # Step 3: Pull out the skill / item and the target phrase
+    target_phrase: Optional[str] = None
+    if action == "attack":
+        head, tool = _split(rest, TOOL_PREPOSITIONS)
+        target_phrase = _phrase(head)
+        parsed.skill = _phrase(tool)
+    elif action == "use_skill":
+        head, target_tokens = _split(rest, TARGET_PREPOSITIONS)
+        name = _phrase(head)
+        if name and set(name.split()) & ITEM_WORDS:
+            parsed.action, parsed.item = "use_item", name
+        else:
+            parsed.skill = name
+        target_phrase = _phrase(target_tokens)
+        if not name:
+            parsed.confidence *= 0.3
+            parsed.reasons.append("no skill or item named")
+    elif action == "use_item":
+        head, target_tokens = _split(rest, TARGET_PREPOSITIONS)
+        parsed.item = _phrase(head)
+        target_phrase = _phrase(target_tokens)
+        if not parsed.item:
+            parsed.confidence *= 0.3
+            parsed.reasons.append("no item named")
+
+    # Step 4: Resolve the target against the live combatants
+    if combatants is not None and (parsed.action in ("attack", "use_skill") or target_phrase):
+        target_id, target_confidence = resolve_target(target_phrase, combatants)
+        parsed.target = target_id or target_phrase
+        parsed.confidence *= target_confidence
+        if target_confidence < 1.0:
+            parsed.reasons.append(f"target match confidence {target_confidence}")
+    elif target_phrase:
+        parsed.target = target_phrase
+        parsed.confidence *= 0.9
+        parsed.reasons.append("target not checked against a live session")
+
+    parsed.confidence = round(parsed.confidence, 3)
+    return parsed
+
+
+# Mob tactics tables: rows are checked in order and the first matching row wins.
+# Conditions: min/max own HP fraction and min number of living enemies.
+# Target rules: lowest_hp, highest_damage, highest_hp, self.
+TACTICS_TABLES: Dict[str, List[Dict[str, Any]]] = {
+    "aggressive": [
+        {"action": "attack", "target": "lowest_hp"},
+    ],
+    "cautious": [
+        {"max_hp": 0.2, "action": "flee", "target": "self"},
+        {"max_hp": 0.5, "action": "defend", "target": "self"},
+        {"action": "attack", "target": "highest_damage"},
+    ],
+    "brute": [
+        {"min_enemies": 3, "action": "attack", "target": "highest_hp"},
+        {"action": "attack", "target": "lowest_hp"},
+    ],
+    "skirmisher": [
+        {"max_hp": 0.3, "action": "flee", "target": "self"},
+        {"action": "attack", "target": "highest_damage"},
+    ],
+}
+DEFAULT_TACTICS = "aggressive"
+
+_TARGET_KEYS = {
+    "lowest_hp": lambda c: (c.hp, c.combatant_id),
+    "highest_hp": lambda c: (-c.hp, c.combatant_id),
+    "highest_damage": lambda c: (-c.damage, c.combatant_id),
+}
+
+
+def select_target(attacker: Combatant, combatants: Iterable[Combatant], rule: str = "lowest_hp") -> Optional[str]:
+    """Pick a living enemy of `attacker` by a tactics target rule"""
+    if rule == "self":
+        return attacker.combatant_id
+    enemies = [c for c in combatants if c.side != attacker.side and c.alive]
+    if not enemies:
+        return None
+    return min(enemies, key=_TARGET_KEYS.get(rule, _TARGET_KEYS["lowest_hp"])).combatant_id
+
+
+def plan_mob_action(mob: Combatant, combatants: Sequence[Combatant], tactics: Optional[str] = None) -> ParsedAction:
+    """
+    Choose a mob's move from its tactics table.
+
+    Unknown tactics fall back to DEFAULT_TACTICS with reduced confidence so the
+    tactics planner sub-agent can take over.
+    """
+    table = TACTICS_TABLES.get(tactics or DEFAULT_TACTICS)
+    confidence = 1.0
+    reasons: List[str] = []
+    if table is None:
+        table = TACTICS_TABLES[DEFAULT_TACTICS]
+        confidence = 0.5
+        reasons.append(f"unknown tactics '{tactics}'")
+    if not mob.alive:
+        return ParsedAction(action=None, confidence=1.0, reasons=["mob is down"])
+
+    hp_fraction = mob.hp / mob.max_hp if mob.max_hp else 0.0
+    enemies = sum(1 for c in combatants if c.side != mob.side and c.alive)
+    for row in table:
+        if hp_fraction > row.get("max_hp", 1.0) or hp_fraction < row.get("min_hp", 0.0):
+            continue
+        if enemies < row.get("min_enemies", 0):
+            continue
+        target = select_target(mob, combatants, row["target"])
+        if target is None:
+            return ParsedAction(action="end_turn", confidence=confidence, reasons=reasons + ["no enemy standing"])
+        return ParsedAction(action=row["action"], target=target, confidence=confidence, reasons=reasons, source="tactics")
+    return ParsedAction(action=None, confidence=0.0, reasons=reasons + ["no tactics row matched"])
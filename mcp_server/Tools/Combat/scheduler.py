@@ -0,0 +1,222 @@
+"""
+Speed-based turn scheduling across live combat sessions.
+
+Each session keeps a min-heap of (next_action_time, seq, combatant_id). A combatant
+acts every TURN_BASE_TIME / speed time units, so faster combatants get more turns.
+Sessions only advance when they are touched (`next_turn`, `peek`, `touch`); there is
+no global tick that walks every session. Round N spans scheduler time
+((N - 1) * TURN_BASE_TIME, N * TURN_BASE_TIME], so the round number is derived from the
+session clock and `start_round` jumps the clock when a whole round is resolved at once.
+
+Idle sessions expire through a timer wheel: a session sits in the bucket of its
+idle deadline and is moved to a new bucket when touched. Advancing the wheel only
+visits the buckets whose time has passed, so expiry cost is proportional to the
+number of expiring sessions rather than the number of live ones.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TURN_BASE_TIME = 1000.0
+COMBAT_IDLE_TIMEOUT = float(os.environ.get("COMBAT_IDLE_TIMEOUT", "900"))
+TIMER_WHEEL_TICK = float(os.environ.get("COMBAT_TIMER_WHEEL_TICK", "5"))
+TIMER_WHEEL_SIZE = 512
+
+
+def action_interval(speed: float) -> float:
+    """Time between two actions of a combatant; speed below 1 is treated as 1"""
+    return TURN_BASE_TIME / max(float(speed), 1.0)
+
+
+@dataclass(slots=True)
+class SessionSchedule:
+    """Turn heap and bookkeeping for one session"""
+    session_id: str
+    heap: List[Tuple[float, int, str]] = field(default_factory=list)
+    speeds: Dict[str, float] = field(default_factory=dict)
+    clock: float = 0.0
+    deadline_tick: int = 0
+
+
+class TurnScheduler:
+    """Heap-per-session turn scheduler with timer-wheel idle expiry"""
+
+    def __init__(
+        self,
+        idle_timeout: float = COMBAT_IDLE_TIMEOUT,
+        tick_seconds: float = TIMER_WHEEL_TICK,
+        wheel_size: int = TIMER_WHEEL_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.idle_timeout = idle_timeout
+        self.tick_seconds = tick_seconds
+        self.wheel_size = wheel_size
+        self._clock = clock
+        self._sessions: Dict[str, SessionSchedule] = {}
+        self._wheel: List[Set[str]] = [set() for _ in range(wheel_size)]
+        self._current_tick = self._tick(self._clock())
+        self._seq = itertools.count()
+        self._expire_callbacks: List[Callable[[str], None]] = []
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return str(session_id) in self._sessions
+
+    def on_expire(self, callback: Callable[[str], None]) -> None:
+        """Register a callback invoked with the session id of every expired session"""
+        self._expire_callbacks.append(callback)
+
+    def register(self, session_id: str, speeds: Dict[str, float], clock: float = 0.0) -> None:
+        """Start scheduling a session at clock (e.g. the start of a restored round); the fastest combatant acts first"""
+        session_id = str(session_id)
+        schedule = SessionSchedule(session_id=session_id, clock=clock)
+        for combatant_id, speed in speeds.items():
+            schedule.speeds[combatant_id] = float(speed)
+            heapq.heappush(schedule.heap, (clock + action_interval(speed), next(self._seq), combatant_id))
+        self._sessions[session_id] = schedule
+        self._schedule_expiry(schedule)
+        self.advance()
+
+    def unregister(self, session_id: str) -> None:
+        schedule = self._sessions.pop(str(session_id), None)
+        if schedule is not None:
+            self._wheel[schedule.deadline_tick % self.wheel_size].discard(schedule.session_id)
+
+    def add_combatant(self, session_id: str, combatant_id: str, speed: float) -> None:
+        """Schedule a combatant joining (or rejoining) mid-fight after one full interval"""
+        schedule = self._get(session_id)
+        if combatant_id in schedule.speeds:
+            return
+        schedule.speeds[combatant_id] = float(speed)
+        heapq.heappush(schedule.heap, (schedule.clock + action_interval(speed), next(self._seq), combatant_id))
+
+    def remove_combatant(self, session_id: str, combatant_id: str) -> None:
+        """Stop scheduling a combatant; its heap entry is dropped lazily when it surfaces"""
+        schedule = self._get(session_id)
+        schedule.speeds.pop(combatant_id, None)
+
+    def set_speed(self, session_id: str, combatant_id: str, speed: float) -> None:
+        """Change a combatant's speed; takes effect from its next action"""
+        schedule = self._get(session_id)
+        if combatant_id in schedule.speeds:
+            schedule.speeds[combatant_id] = float(speed)
+
+    def next_turn(self, session_id: str) -> Optional[str]:
+        """Pop the combatant whose action comes next and reschedule it"""
+        schedule = self._get(session_id)
+        self.touch(session_id)
+        while schedule.heap:
+            at, _, combatant_id = heapq.heappop(schedule.heap)
+            speed = schedule.speeds.get(combatant_id)
+            if speed is None:
+                # Removed combatant: lazy deletion
+                continue
+            schedule.clock = at
+            heapq.heappush(schedule.heap, (at + action_interval(speed), next(self._seq), combatant_id))
+            return combatant_id
+        return None
+
+    def peek(self, session_id: str, count: int = 5) -> List[str]:
+        """Upcoming turn order without advancing the session"""
+        schedule = self._get(session_id)
+        self.touch(session_id)
+        upcoming: List[str] = []
+        heap = [entry for entry in schedule.heap if entry[2] in schedule.speeds]
+        heapq.heapify(heap)
+        while heap and len(upcoming) < count:
+            at, _, combatant_id = heapq.heappop(heap)
+            upcoming.append(combatant_id)
+            heapq.heappush(heap, (at + action_interval(schedule.speeds[combatant_id]), next(self._seq), combatant_id))
+        return upcoming
+
+    def clock(self, session_id: str) -> float:
+        """Scheduler time of the session's most recent turn"""
+        return self._get(session_id).clock
+
+    def round(self, session_id: str) -> int:
+        """Round of the session's most recent turn, starting at 1"""
+        # Summed float intervals can overshoot a round boundary by a rounding error
+        return max(1, math.ceil(self._get(session_id).clock / TURN_BASE_TIME - 1e-9))
+
+    def start_round(self, session_id: str) -> None:
+        """
+        Jump to the end of the current round after it was resolved in one go; every
+        combatant's next action is one interval into the following round.
+        """
+        schedule = self._get(session_id)
+        self.touch(session_id)
+        schedule.clock = self.round(session_id) * TURN_BASE_TIME
+        schedule.heap = [
+            (schedule.clock + action_interval(speed), next(self._seq), combatant_id)
+            for combatant_id, speed in schedule.speeds.items()
+        ]
+        heapq.heapify(schedule.heap)
+
+    def touch(self, session_id: str) -> None:
+        """Mark a session as active, pushing back its idle deadline"""
+        schedule = self._get(session_id)
+        self._wheel[schedule.deadline_tick % self.wheel_size].discard(schedule.session_id)
+        self._schedule_expiry(schedule)
+        self.advance()
+
+    def advance(self) -> List[str]:
+        """Expire idle sessions whose deadline has passed; only visits elapsed buckets"""
+        now_tick = self._tick(self._clock())
+        expired: List[str] = []
+        if now_tick <= self._current_tick:
+            return expired
+        # Never visit a bucket twice in one advance, however long we were idle
+        steps = min(now_tick - self._current_tick, self.wheel_size)
+        for tick in range(now_tick - steps + 1, now_tick + 1):
+            bucket = self._wheel[tick % self.wheel_size]
+            for session_id in list(bucket):
+                schedule = self._sessions.get(session_id)
+                if schedule is None:
+                    bucket.discard(session_id)
+                elif schedule.deadline_tick <= now_tick:
+                    bucket.discard(session_id)
+                    del self._sessions[session_id]
+                    expired.append(session_id)
+        self._current_tick = now_tick
+        for session_id in expired:
+            self.expired += 1
+            for callback in self._expire_callbacks:
+                try:
+                    callback(session_id)
+                except Exception as e:
+                    logger.error(f"Turn scheduler expiry callback failed for {session_id}: {e}")
+        return expired
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "combatants": sum(len(s.speeds) for s in self._sessions.values()),
+            "expired": self.expired,
+        }
+
+    def _get(self, session_id: str) -> SessionSchedule:
+        schedule = self._sessions.get(str(session_id))
+        if schedule is None:
+            raise KeyError(f"Session not scheduled: {session_id}")
+        return schedule
+
+    def _tick(self, now: float) -> int:
+        return int(now // self.tick_seconds)
+
+    def _schedule_expiry(self, schedule: SessionSchedule) -> None:
+        schedule.deadline_tick = self._tick(self._clock() + self.idle_timeout)
+        self._wheel[schedule.deadline_tick % self.wheel_size].add(schedule.session_id)
+
+
+# Global scheduler shared by all combat sessions in this process
+turn_scheduler = TurnScheduler()
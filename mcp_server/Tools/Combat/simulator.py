@@ -0,0 +1,239 @@
+"""
+Monte Carlo combat balance simulator.
+
+Runs a scenario (a party built from character documents and a list of mobs) many
+times with the same formula as the live engine. Fights are batched: F copies of
+the fight are laid out as one flat structure-of-arrays and every round of every
+fight is resolved by a single engine.resolve_attacks call. Batches are sharded
+across a process pool, each shard with an independent seed.
+
+Reports win rates, time-to-kill (rounds until one side is wiped) distributions
+and throughput, so it doubles as a performance regression benchmark:
+
+    python -m mcp_server.Tools.Combat.simulator --fights 1000000 --workers 8
+    python -m mcp_server.Tools.Combat.simulator --scenario scenario.json --json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .engine import SIDE_MOB, SIDE_PLAYER, CombatArrays, resolve_attacks
+from .state import Combatant
+
+DEFAULT_MAX_ROUNDS = 100
+DEFAULT_SHARD_SIZE = 50_000
+
+# Same defaults create_character_tool writes for a new character
+DEFAULT_CHARACTER = {
+    "character": {"characters_name": "adventurer"},
+    "stats": {"hp": 100, "spe": 5},
+    "combat": {"damage": 5, "defense": 5, "current_hp": 100},
+}
+
+
+@dataclass
+class Scenario:
+    """A party of characters against a group of mobs"""
+    party: List[Dict[str, Any]] = field(default_factory=lambda: [DEFAULT_CHARACTER])
+    mobs: List[Dict[str, Any]] = field(default_factory=lambda: [{"name": "mob"}])
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Scenario":
+        return cls(party=data.get("party") or [DEFAULT_CHARACTER], mobs=data.get("mobs") or [{"name": "mob"}])
+
+    def combatants(self) -> List[Combatant]:
+        combatants = []
+        for i, character in enumerate(self.party):
+            character = {"_id": f"character:{i}", **character}
+            combatants.append(Combatant.from_character(character))
+        for i, mob in enumerate(self.mobs):
+            name = mob.get("name", "mob")
+            combatants.append(Combatant.from_mob(f"mob:{i}:{name}", name, mob.get("stats")))
+        return combatants
+
+
+def simulate_batch(arrays: CombatArrays, fights: int, seed: Any = None, max_rounds: int = DEFAULT_MAX_ROUNDS) -> Dict[str, np.ndarray]:
+    """
+    Run `fights` independent copies of one fight to completion.
+
+    Returns per-fight `winner` (SIDE_PLAYER, SIDE_MOB or -1 for a timeout or mutual
+    wipe) and `rounds` (rounds until the fight was decided).
+    """
+    rng = np.random.default_rng(seed)
+    m = len(arrays.ids)
+    side = arrays.side
+    # Flat layout: fight f occupies slots [f*m, (f+1)*m)
+    hp = np.tile(arrays.hp, fights)
+    damage = np.tile(arrays.damage, fights)
+    defense = np.tile(arrays.defense, fights)
+    speed = np.tile(arrays.speed, fights)
+    offsets = np.arange(fights, dtype=np.int64) * m
+    players = side == SIDE_PLAYER
+    mobs = side == SIDE_MOB
+
+    winner = np.full(fights, -1, dtype=np.int8)
+    rounds = np.full(fights, max_rounds, dtype=np.int32)
+    active = np.ones(fights, dtype=bool)
+
+    for round_number in range(1, max_rounds + 1):
+        grid = hp.reshape(fights, m)
+        alive = (grid > 0) & active[:, None]
+        targets = np.full((fights, m), -1, dtype=np.int64)
+        # Each attacker column draws a random living enemy in its own fight
+        for code in (SIDE_PLAYER, SIDE_MOB):
+            enemy_alive = alive & (side != code)
+            ranks = np.cumsum(enemy_alive, axis=1)
+            count = ranks[:, -1]
+            for column in np.flatnonzero(side == code):
+                attacking = alive[:, column] & (count > 0)
+                pick = np.floor(rng.random(fights) * count).astype(np.int64)
+                chosen = np.argmax(ranks > pick[:, None], axis=1)
+                targets[:, column] = np.where(attacking, chosen + offsets, -1)
+
+        result = resolve_attacks(hp, damage, defense, speed, targets.ravel(), rng)
+        hp = result.hp
+
+        grid = hp.reshape(fights, m)
+        players_up = (grid[:, players] > 0).any(axis=1)
+        mobs_up = (grid[:, mobs] > 0).any(axis=1)
+        decided = active & ~(players_up & mobs_up)
+        winner[decided & players_up] = SIDE_PLAYER
+        winner[decided & mobs_up] = SIDE_MOB
+        rounds[decided] = round_number
+        active &= ~decided
+        if not active.any():
+            break
+
+    return {"winner": winner, "rounds": rounds}
+
+
+def _simulate_shard(args) -> Dict[str, Any]:
+    # Top-level so the process pool can pickle it
+    arrays, fights, seed, max_rounds = args
+    outcome = simulate_batch(arrays, fights, seed, max_rounds)
+    winner, rounds = outcome["winner"], outcome["rounds"]
+    return {
+        "fights": fights,
+        "player_wins": int(np.count_nonzero(winner == SIDE_PLAYER)),
+        "mob_wins": int(np.count_nonzero(winner == SIDE_MOB)),
+        "player_ttk": np.bincount(rounds[winner == SIDE_PLAYER], minlength=max_rounds + 1),
+        "mob_ttk": np.bincount(rounds[winner == SIDE_MOB], minlength=max_rounds + 1),
+    }
+
+
+def _percentiles(histogram: np.ndarray) -> Dict[str, Any]:
+    total = int(histogram.sum())
+    if total == 0:
+        return {"count": 0}
+    cumulative = np.cumsum(histogram)
+    rounds = np.arange(histogram.size)
+    return {
+        "count": total,
+        "mean": round(float((histogram * rounds).sum() / total), 3),
+        "p50": int(np.searchsorted(cumulative, 0.50 * total)),
+        "p90": int(np.searchsorted(cumulative, 0.90 * total)),
+        "p99": int(np.searchsorted(cumulative, 0.99 * total)),
+        "max": int(rounds[histogram > 0].max()),
+    }
+
+
+def run_simulation(
+    scenario: Scenario,
+    fights: int,
+    workers: Optional[int] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    seed: Optional[int] = None,
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+) -> Dict[str, Any]:
+    """
+    Simulate `fights` fights of a scenario sharded across a process pool.
+
+    Returns:
+        Win rates, time-to-kill distributions (in rounds) for each side and throughput
+    """
+    arrays = CombatArrays.from_combatants(scenario.combatants())
+    workers = workers or os.cpu_count() or 1
+    sizes = [shard_size] * (fights // shard_size)
+    if fights % shard_size:
+        sizes.append(fights % shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    shards = [(arrays, size, shard_seed, max_rounds) for size, shard_seed in zip(sizes, seeds)]
+
+    started = time.perf_counter()
+    if workers == 1 or len(shards) == 1:
+        results = [_simulate_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_shard, shards))
+    elapsed = time.perf_counter() - started
+
+    player_wins = sum(r["player_wins"] for r in results)
+    mob_wins = sum(r["mob_wins"] for r in results)
+    player_ttk = sum((r["player_ttk"] for r in results), np.zeros(max_rounds + 1, dtype=np.int64))
+    mob_ttk = sum((r["mob_ttk"] for r in results), np.zeros(max_rounds + 1, dtype=np.int64))
+    return {
+        "fights": fights,
+        "combatants": arrays.ids,
+        "win_rate": {
+            "player": round(player_wins / fights, 4) if fights else 0.0,
+            "mob": round(mob_wins / fights, 4) if fights else 0.0,
+            "undecided": round((fights - player_wins - mob_wins) / fights, 4) if fights else 0.0,
+        },
+        "time_to_kill": {
+            "player_wins": _percentiles(player_ttk),
+            "mob_wins": _percentiles(mob_ttk),
+        },
+        "throughput": {
+            "workers": workers,
+            "shards": len(shards),
+            "seconds": round(elapsed, 3),
+            "fights_per_second": round(fights / elapsed, 1) if elapsed else None,
+            "fights_per_minute": round(60 * fights / elapsed, 1) if elapsed else None,
+        },
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    win_rate = report["win_rate"]
+    throughput = report["throughput"]
+    print(f"{report['fights']} fights: {', '.join(report['combatants'])}")
+    print(f"  win rate   player {win_rate['player']:.2%}  mob {win_rate['mob']:.2%}  undecided {win_rate['undecided']:.2%}")
+    for side, ttk in report["time_to_kill"].items():
+        if ttk["count"]:
+            print(f"  ttk {side:<11} mean {ttk['mean']}  p50 {ttk['p50']}  p90 {ttk['p90']}  p99 {ttk['p99']}  max {ttk['max']}")
+    print(
+        f"  throughput {throughput['fights_per_second']} fights/s "
+        f"({throughput['fights_per_minute']} /min) on {throughput['workers']} workers in {throughput['seconds']}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo combat balance simulator")
+    parser.add_argument("--scenario", help='JSON file with {"party": [character docs], "mobs": [{"name", "stats"}]}')
+    parser.add_argument("--fights", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--max-rounds", type=int, default=DEFAULT_MAX_ROUNDS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    scenario = Scenario()
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            scenario = Scenario.from_dict(json.load(f))
+    report = run_simulation(scenario, args.fights, args.workers, args.shard_size, args.seed, args.max_rounds)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
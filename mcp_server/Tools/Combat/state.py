@@ -0,0 +1,465 @@
+"""
+In-memory authoritative combat state.
+
+Live fights are held in process as compact slotted dataclasses keyed by session id.
+Actions mutate that state directly; a background task flushes dirty sessions to
+SessionDAO in one bulk write every COMBAT_FLUSH_INTERVAL seconds, and a session is
+flushed immediately when it ends. MongoDB only ever sees periodic snapshots, never
+a read-modify-write per action.
+
+Turn order comes from the shared TurnScheduler: faster combatants act more often,
+and sessions left idle are evicted from memory (and flushed) by its timer wheel.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..Mechanics.DAO import SessionDAO
+from ..Mechanics.derived_stats import derived_stats
+from .engine import AUTO_TARGET, CombatArrays, resolve_round
+from .scheduler import TURN_BASE_TIME, TurnScheduler, turn_scheduler
+
+logger = logging.getLogger(__name__)
+
+COMBAT_FLUSH_INTERVAL = float(os.environ.get("COMBAT_FLUSH_INTERVAL", "5"))
+
+# Default stat line for mobs without a catalog entry
+DEFAULT_MOB_STATS = {"hp": 50, "damage": 5, "defense": 3, "speed": 5}
+
+
+@dataclass(slots=True)
+class Combatant:
+    """One participant in a fight"""
+    combatant_id: str
+    name: str
+    side: str  # "player" or "mob"
+    max_hp: int
+    hp: int
+    damage: int
+    defense: int
+    speed: int
+    status_ailments: List[str] = field(default_factory=list)
+
+    @property
+    def alive(self) -> bool:
+        return self.hp > 0
+
+    @classmethod
+    def from_character(cls, character: Dict[str, Any]) -> "Combatant":
+        stats = character.get("stats", {})
+        combat = character.get("combat", {})
+        # Base combat stats plus equipment, maintained on equip/unequip
+        derived = derived_stats(character)
+        ailment = combat.get("status_ailment")
+        return cls(
+            combatant_id=str(character["_id"]),
+            name=character.get("character", {}).get("characters_name", "unknown"),
+            side="player",
+            max_hp=int(stats.get("hp", 100)),
+            hp=int(combat.get("current_hp", stats.get("hp", 100))),
+            damage=int(derived["damage"]),
+            defense=int(derived["defense"]),
+            speed=int(derived["stats"]["spe"]),
+            status_ailments=[ailment] if ailment else [],
+        )
+
+    @classmethod
+    def from_mob(cls, combatant_id: str, name: str, stats: Optional[Dict[str, int]] = None) -> "Combatant":
+        stats = {**DEFAULT_MOB_STATS, **(stats or {})}
+        return cls(
+            combatant_id=combatant_id,
+            name=name,
+            side="mob",
+            max_hp=int(stats["hp"]),
+            hp=int(stats["hp"]),
+            damage=int(stats["damage"]),
+            defense=int(stats["defense"]),
+            speed=int(stats["speed"]),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "combatant_id": self.combatant_id,
+            "name": self.name,
+            "side": self.side,
+            "max_hp": self.max_hp,
+            "hp": self.hp,
+            "damage": self.damage,
+            "defense": self.defense,
+            "speed": self.speed,
+            "status_ailments": list(self.status_ailments),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Combatant":
+        return cls(**{**data, "status_ailments": list(data.get("status_ailments", []))})
+
+
+@dataclass(slots=True)
+class CombatState:
+    """Authoritative state of one combat session"""
+    session_id: str
+    server_id: str
+    combatants: Dict[str, Combatant]
+    turn_order: List[str]
+    turn_index: int = 0
+    round: int = 1
+    status: str = "active"
+    version: int = 0
+    flushed_version: int = 0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+    @property
+    def current_turn(self) -> Optional[str]:
+        return self.turn_order[self.turn_index] if self.turn_order else None
+
+    def touch(self) -> None:
+        self.version += 1
+        self.updated_at = time.monotonic()
+
+    def side_alive(self, side: str) -> bool:
+        return any(c.alive for c in self.combatants.values() if c.side == side)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "combatants": [c.to_dict() for c in self.combatants.values()],
+            "turn_order": list(self.turn_order),
+            "turn_index": self.turn_index,
+            "round": self.round,
+            "status": self.status,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_snapshot(cls, session_id: str, server_id: str, snapshot: Dict[str, Any]) -> "CombatState":
+        combatants = [Combatant.from_dict(c) for c in snapshot.get("combatants", [])]
+        version = snapshot.get("version", 0)
+        return cls(
+            session_id=session_id,
+            server_id=server_id,
+            combatants={c.combatant_id: c for c in combatants},
+            turn_order=list(snapshot.get("turn_order", [])),
+            turn_index=snapshot.get("turn_index", 0),
+            round=snapshot.get("round", 1),
+            status=snapshot.get("status", "active"),
+            version=version,
+            flushed_version=version,
+        )
+
+
+class CombatStateStore:
+    """Process-wide store of live combat sessions with periodic persistence"""
+
+    def __init__(
+        self,
+        flush_interval: float = COMBAT_FLUSH_INTERVAL,
+        session_dao: Optional[SessionDAO] = None,
+        scheduler: Optional[TurnScheduler] = None,
+    ):
+        self.flush_interval = flush_interval
+        self._session_dao = session_dao
+        self.scheduler = scheduler if scheduler is not None else turn_scheduler
+        self.scheduler.on_expire(self._evict)
+        self._sessions: Dict[str, CombatState] = {}
+        # Idle sessions dropped by the scheduler that still need their last snapshot written
+        self._evicted: List[CombatState] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.snapshots_written = 0
+
+    @property
+    def session_dao(self) -> SessionDAO:
+        if self._session_dao is None:
+            self._session_dao = SessionDAO()
+        return self._session_dao
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        # Membership check only; unlike get() it does not touch the turn schedule
+        return str(session_id) in self._sessions
+
+    def create(self, session_id: str, server_id: str, combatants: List[Combatant]) -> CombatState:
+        """Register a new fight; turn order is by speed, fastest first"""
+        order = [c.combatant_id for c in sorted(combatants, key=lambda c: c.speed, reverse=True)]
+        state = CombatState(
+            session_id=str(session_id),
+            server_id=server_id,
+            combatants={c.combatant_id: c for c in combatants},
+            turn_order=order,
+        )
+        state.touch()
+        self._sessions[state.session_id] = state
+        self._schedule(state)
+        self._ensure_flusher()
+        return state
+
+    def get(self, session_id: str, server_id: Optional[str] = None) -> Optional[CombatState]:
+        """The live state; None if it is not in memory or belongs to another server than server_id"""
+        state = self._sessions.get(str(session_id))
+        if state is not None and server_id is not None and state.server_id != server_id:
+            return None
+        if state is not None:
+            if state.session_id in self.scheduler:
+                self.scheduler.touch(state.session_id)
+            else:
+                self._schedule(state)
+        return state
+
+    async def load(self, server_id: str, session_id: str) -> Optional[CombatState]:
+        """
+        Return the live state, restoring it from the last persisted snapshot if needed.
+
+        A session held in memory for another server is treated as missing. A session
+        evicted before its last snapshot was written comes back from the eviction queue,
+        not from the older snapshot in MongoDB. An ended session is returned as
+        read-only history and is not registered again.
+        """
+        if str(session_id) in self._sessions:
+            return self.get(session_id, server_id)
+        evicted = next((state for state in self._evicted if state.session_id == str(session_id)), None)
+        if evicted is not None:
+            if evicted.server_id != server_id:
+                return None
+            if evicted.status != "active":
+                # Still queued, so the next flush writes it
+                return evicted
+            self._evicted.remove(evicted)
+            self._sessions[evicted.session_id] = evicted
+            self._schedule(evicted)
+            self._ensure_flusher()
+            return evicted
+        session = await self.session_dao.retrieve_combat_session(server_id, session_id)
+        if not session or not session.get("state"):
+            return None
+        state = CombatState.from_snapshot(str(session_id), server_id, session["state"])
+        if state.status != "active":
+            return state
+        # Another request may have restored it while the query was running
+        if state.session_id in self._sessions:
+            return self.get(session_id, server_id)
+        self._sessions[state.session_id] = state
+        self._schedule(state)
+        self._ensure_flusher()
+        return state
+
+    def upcoming_turns(self, session_id: str, count: int = 5) -> List[str]:
+        """Next combatants to act, fastest first, without advancing the session"""
+        if self.get(session_id) is None:
+            raise KeyError(f"No live combat session: {session_id}")
+        return self.scheduler.peek(str(session_id), count)
+
+    def apply_action(self, session_id: str, action: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply one action to a live session in memory.
+
+        Supported actions:
+        - {"type": "damage", "target": id, "amount": n}
+        - {"type": "heal", "target": id, "amount": n}
+        - {"type": "add_status", "target": id, "status": name}
+        - {"type": "remove_status", "target": id, "status": name}
+        - {"type": "end_turn"}
+        """
+        state = self.get(session_id)
+        if state is None:
+            raise KeyError(f"No live combat session: {session_id}")
+        if state.status != "active":
+            raise ValueError(f"Combat session {session_id} is {state.status}")
+
+        action_type = action.get("type")
+        result: Dict[str, Any] = {"type": action_type}
+        if action_type == "end_turn":
+            self._advance_turn(state)
+            result["next_turn"] = state.current_turn
+        else:
+            target = state.combatants.get(str(action.get("target")))
+            if target is None:
+                raise KeyError(f"Unknown combatant: {action.get('target')}")
+            if action_type == "damage":
+                target.hp = max(0, target.hp - max(0, int(action.get("amount", 0))))
+            elif action_type == "heal":
+                revived = not target.alive
+                target.hp = min(target.max_hp, target.hp + max(0, int(action.get("amount", 0))))
+                if revived and target.alive:
+                    self.scheduler.add_combatant(state.session_id, target.combatant_id, target.speed)
+            elif action_type == "add_status":
+                if action.get("status") and action["status"] not in target.status_ailments:
+                    target.status_ailments.append(action["status"])
+            elif action_type == "remove_status":
+                if action.get("status") in target.status_ailments:
+                    target.status_ailments.remove(action["status"])
+            else:
+                raise ValueError(f"Unknown action type: {action_type}")
+            result.update({"target": target.combatant_id, "hp": target.hp, "alive": target.alive})
+            if not target.alive:
+                self.scheduler.remove_combatant(state.session_id, target.combatant_id)
+
+        state.touch()
+        self._check_finished(state, result)
+        return result
+
+    def resolve_round(self, session_id: str, targets: Optional[Dict[str, str]] = None, rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+        """
+        Resolve a whole round of attacks for a live session with the vectorized engine.
+
+        Args:
+            targets: Optional {attacker_id: target_id} overrides; everyone else picks a random living enemy
+
+        Returns:
+            Round number, per-attack events for narration and the session status
+        """
+        state = self.get(session_id)
+        if state is None:
+            raise KeyError(f"No live combat session: {session_id}")
+        if state.status != "active":
+            raise ValueError(f"Combat session {session_id} is {state.status}")
+
+        combatants = list(state.combatants.values())
+        arrays = CombatArrays.from_combatants(combatants)
+        chosen = None
+        if targets:
+            index = {combatant_id: i for i, combatant_id in enumerate(arrays.ids)}
+            chosen = np.full(len(combatants), AUTO_TARGET, dtype=np.int64)
+            for attacker, target in targets.items():
+                if attacker in index and target in index:
+                    chosen[index[attacker]] = index[target]
+        outcome = resolve_round(arrays, rng, chosen)
+
+        # Write the new HP back into the compact state
+        for combatant, hp in zip(combatants, outcome.hp.tolist()):
+            combatant.hp = hp
+            if hp <= 0:
+                self.scheduler.remove_combatant(state.session_id, combatant.combatant_id)
+        result: Dict[str, Any] = {"round": state.round, "events": outcome.summary(arrays)}
+        # Everyone acted: the scheduler moves on to the next round, whose first turn is now current
+        self.scheduler.start_round(state.session_id)
+        self._advance_turn(state)
+        state.touch()
+        self._check_finished(state, result)
+        return result
+
+    def _check_finished(self, state: CombatState, result: Dict[str, Any]) -> None:
+        # A fight is over once one side has nobody standing
+        if not state.side_alive("player") or not state.side_alive("mob"):
+            state.status = "ended"
+            result["winner"] = "player" if state.side_alive("player") else "mob"
+        result["status"] = state.status
+
+    def _advance_turn(self, state: CombatState) -> None:
+        # The scheduler decides who acts next and, from its clock, which round it is
+        next_id = self.scheduler.next_turn(state.session_id)
+        state.round = self.scheduler.round(state.session_id)
+        if next_id is None or next_id not in state.turn_order:
+            return
+        state.turn_index = state.turn_order.index(next_id)
+
+    def _schedule(self, state: CombatState) -> None:
+        if state.status != "active":
+            return
+        # A restored session resumes at the start of its stored round
+        self.scheduler.register(state.session_id, {
+            c.combatant_id: c.speed for c in state.combatants.values() if c.alive
+        }, clock=(state.round - 1) * TURN_BASE_TIME)
+        # The first scheduled turn is the one being played now
+        current = self.scheduler.next_turn(state.session_id)
+        if current in state.turn_order:
+            state.turn_index = state.turn_order.index(current)
+
+    def _evict(self, session_id: str) -> None:
+        # Called by the scheduler's timer wheel; the state reloads from its snapshot on next use
+        state = self._sessions.pop(session_id, None)
+        if state is not None and state.dirty:
+            self._evicted.append(state)
+
+    async def end_session(self, server_id: str, session_id: str) -> Optional[CombatState]:
+        """
+        Mark a session ended, flush it immediately and drop it from memory.
+
+        Sessions that were evicted or lost on restart are restored first, so they can
+        still be ended; an already ended snapshot is returned as is.
+        """
+        state = await self.load(server_id, session_id)
+        if state is None:
+            return None
+        self._sessions.pop(state.session_id, None)
+        self.scheduler.unregister(state.session_id)
+        if state.status == "active":
+            state.status = "ended"
+            state.touch()
+        if state.dirty:
+            self._evicted = [queued for queued in self._evicted if queued is not state]
+            await self._write([state])
+        return state
+
+    async def flush(self) -> int:
+        """Persist every dirty session in one bulk write; returns the number flushed"""
+        evicted, self._evicted = self._evicted, []
+        dirty = [state for state in self._sessions.values() if state.dirty] + evicted
+        if not dirty:
+            return 0
+        try:
+            await self._write(dirty)
+        except Exception:
+            # Evicted sessions are only reachable from here; keep them for the next attempt
+            self._evicted = evicted + self._evicted
+            raise
+        return len(dirty)
+
+    async def _write(self, states: List[CombatState]) -> None:
+        versions = {state.session_id: state.version for state in states}
+        await self.session_dao.save_combat_snapshots([
+            {"session_id": state.session_id, "server_id": state.server_id, "state": state.snapshot()}
+            for state in states
+        ])
+        # Only mark the version that was written; later actions stay dirty
+        for state in states:
+            state.flushed_version = versions[state.session_id]
+        self.flushes += 1
+        self.snapshots_written += len(states)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No running loop (e.g. offline tooling); callers flush explicitly
+            self._flusher = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush combat state: {e}")
+
+    async def stop(self) -> None:
+        """Cancel the background flusher and write any remaining dirty state"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live_sessions": len(self._sessions),
+            "dirty_sessions": sum(1 for state in self._sessions.values() if state.dirty),
+            "scheduler": self.scheduler.stats(),
+            "flushes": self.flushes,
+            "snapshots_written": self.snapshots_written,
+        }
+
+
+# Global combat state store shared by the combat tools
+combat_state_store = CombatStateStore()
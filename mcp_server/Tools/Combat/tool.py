@@ -1,11 +1,14 @@
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
-from pymongo import MongoClient
 from bson import ObjectId
 import logging
 from config.logging_config import setup_logging
 from ..Mechanics.DAO import SessionDAO, CharacterDAO
+from .state import Combatant, combat_state_store
+from .reaper import session_reaper
+from .event_log import combat_event_log
+from .mob_catalog import mob_catalog
 setup_logging()
 logger = logging.getLogger(__name__)
 
@@ -37,18 +40,29 @@ async def ensure_combat_session_function(
             }
         session_dao = SessionDAO()
         character_dao = CharacterDAO()
-        # Step 2: Retrieve active character data
-        character_data = await character_dao.get_player(server_id, player_id)
+        # Keep abandoned sessions from piling up in the sessions collection
+        session_reaper.ensure_started()
+        # Step 2: Retrieve active character, current session and party in one round trip
+        preflight = await character_dao.get_combat_preflight(server_id, player_id)
         # Step 3: Return error if character is not found
-        if not character_data:
+        if not preflight:
             return {
                 "error": "Character not found"
             }
-        session_id = character_data["instances"]["session_id"]
+        character_data = preflight["character"]
         # Step 4: Check if session already exists and if mob_name is not provided, this tells us we want to check active combat session
-        existing_session = await session_dao.retrieve_combat_session(server_id, session_id)
+        existing_session = preflight["session"]
         if existing_session and not mob_name:
-            return {"success": True, "session": existing_session}
+            # Loading the session found via the character's instances.session_id also touches its turn schedule
+            state = await combat_state_store.load(server_id, str(existing_session["_id"]))
+            if not state:
+                return {"success": True, "session": existing_session, "state": None}
+            return {
+                "success": True,
+                "session": existing_session,
+                "state": state.snapshot(),
+                "upcoming_turns": combat_state_store.upcoming_turns(state.session_id) if state.status == "active" else [],
+            }
         elif not existing_session and not mob_name:
             # Step 4a: Return message that user is already in a session
             return {"success": True, "message": "User is not in a combat session"}
@@ -56,23 +70,19 @@ async def ensure_combat_session_function(
             # Step 4b: Return that a new session can't be created because session already exists
             return {"success": True, "message": "User is already in a combat session"}
         else:
-            # Step 4c: Obtain party data
-            party_id = character_data["instances"]["party_id"]
-            party = await session_dao.retrieve_party(server_id, party_id)
+            # Step 4c: Resolve the mob from the in-memory catalog and obtain party data
+            mob = mob_catalog.resolve(mob_name)
+            party = preflight["party"]
             # Step 4c1: If user is in a party
             if party:
                 # Step 4c1a: If user is the leader of the party
                 if party["leader"] == player_id:
                     # Step 4c1a1: Create a new combat session for the party
-                    session = await session_dao.create_combat_session(server_id, player_id, mob_name, party_id)
-                    # Step 4c1a2: Set all players in the parties instance to the new session
-                    for player in party["players"]:
-                        await character_dao.update_player(
-                            server_id, 
-                            player["character_id"], 
-                            {"instances": {"session_id": session["_id"]}}
-                        )
-
+                    character_ids = [str(player["character_id"]) for player in party["players"]]
+                    session_id = await session_dao.create_combat_session(server_id, character_ids, mob.name, mob.mob_id)
+                    # Step 4c1a2: Set all players in the parties instance to the new session in one bulk update
+                    await character_dao.assign_session(server_id, character_ids, session_id)
+                    members = await character_dao.get_by_ids(server_id, character_ids)
                 else:
                     # Step 4c1a2: If user is not the leader, return error
                     return {
@@ -80,12 +90,182 @@ async def ensure_combat_session_function(
                     }
             else:
                 # Step 4c2: Create a new combat session for the user
-                session = await session_dao.create_combat_session(server_id, player_id, mob_name)
+                character_ids = [str(character_data["_id"])]
+                session_id = await session_dao.create_combat_session(server_id, character_ids, mob.name, mob.mob_id)
+                await character_dao.assign_session(server_id, character_ids, session_id)
+                members = [character_data]
+            # Step 5: Start the authoritative in-memory fight
+            combatants = [Combatant.from_character(member) for member in members]
+            combatants.append(Combatant.from_mob(mob.combatant_id, mob.name, mob.stats))
+            state = combat_state_store.create(str(session_id), server_id, combatants)
+            combat_event_log.append(server_id, str(session_id), "session_started", {
+                "mob_name": mob.name,
+                "mob_id": mob.mob_id,
+                "combatants": [{"combatant_id": c.combatant_id, "name": c.name, "side": c.side} for c in combatants],
+            })
+            # Step 6: Return the new session
+            return {
+                "success": True,
+                "message": "Combat session created",
+                "session_id": str(session_id),
+                "state": state.snapshot(),
+                "upcoming_turns": combat_state_store.upcoming_turns(state.session_id),
+            }
     except Exception as e:
         return {
             "success": False,
             "error": f"Failed to create session: {str(e)}"
         }
 
+async def apply_combat_action_function(
+    server_id: str,
+    session_id: str,
+    action: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Apply a combat action to a live session in memory.
+    
+    Required fields:
+    - server_id: UUID string for the server
+    - session_id: ID of the combat session
+    - action: Dict describing the action, e.g. {"type": "damage", "target": "<combatant_id>", "amount": 7}
+    Returns:
+    - Dict with the action result or error message
+    """
+    try:
+        # Step 1: Make sure the session is live in this process
+        state = await combat_state_store.load(server_id, session_id)
+        if not state:
+            return {"error": "Combat session not found"}
+        # Step 2: Apply the action without touching the database
+        result = combat_state_store.apply_action(session_id, action)
+        await combat_event_log.ensure_loaded(session_id)
+        combat_event_log.append(server_id, session_id, "action", result)
+        # Step 3: Persist and release the session once the fight is decided
+        if result["status"] != "active":
+            await _finish_session(server_id, session_id)
+        return {"success": True, "result": result}
+    except (KeyError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Failed to apply combat action: {str(e)}"
+        }
+
+
+async def resolve_combat_round_function(
+    server_id: str,
+    session_id: str,
+    targets: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Resolve a full round of attacks for every combatant in a live session.
+    
+    Required fields:
+    - server_id: UUID string for the server
+    - session_id: ID of the combat session
+    Optional fields:
+    - targets: Dict mapping attacker combatant_id to target combatant_id; others pick a random enemy
+    Returns:
+    - Dict with the round's attack events for narration or error message
+    """
+    try:
+        # Step 1: Make sure the session is live in this process
+        state = await combat_state_store.load(server_id, session_id)
+        if not state:
+            return {"error": "Combat session not found"}
+        # Step 2: Resolve every attack in one vectorized pass
+        result = combat_state_store.resolve_round(session_id, targets)
+        await combat_event_log.ensure_loaded(session_id)
+        combat_event_log.extend(server_id, session_id, [
+            ("attack", {"round": result["round"], **event}) for event in result["events"]
+        ])
+        # Step 3: Persist and release the session once the fight is decided
+        if result["status"] != "active":
+            await _finish_session(server_id, session_id)
+        return {"success": True, "result": result}
+    except (KeyError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Failed to resolve combat round: {str(e)}"
+        }
+
+
+async def end_combat_session_function(
+    server_id: str,
+    session_id: str,
+) -> Dict[str, Any]:
+    """
+    End a combat session, persisting its final state and releasing its characters.
+    
+    Required fields:
+    - server_id: UUID string for the server
+    - session_id: ID of the combat session
+    Returns:
+    - Dict with success status and final state or error message
+    """
+    try:
+        state = await _finish_session(server_id, session_id)
+        if not state:
+            return {"error": "Combat session not found"}
+        return {"success": True, "state": state.snapshot()}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Failed to end combat session: {str(e)}"
+        }
+
+
+async def get_combat_log_function(
+    server_id: str,
+    session_id: str,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """
+    Read the most recent events of a combat session, oldest first.
+    
+    Required fields:
+    - server_id: UUID string for the server
+    - session_id: ID of the combat session
+    Optional fields:
+    - limit: Number of events to return (default 20)
+    Returns:
+    - Dict with the events or error message
+    """
+    try:
+        # Served from the in-memory ring buffer; MongoDB is only read if the tail is not cached
+        events = await combat_event_log.read(session_id, limit)
+        # Every event carries its server; a session of another server is reported as missing
+        if any(event.get("server_id") != server_id for event in events):
+            return {"error": "Combat session not found"}
+        return {"success": True, "session_id": session_id, "events": events}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Failed to read combat log: {str(e)}"
+        }
+
+
+async def _finish_session(server_id: str, session_id: str):
+    # Step 1: Restore the session if it was evicted, flush the final snapshot and drop it from memory.
+    # Characters are detached and their HP written back even if the snapshot was already ended.
+    state = await combat_state_store.end_session(server_id, session_id)
+    if not state:
+        return None
+    winner = None
+    if state.side_alive("player") != state.side_alive("mob"):
+        winner = "player" if state.side_alive("player") else "mob"
+    await combat_event_log.ensure_loaded(session_id)
+    combat_event_log.append(server_id, str(session_id), "session_ended", {"round": state.round, "winner": winner})
+    # Step 2: Write back player HP and detach the characters in bulk
+    character_dao = CharacterDAO()
+    players = [c for c in state.combatants.values() if c.side == "player"]
+    await character_dao.set_current_hp(server_id, {c.combatant_id: c.hp for c in players})
+    await character_dao.assign_session(server_id, [c.combatant_id for c in players], None)
+    return state
+
 # Export the synchronous functions
-__all__ = ["ensure_session_function"]
+__all__ = ["ensure_combat_session_function", "apply_combat_action_function", "resolve_combat_round_function", "end_combat_session_function", "get_combat_log_function"]
@@ -0,0 +1,17 @@
+from .adk_tool import (
+    get_inventory_tool, add_item_tool, remove_item_tool, equip_item_tool, unequip_item_tool,
+    use_consumable_tool, transfer_item_tool, transfer_batch_tool, sort_inventory_tool, get_equipment_stats_tool
+    )
+
+TOOLS = [
+    get_inventory_tool,
+    add_item_tool,
+    remove_item_tool,
+    equip_item_tool,
+    unequip_item_tool,
+    use_consumable_tool,
+    transfer_item_tool,
+    transfer_batch_tool,
+    sort_inventory_tool,
+    get_equipment_stats_tool
+]
@@ -0,0 +1,80 @@
+"""
+ADK-compatible tool wrapper for inventory management.
+This module provides simple callable functions for ADK agents.
+"""
+
+from typing import Optional, Dict, Any, List
+from .tool import (
+    get_inventory_tool as get_inventory_function,
+    add_item_tool as add_item_function,
+    remove_item_tool as remove_item_function,
+    equip_item_tool as equip_item_function,
+    unequip_item_tool as unequip_item_function,
+    use_consumable_tool as use_consumable_function,
+    sort_inventory_tool as sort_inventory_function,
+    get_equipment_stats_tool as get_equipment_stats_function
+)
+from .transfer import (
+    transfer_item_tool as transfer_item_function,
+    transfer_batch_tool as transfer_batch_function
+)
+
+async def get_inventory_tool(server_id: str, player_id: str, section: Optional[str] = None) -> Dict[str, Any]:
+    """Get the active character's inventory and equipped items, optionally one section only."""
+    return await get_inventory_function(server_id=server_id, player_id=player_id, section=section)
+
+
+async def add_item_tool(server_id: str, player_id: str, item_id: str, quantity: int = 1) -> Dict[str, Any]:
+    """Add an item to the active character's inventory, stacking with existing copies."""
+    return await add_item_function(server_id=server_id, player_id=player_id, item_id=item_id, quantity=quantity)
+
+
+async def remove_item_tool(server_id: str, player_id: str, item_id: str, quantity: int = 1) -> Dict[str, Any]:
+    """Remove an item from the active character's inventory."""
+    return await remove_item_function(server_id=server_id, player_id=player_id, item_id=item_id, quantity=quantity)
+
+
+async def equip_item_tool(server_id: str, player_id: str, item_id: str, slot: str) -> Dict[str, Any]:
+    """Equip an item into a slot (head, chest, legs, arms, accessory1, accessory2, left_hand, right_hand)."""
+    return await equip_item_function(server_id=server_id, player_id=player_id, item_id=item_id, slot=slot)
+
+
+async def unequip_item_tool(server_id: str, player_id: str, slot: str) -> Dict[str, Any]:
+    """Unequip the item in a slot and return it to the inventory."""
+    return await unequip_item_function(server_id=server_id, player_id=player_id, slot=slot)
+
+
+async def use_consumable_tool(server_id: str, player_id: str, item_id: str) -> Dict[str, Any]:
+    """Use one consumable and apply its effects, including in an ongoing combat."""
+    return await use_consumable_function(server_id=server_id, player_id=player_id, item_id=item_id)
+
+
+async def transfer_item_tool(
+    server_id: str,
+    player_id: str,
+    target_player_id: str,
+    item_id: Optional[str] = None,
+    quantity: int = 1,
+    currency: int = 0
+) -> Dict[str, Any]:
+    """Give items and/or currency from the active character to another player's active character, atomically."""
+    return await transfer_item_function(
+        server_id=server_id, player_id=player_id, target_player_id=target_player_id,
+        item_id=item_id, quantity=quantity, currency=currency
+    )
+
+
+async def transfer_batch_tool(server_id: str, player_id: str, transfers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Give many items/currency amounts from the active character at once, e.g. a party loot split;
+    all of them happen or none do. Each transfer is {"to_player_id", "item_id", "quantity", "currency"}."""
+    return await transfer_batch_function(server_id=server_id, player_id=player_id, transfers=transfers)
+
+
+async def sort_inventory_tool(server_id: str, player_id: str, sort_by: str = "item_name", descending: bool = False) -> Dict[str, Any]:
+    """Sort every inventory section by item_name, item_type or quantity."""
+    return await sort_inventory_function(server_id=server_id, player_id=player_id, sort_by=sort_by, descending=descending)
+
+
+async def get_equipment_stats_tool(server_id: str, player_id: str) -> Dict[str, Any]:
+    """Get the active character's effective damage/defense and the bonuses from equipped items."""
+    return await get_equipment_stats_function(server_id=server_id, player_id=player_id)
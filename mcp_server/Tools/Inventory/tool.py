@@ -0,0 +1,405 @@
+"""
+Inventory tools for the active character.
+
+Every write is a single find_one_and_update on the character document. Stacking,
+removal, equip/unequip swaps and sorting are expressed as update pipelines, so the
+server does the read-modify-write atomically and the tool never round-trips the
+document. Guards in the filter (e.g. "has at least N of this item") make a
+concurrent or invalid request match nothing instead of corrupting the inventory.
+The post-image refreshes the character cache, so reads stay warm. Equip and
+unequip recompute the stored derived stats (see Mechanics.derived_stats) in the
+same update.
+
+Requires MongoDB 5.2 or newer: sort_inventory_tool uses the $sortArray operator.
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from config.logging_config import setup_logging
+from ..Mechanics.connection import mongo_registry
+from ..Mechanics.character_cache import character_cache
+from ..Mechanics.DAO import CharacterDAO
+from ..Mechanics.derived_stats import DERIVED_STATS_STAGE, EQUIPMENT_SLOTS, INVENTORY_SECTIONS, derived_stats
+from ..Item.tools import read_item_tool
+from ..Combat.state import combat_state_store
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SECTION_BY_ITEM_TYPE = {
+    "weapon": "equipment", "armor": "equipment", "armour": "equipment", "shield": "equipment",
+    "accessory": "equipment", "equipment": "equipment",
+    "consumable": "consumables", "potion": "consumables", "food": "consumables", "scroll": "consumables",
+    "material": "cratable", "ingredient": "cratable", "crafting": "cratable", "reagent": "cratable",
+    "key": "key_items", "key_item": "key_items", "quest": "key_items",
+}
+SORT_KEYS = ("item_name", "item_type", "quantity")
+
+
+def section_for(item_type: Optional[str]) -> str:
+    return SECTION_BY_ITEM_TYPE.get((item_type or "").lower(), "misc")
+
+
+def active_character_filter(server_id: str, player_id: str) -> Dict[str, Any]:
+    return {"player.server_id": server_id, "player.player_id": player_id, "player.active": True}
+
+
+def inventory_entry(item: Dict[str, Any], quantity: int) -> Dict[str, Any]:
+    # Inventory entries embed what inventory and combat math need, so no item lookup is required later
+    return {
+        "item_id": item["item_id"],
+        "item_name": item.get("item_name"),
+        "item_type": item.get("item_type"),
+        "quantity": quantity,
+        "effects": item.get("effects") or {},
+    }
+
+
+def stack_add(array: Any, entry: Any, item_id: Any, quantity: Any) -> Dict[str, Any]:
+    """Pipeline expression: add quantity to the stack with item_id, or append entry"""
+    array = {"$ifNull": [array, []]}
+    return {"$cond": [
+        {"$in": [item_id, {"$map": {"input": array, "as": "e", "in": "$$e.item_id"}}]},
+        {"$map": {"input": array, "as": "e", "in": {"$cond": [
+            {"$eq": ["$$e.item_id", item_id]},
+            {"$mergeObjects": ["$$e", {"quantity": {"$add": ["$$e.quantity", quantity]}}]},
+            "$$e",
+        ]}}},
+        {"$concatArrays": [array, [entry]]},
+    ]}
+
+
+def stack_take(array: Any, item_id: Any, quantity: Any) -> Dict[str, Any]:
+    """Pipeline expression: take quantity from the stack with item_id, dropping empty stacks"""
+    return {"$filter": {
+        "input": {"$map": {"input": {"$ifNull": [array, []]}, "as": "e", "in": {"$cond": [
+            {"$eq": ["$$e.item_id", item_id]},
+            {"$mergeObjects": ["$$e", {"quantity": {"$subtract": ["$$e.quantity", quantity]}}]},
+            "$$e",
+        ]}}},
+        "as": "e",
+        "cond": {"$gt": ["$$e.quantity", 0]},
+    }}
+
+
+def has_stack(item_id: str, quantity: int, sections: Tuple[str, ...] = INVENTORY_SECTIONS) -> Dict[str, Any]:
+    match = {"item_id": item_id, "quantity": {"$gte": quantity}}
+    return {"$or": [{f"inventory.{section}": {"$elemMatch": match}} for section in sections]}
+
+
+async def _apply(filter: Dict[str, Any], update: Any) -> Optional[Dict[str, Any]]:
+    # One round trip; the full post-image keeps the character cache warm
+    collection = mongo_registry.get_collection("characters")
+    character = await mongo_registry.run(
+        collection.find_one_and_update, filter, update, return_document=ReturnDocument.AFTER
+    )
+    if character:
+        character_cache.refresh(character)
+    return character
+
+
+def _inventory_view(character: Dict[str, Any]) -> Dict[str, Any]:
+    return {"inventory": character.get("inventory", {}), "equipped": character.get("equipped", {})}
+
+
+async def load_item(item_id: str) -> Optional[Dict[str, Any]]:
+    # Served from the in-memory item catalog
+    result = await read_item_tool({"item_id": item_id})
+    return result.get("item")
+
+
+async def item_section(server_id: str, player_id: str, item_id: str) -> Optional[str]:
+    """The inventory section an item lives in: from the catalog, or from the held entry if the item was deleted"""
+    item = await load_item(item_id)
+    if item:
+        return section_for(item.get("item_type"))
+    character = await CharacterDAO().get_player(server_id, player_id, projection="inventory")
+    for section in INVENTORY_SECTIONS:
+        for entry in ((character or {}).get("inventory") or {}).get(section) or []:
+            if isinstance(entry, dict) and entry.get("item_id") == item_id:
+                return section
+    return None
+
+
+async def _miss_reason(server_id: str, player_id: str) -> str:
+    # Only called after a guarded update matched nothing, to say why
+    character = await CharacterDAO().get_player(server_id, player_id, projection="inventory")
+    return "Character not found" if not character else "Not enough of that item"
+
+
+async def get_inventory_tool(server_id: str, player_id: str, section: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get the active character's inventory and equipped items.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    Optional fields:
+    - section: Only return one section (equipment, consumables, misc, cratable, key_items)
+    Returns:
+    - Dict with the inventory or error message
+    """
+    try:
+        if section and section not in INVENTORY_SECTIONS:
+            return {"success": False, "error": f"Unknown section: {section}. Sections: {', '.join(INVENTORY_SECTIONS)}"}
+        character = await CharacterDAO().get_player(server_id, player_id, projection="inventory")
+        if not character:
+            return {"success": False, "error": "Character not found"}
+        view = _inventory_view(character)
+        if section:
+            return {"success": True, section: view["inventory"].get(section, [])}
+        return {"success": True, **view}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to get inventory: {str(e)}"}
+
+
+async def add_item_tool(server_id: str, player_id: str, item_id: str, quantity: int = 1) -> Dict[str, Any]:
+    """
+    Add an item to the active character's inventory, stacking with existing copies.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    - item_id: ID of the item
+    Optional fields:
+    - quantity: How many to add (default 1)
+    Returns:
+    - Dict with the updated section or error message
+    """
+    try:
+        if quantity < 1:
+            return {"success": False, "error": "Quantity must be at least 1"}
+        item = await load_item(item_id)
+        if not item:
+            return {"success": False, "error": "Item not found"}
+        section = section_for(item.get("item_type"))
+        path = f"inventory.{section}"
+        character = await _apply(active_character_filter(server_id, player_id), [
+            {"$set": {path: stack_add(f"${path}", {"$literal": inventory_entry(item, quantity)}, {"$literal": item_id}, quantity)}},
+        ])
+        if not character:
+            return {"success": False, "error": "Character not found"}
+        return {"success": True, "message": f"Added {quantity} x {item.get('item_name')}", section: character["inventory"][section]}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to add item: {str(e)}"}
+
+
+async def remove_item_tool(server_id: str, player_id: str, item_id: str, quantity: int = 1) -> Dict[str, Any]:
+    """
+    Remove an item from the active character's inventory.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    - item_id: ID of the item
+    Optional fields:
+    - quantity: How many to remove (default 1); fails if the character has fewer
+    Returns:
+    - Dict with the updated inventory or error message
+    """
+    try:
+        if quantity < 1:
+            return {"success": False, "error": "Quantity must be at least 1"}
+        # Guard and take from the item's own section only, so another section's stack is never touched
+        section = await item_section(server_id, player_id, item_id)
+        if not section:
+            return {"success": False, "error": await _miss_reason(server_id, player_id)}
+        path = f"inventory.{section}"
+        character = await _apply(
+            {**active_character_filter(server_id, player_id), **has_stack(item_id, quantity, (section,))},
+            [{"$set": {path: stack_take(f"${path}", {"$literal": item_id}, quantity)}}],
+        )
+        if not character:
+            return {"success": False, "error": await _miss_reason(server_id, player_id)}
+        return {"success": True, "message": f"Removed {quantity} item(s)", **_inventory_view(character)}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to remove item: {str(e)}"}
+
+
+async def equip_item_tool(server_id: str, player_id: str, item_id: str, slot: str) -> Dict[str, Any]:
+    """
+    Equip an item from the equipment section into a slot; whatever was in the slot goes back to the inventory.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    - item_id: ID of the item in inventory.equipment
+    - slot: head, chest, legs, arms, accessory1, accessory2, left_hand or right_hand
+    Returns:
+    - Dict with the updated equipment and equipped items or error message
+    """
+    try:
+        if slot not in EQUIPMENT_SLOTS:
+            return {"success": False, "error": f"Unknown slot: {slot}. Slots: {', '.join(EQUIPMENT_SLOTS)}"}
+        item_id_expr = {"$literal": item_id}
+        previous_back = stack_add(
+            "$inventory.equipment", {"$mergeObjects": ["$_previous", {"quantity": 1}]}, "$_previous.item_id", 1
+        )
+        character = await _apply(
+            {**active_character_filter(server_id, player_id), **has_stack(item_id, 1, ("equipment",))},
+            [
+                # Step 1: Remember the item being equipped and the one being replaced
+                {"$set": {
+                    "_equipping": {"$arrayElemAt": [{"$filter": {
+                        "input": "$inventory.equipment", "as": "e", "cond": {"$eq": ["$$e.item_id", item_id_expr]},
+                    }}, 0]},
+                    "_previous": f"$equipped.{slot}",
+                }},
+                # Step 2: Take one copy out of the equipment section
+                {"$set": {"inventory.equipment": stack_take("$inventory.equipment", item_id_expr, 1)}},
+                # Step 3: Return the replaced item and fill the slot
+                {"$set": {
+                    "inventory.equipment": {"$cond": [
+                        {"$eq": [{"$type": "$_previous"}, "object"]}, previous_back, "$inventory.equipment",
+                    ]},
+                    f"equipped.{slot}": {"$mergeObjects": ["$_equipping", {"quantity": 1}]},
+                }},
+                {"$unset": ["_equipping", "_previous"]},
+                DERIVED_STATS_STAGE,
+            ],
+        )
+        if not character:
+            return {"success": False, "error": await _miss_reason(server_id, player_id)}
+        return {"success": True, "message": f"Equipped item in {slot}", **_inventory_view(character)}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to equip item: {str(e)}"}
+
+
+async def unequip_item_tool(server_id: str, player_id: str, slot: str) -> Dict[str, Any]:
+    """
+    Unequip the item in a slot and put it back into the equipment section.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    - slot: head, chest, legs, arms, accessory1, accessory2, left_hand or right_hand
+    Returns:
+    - Dict with the updated equipment and equipped items or error message
+    """
+    try:
+        if slot not in EQUIPMENT_SLOTS:
+            return {"success": False, "error": f"Unknown slot: {slot}. Slots: {', '.join(EQUIPMENT_SLOTS)}"}
+        character = await _apply(
+            {**active_character_filter(server_id, player_id), f"equipped.{slot}": {"$type": "object"}},
+            [
+                {"$set": {"inventory.equipment": stack_add(
+                    "$inventory.equipment", {"$mergeObjects": [f"$equipped.{slot}", {"quantity": 1}]}, f"$equipped.{slot}.item_id", 1
+                )}},
+                {"$set": {f"equipped.{slot}": None}},
+                DERIVED_STATS_STAGE,
+            ],
+        )
+        if not character:
+            return {"success": False, "error": f"Nothing is equipped in {slot}"}
+        return {"success": True, "message": f"Unequipped {slot}", **_inventory_view(character)}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to unequip item: {str(e)}"}
+
+
+async def use_consumable_tool(server_id: str, player_id: str, item_id: str) -> Dict[str, Any]:
+    """
+    Use one consumable: removes it and applies its effects (heal, cure_status) in the same write.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    - item_id: ID of the item in inventory.consumables
+    Returns:
+    - Dict with the effects applied and remaining consumables or error message
+    """
+    try:
+        item = await load_item(item_id)
+        effects = (item or {}).get("effects") or {}
+        heal = int(effects.get("heal", effects.get("hp", 0)) or 0)
+        updates: Dict[str, Any] = {"inventory.consumables": stack_take("$inventory.consumables", {"$literal": item_id}, 1)}
+        if heal > 0:
+            updates["combat.current_hp"] = {"$min": [
+                {"$ifNull": ["$stats.hp", 100]}, {"$add": [{"$ifNull": ["$combat.current_hp", 0]}, heal]},
+            ]}
+        if effects.get("cure_status"):
+            updates["combat.status_ailment"] = None
+        character = await _apply(
+            {**active_character_filter(server_id, player_id), **has_stack(item_id, 1, ("consumables",))},
+            [{"$set": updates}],
+        )
+        if not character:
+            return {"success": False, "error": await _miss_reason(server_id, player_id)}
+        # During a fight the in-memory combat state is authoritative for HP, so apply it there too
+        # The item is already spent at this point, so a failure here is reported, not returned as an error
+        result = {
+            "success": True,
+            "message": f"Used {(item or {}).get('item_name', item_id)}",
+            "effects": effects,
+            "current_hp": character.get("combat", {}).get("current_hp"),
+            "consumables": character["inventory"]["consumables"],
+        }
+        session_id = character.get("instances", {}).get("session_id")
+        if session_id and heal > 0 and str(session_id) in combat_state_store:
+            try:
+                combat_state_store.apply_action(str(session_id), {"type": "heal", "target": str(character["_id"]), "amount": heal})
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Consumable used but not applied to combat session {session_id}: {e}")
+                result["warning"] = f"Healing was not applied to the combat session: {str(e)}"
+        return result
+    except Exception as e:
+        return {"success": False, "error": f"Failed to use consumable: {str(e)}"}
+
+
+async def sort_inventory_tool(server_id: str, player_id: str, sort_by: str = "item_name", descending: bool = False) -> Dict[str, Any]:
+    """
+    Sort every inventory section server-side.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    Optional fields:
+    - sort_by: item_name, item_type or quantity (default item_name)
+    - descending: Sort in descending order
+    Returns:
+    - Dict with the sorted inventory or error message
+    """
+    try:
+        if sort_by not in SORT_KEYS:
+            return {"success": False, "error": f"Unknown sort key: {sort_by}. Keys: {', '.join(SORT_KEYS)}"}
+        order = -1 if descending else 1
+        character = await _apply(active_character_filter(server_id, player_id), [{"$set": {
+            f"inventory.{section}": {"$sortArray": {
+                "input": {"$ifNull": [f"$inventory.{section}", []]}, "sortBy": {sort_by: order, "item_id": 1},
+            }}
+            for section in INVENTORY_SECTIONS
+        }}])
+        if not character:
+            return {"success": False, "error": "Character not found"}
+        return {"success": True, **_inventory_view(character)}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to sort inventory: {str(e)}"}
+
+
+async def get_equipment_stats_tool(server_id: str, player_id: str) -> Dict[str, Any]:
+    """
+    Get the active character's effective damage/defense, effective base stats and the bonuses granted by equipped items.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the player
+    Returns:
+    - Dict with per-slot items, effective damage/defense, effective stats and summed bonuses or error message
+    """
+    try:
+        character = await CharacterDAO().get_player(server_id, player_id, projection="inventory")
+        if not character:
+            return {"success": False, "error": "Character not found"}
+        # Precomputed on every equip/unequip; nothing is summed or joined here
+        derived = derived_stats(character)
+        return {
+            "success": True,
+            "equipped": {slot: (entry or {}).get("item_name") for slot, entry in character.get("equipped", {}).items()},
+            "damage": derived["damage"],
+            "defense": derived["defense"],
+            "stats": derived["stats"],
+            "bonuses": derived.get("bonuses", {}),
+        }
+    except Exception as e:
+        return {"success": False, "error": f"Failed to get equipment stats: {str(e)}"}
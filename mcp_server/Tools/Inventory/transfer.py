@@ -0,0 +1,354 @@
+"""
+Transactional item and currency transfers between characters.
+
+A batch of transfers (a single trade, or a whole party loot split) is netted per
+character first, so each participant gets exactly one guarded update no matter
+how many items move. Debits are guarded in the filter ("holds at least N",
+"has at least this much currency"). All updates go out as one ordered bulk_write
+inside a multi-document transaction, so a batch costs one round trip plus the
+commit. If any guard fails, nothing is written, which rules out double-spending.
+Write conflicts between concurrent trades are retried by the driver's
+with_transaction and counted as contention.
+
+Standalone servers have no transactions. There the engine falls back to an
+ordered protocol instead. Participants are updated in player_id order, debits
+before credits, and any applied debits are compensated if a later step fails.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from config.logging_config import setup_logging
+from ..Mechanics.connection import mongo_registry
+from ..Mechanics.character_cache import character_cache
+from .tool import active_character_filter, has_stack, inventory_entry, load_item, section_for, stack_add, stack_take
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+TRANSFER_USE_TRANSACTIONS = os.environ.get("TRANSFER_USE_TRANSACTIONS", "true").lower() in ["true", "1", "yes", "on"]
+TRANSFER_MAX_BATCH = int(os.environ.get("TRANSFER_MAX_BATCH", "200"))
+
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos"
+_ILLEGAL_OPERATION = 20
+
+
+class TransferRejected(Exception):
+    """A guard failed: a sender lacks the items or currency, or a character is missing"""
+
+
+@dataclass
+class Transfer:
+    """Move quantity of item_id and/or an amount of currency from one player's active character to another's"""
+    from_player_id: str
+    to_player_id: str
+    item_id: Optional[str] = None
+    quantity: int = 0
+    currency: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Transfer":
+        item_id = data.get("item_id")
+        return cls(
+            from_player_id=str(data["from_player_id"]),
+            to_player_id=str(data["to_player_id"]),
+            item_id=item_id,
+            quantity=int(data.get("quantity", 1 if item_id else 0)),
+            currency=int(data.get("currency", 0)),
+        )
+
+    def validate(self) -> Optional[str]:
+        if self.from_player_id == self.to_player_id:
+            return "Cannot transfer to the same player"
+        if self.quantity < 0 or self.currency < 0:
+            return "Quantity and currency cannot be negative"
+        if self.item_id and self.quantity < 1:
+            return "Quantity must be at least 1"
+        if not self.item_id and not self.currency:
+            return "A transfer must move an item or currency"
+        return None
+
+
+@dataclass
+class _Participant:
+    """Net change of one character across a whole batch"""
+    player_id: str
+    items: Dict[str, int] = field(default_factory=dict)
+    currency: int = 0
+
+    @property
+    def debits(self) -> bool:
+        return self.currency < 0 or any(delta < 0 for delta in self.items.values())
+
+    def inverse(self) -> "_Participant":
+        return _Participant(self.player_id, {item_id: -delta for item_id, delta in self.items.items()}, -self.currency)
+
+
+def net_transfers(transfers: List[Transfer]) -> List[_Participant]:
+    """Collapse a batch into one net change per character, in player_id order"""
+    participants: Dict[str, _Participant] = {}
+    for transfer in transfers:
+        sender = participants.setdefault(transfer.from_player_id, _Participant(transfer.from_player_id))
+        receiver = participants.setdefault(transfer.to_player_id, _Participant(transfer.to_player_id))
+        if transfer.item_id:
+            sender.items[transfer.item_id] = sender.items.get(transfer.item_id, 0) - transfer.quantity
+            receiver.items[transfer.item_id] = receiver.items.get(transfer.item_id, 0) + transfer.quantity
+        sender.currency -= transfer.currency
+        receiver.currency += transfer.currency
+    for participant in participants.values():
+        participant.items = {item_id: delta for item_id, delta in participant.items.items() if delta}
+    # Characters whose changes cancel out are not written at all
+    return [participants[p] for p in sorted(participants) if participants[p].items or participants[p].currency]
+
+
+def participant_update(
+    server_id: str,
+    participant: _Participant,
+    items: Dict[str, Dict[str, Any]],
+    guarded: bool = True,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Filter and update pipeline applying one participant's net change in a single write"""
+    filter = active_character_filter(server_id, participant.player_id)
+    guards = []
+    pipeline: List[Dict[str, Any]] = []
+    for item_id, delta in sorted(participant.items.items()):
+        item_id_expr = {"$literal": item_id}
+        # Debits and credits both touch only the item's own section
+        section = section_for(items[item_id].get("item_type"))
+        path = f"inventory.{section}"
+        if delta < 0:
+            guards.append(has_stack(item_id, -delta, (section,)))
+            pipeline.append({"$set": {path: stack_take(f"${path}", item_id_expr, -delta)}})
+        else:
+            pipeline.append({"$set": {
+                path: stack_add(f"${path}", {"$literal": inventory_entry(items[item_id], delta)}, item_id_expr, delta)
+            }})
+    if participant.currency:
+        if participant.currency < 0:
+            guards.append({"inventory.currency": {"$gte": -participant.currency}})
+        pipeline.append({"$set": {"inventory.currency": {"$add": [{"$ifNull": ["$inventory.currency", 0]}, participant.currency]}}})
+    if guarded and guards:
+        filter["$and"] = guards
+    return filter, pipeline
+
+
+class TransferEngine:
+    """Executes transfer batches and keeps contention metrics"""
+
+    def __init__(self, use_transactions: bool = TRANSFER_USE_TRANSACTIONS):
+        self.use_transactions = use_transactions
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.committed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.transfers = 0
+        self.writes = 0
+        self.conflict_retries = 0
+        self.max_attempts = 0
+        self.compensations = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    async def execute(self, server_id: str, transfers: List[Transfer]) -> Dict[str, Any]:
+        """
+        Apply every transfer in the batch or none of them.
+
+        Returns:
+            Dict with success status, how many characters were written and the number of attempts, or error message
+        """
+        if not transfers:
+            return {"success": False, "error": "No transfers provided"}
+        if len(transfers) > TRANSFER_MAX_BATCH:
+            return {"success": False, "error": f"At most {TRANSFER_MAX_BATCH} transfers per batch"}
+        for transfer in transfers:
+            error = transfer.validate()
+            if error:
+                return {"success": False, "error": error}
+
+        # Step 1: Snapshot the moved items from the in-memory item catalog
+        item_ids = sorted({t.item_id for t in transfers if t.item_id})
+        loaded = await asyncio.gather(*(load_item(item_id) for item_id in item_ids))
+        items = {item_id: item for item_id, item in zip(item_ids, loaded) if item}
+        missing = [item_id for item_id in item_ids if item_id not in items]
+        if missing:
+            return {"success": False, "error": f"Item not found: {', '.join(missing)}"}
+
+        # Step 2: Net the batch to one guarded update per character
+        participants = net_transfers(transfers)
+        started = time.perf_counter()
+        try:
+            if self.use_transactions:
+                try:
+                    attempts = await mongo_registry.run(self._commit_transaction, server_id, participants, items)
+                except OperationFailure as e:
+                    if e.code != _ILLEGAL_OPERATION:
+                        raise
+                    logger.warning("MongoDB does not support transactions here; using ordered transfers")
+                    self.use_transactions = False
+            if not self.use_transactions:
+                attempts = await mongo_registry.run(self._commit_ordered, server_id, participants, items)
+        except TransferRejected as e:
+            self._record(started, len(transfers), outcome="rejected")
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            self._record(started, len(transfers), outcome="failed")
+            logger.error(f"Transfer batch failed: {e}")
+            return {"success": False, "error": f"Transfer failed: {str(e)}"}
+        finally:
+            # Step 3: Drop cached copies of everyone involved, whatever the outcome
+            for participant in participants:
+                character_cache.invalidate(server_id, participant.player_id)
+
+        self._record(started, len(transfers), outcome="committed", writes=len(participants), attempts=attempts)
+        return {"success": True, "transfers": len(transfers), "characters_updated": len(participants), "attempts": attempts}
+
+    def _commit_transaction(self, server_id: str, participants: List[_Participant], items: Dict[str, Dict[str, Any]]) -> int:
+        collection = mongo_registry.get_collection("characters")
+        operations = [UpdateOne(*participant_update(server_id, p, items)) for p in participants]
+        attempts = 0
+
+        def callback(session) -> None:
+            nonlocal attempts
+            attempts += 1
+            result = collection.bulk_write(operations, ordered=True, session=session)
+            if result.matched_count != len(operations):
+                # Raising aborts the transaction, so none of the batch is applied
+                raise TransferRejected()
+
+        try:
+            with mongo_registry.get_client().start_session() as session:
+                session.with_transaction(
+                    callback,
+                    read_concern=ReadConcern("snapshot"),
+                    write_concern=WriteConcern("majority"),
+                )
+        except TransferRejected:
+            # Diagnose against committed data, outside the aborted transaction
+            raise TransferRejected(self._rejection_reason(collection, server_id, participants, items))
+        return attempts
+
+    def _commit_ordered(self, server_id: str, participants: List[_Participant], items: Dict[str, Dict[str, Any]]) -> int:
+        collection = mongo_registry.get_collection("characters")
+        # Debits first, so a failed guard never leaves a credit without its debit
+        ordered = [p for p in participants if p.debits] + [p for p in participants if not p.debits]
+        applied: List[_Participant] = []
+        for participant in ordered:
+            result = collection.update_one(*participant_update(server_id, participant, items))
+            if result.matched_count:
+                applied.append(participant)
+                continue
+            reason = self._rejection_reason(collection, server_id, participants, items)
+            for done in reversed(applied):
+                collection.update_one(*participant_update(server_id, done.inverse(), items, guarded=False))
+                with self._lock:
+                    self.compensations += 1
+            raise TransferRejected(reason)
+        return 1
+
+    @staticmethod
+    def _rejection_reason(collection, server_id: str, participants: List[_Participant], items: Dict[str, Dict[str, Any]]) -> str:
+        # Only runs on the failure path: find the first participant whose guard does not hold
+        for participant in participants:
+            if not collection.find_one(active_character_filter(server_id, participant.player_id), {"_id": 1}):
+                return f"No active character for player {participant.player_id}"
+            guard, _ = participant_update(server_id, participant, items)
+            if not collection.find_one(guard, {"_id": 1}):
+                return f"Player {participant.player_id} does not have enough items or currency"
+        return "Transfer conflicted with another change; try again"
+
+    def _record(self, started: float, transfers: int, outcome: str, writes: int = 0, attempts: int = 0) -> None:
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.batches += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.transfers += transfers if outcome == "committed" else 0
+            self.writes += writes
+            self.conflict_retries += max(attempts - 1, 0)
+            self.max_attempts = max(self.max_attempts, attempts)
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "transaction" if self.use_transactions else "ordered",
+                "batches": self.batches,
+                "committed": self.committed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "transfers": self.transfers,
+                "writes": self.writes,
+                "conflict_retries": self.conflict_retries,
+                "conflict_rate": round(self.conflict_retries / self.batches, 4) if self.batches else 0.0,
+                "max_attempts": self.max_attempts,
+                "compensations": self.compensations,
+                "avg_ms": round(self.total_ms / self.batches, 3) if self.batches else 0.0,
+                "max_ms": round(self.max_ms, 3),
+            }
+
+
+# Global transfer engine shared by the inventory tools
+transfer_engine = TransferEngine()
+
+
+async def transfer_item_tool(
+    server_id: str,
+    player_id: str,
+    target_player_id: str,
+    item_id: Optional[str] = None,
+    quantity: int = 1,
+    currency: int = 0,
+) -> Dict[str, Any]:
+    """
+    Give items and/or currency from the active character to another player's active character, atomically.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the giving player
+    - target_player_id: UUID string for the receiving player
+    Optional fields:
+    - item_id: ID of the item to give
+    - quantity: How many to give (default 1)
+    - currency: Amount of currency to give
+    Returns:
+    - Dict with success status or error message
+    """
+    try:
+        transfer = Transfer(player_id, target_player_id, item_id, quantity if item_id else 0, currency)
+        return await transfer_engine.execute(server_id, [transfer])
+    except Exception as e:
+        return {"success": False, "error": f"Failed to transfer item: {str(e)}"}
+
+
+async def transfer_batch_tool(server_id: str, player_id: str, transfers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Give many items and/or currency amounts from the active character (e.g. splitting loot
+    across the party) in one all-or-nothing commit.
+
+    Required fields:
+    - server_id: UUID string for the server
+    - player_id: UUID string for the giving player; every transfer must come from this player
+    - transfers: List of {"to_player_id", "item_id"?, "quantity"?, "currency"?}; "from_player_id" defaults to player_id
+    Returns:
+    - Dict with success status or error message
+    """
+    try:
+        batch = [Transfer.from_dict({"from_player_id": player_id, **t}) for t in transfers]
+        # Only the caller's own character may be debited
+        if any(transfer.from_player_id != player_id for transfer in batch):
+            return {"success": False, "error": "Transfers can only be made from your own character"}
+        return await transfer_engine.execute(server_id, batch)
+    except (KeyError, TypeError, ValueError) as e:
+        return {"success": False, "error": f"Invalid transfer: {str(e)}"}
+    except Exception as e:
+        return {"success": False, "error": f"Failed to transfer items: {str(e)}"}
@@ -1,11 +1,17 @@
-from .tools import (
-    create_item_tool, read_item_tool, 
-    update_item_tool, delete_item_tool
+from .adk_tool import (
+    create_item_tool, create_items_tool, read_item_tool, get_item_tool,
+    update_item_tool, delete_item_tool, search_items_tool, find_items_tool,
+    craftable_items_tool, get_recipe_tool
     )
 
 TOOLS = [
     create_item_tool,
+    create_items_tool,
     read_item_tool,
     update_item_tool,
-    delete_item_tool
+    delete_item_tool,
+    search_items_tool,
+    find_items_tool,
+    craftable_items_tool,
+    get_recipe_tool
 ]
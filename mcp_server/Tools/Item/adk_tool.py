@@ -0,0 +1,87 @@
+"""
+ADK-compatible tool wrapper for item management.
+This module provides simple callable functions for ADK agents.
+"""
+
+from typing import Optional, Dict, Any, List
+from .tools import (
+    create_item_tool as create_item_function,
+    create_items_tool as create_items_function,
+    read_item_tool as read_item_function,
+    update_item_tool as update_item_function,
+    delete_item_tool as delete_item_function,
+    search_items_tool as search_items_function,
+    find_items_tool as find_items_function,
+    craftable_items_tool as craftable_items_function,
+    get_recipe_tool as get_recipe_function
+)
+
+async def create_item_tool(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Create an item. Requires item_name, item_type, rarity and server_id; other fields are optional."""
+    return await create_item_function(item=item)
+
+
+async def create_items_tool(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create many items at once (loot drops, bulk grants) in batched inserts."""
+    return await create_items_function(items=items)
+
+
+async def read_item_tool(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Read an item by item_id, or by item_name (optionally with server_id)."""
+    return await read_item_function(item=item)
+
+
+async def get_item_tool(
+    server_id: str,
+    item_id: Optional[str] = None,
+    item_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """Retrieve an item record by ID or name."""
+    return await read_item_function(item={"server_id": server_id, "item_id": item_id, "item_name": item_name})
+
+
+async def update_item_tool(
+    updates: Dict[str, Any],
+    item_id: Optional[str] = None,
+    item_name: Optional[str] = None,
+    server_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Update fields of an item identified by item_id, or by item_name and server_id."""
+    return await update_item_function(item={"item_id": item_id, "item_name": item_name, "server_id": server_id, "updates": updates})
+
+
+async def delete_item_tool(
+    item_id: Optional[str] = None,
+    item_name: Optional[str] = None,
+    server_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Delete an item identified by item_id, or by item_name and server_id."""
+    return await delete_item_function(item={"item_id": item_id, "item_name": item_name, "server_id": server_id})
+
+
+async def search_items_tool(
+    query: str,
+    server_id: Optional[str] = None,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """Find items by full or partial name; tolerates case differences and typos."""
+    return await search_items_function(query=query, server_id=server_id, limit=limit)
+
+
+async def find_items_tool(
+    query: str,
+    server_id: Optional[str] = None,
+    limit: int = 10
+) -> Dict[str, Any]:
+    """Find items by description, effects or requirements, e.g. "fire resistant boots"; best matches first."""
+    return await find_items_function(query=query, server_id=server_id, limit=limit)
+
+
+async def craftable_items_tool(server_id: str, player_id: str, limit: int = 25) -> Dict[str, Any]:
+    """List what the player's active character can craft right now from their inventory."""
+    return await craftable_items_function(server_id=server_id, player_id=player_id, limit=limit)
+
+
+async def get_recipe_tool(item_id: str) -> Dict[str, Any]:
+    """Get an item's direct ingredients and the raw materials it needs."""
+    return await get_recipe_function(item_id=item_id)
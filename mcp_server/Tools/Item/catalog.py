@@ -0,0 +1,324 @@
+"""
+In-memory item catalog index.
+
+All item documents are loaded once (one read_many) and indexed by item_id,
+normalized name (hash lookup), a prefix trie for autocomplete and a character
+trigram index that shortlists candidates for typo-tolerant fuzzy matching. The
+item tools update the index on every create/update/delete, and an optional
+change-stream watcher (ITEM_CATALOG_WATCH) keeps other processes in sync, so
+item reads no longer go to MongoDB.
+"""
+import asyncio
+import copy
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..Mechanics.connection import mongo_registry
+from ..Mechanics.database import Database
+
+logger = logging.getLogger(__name__)
+
+ITEM_CATALOG_WATCH = os.environ.get("ITEM_CATALOG_WATCH", "").lower() in ["true", "1", "yes", "on"]
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_item_name(name: str) -> str:
+    """Lowercase and collapse punctuation/whitespace: 'Iron  Sword!' -> 'iron sword'"""
+    return _NON_WORD.sub(" ", (name or "").lower()).strip()
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance with adjacent transpositions; returns limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.names: Set[str] = set()
+
+
+class ItemCatalog:
+    """Process-wide item index kept in sync with the item tools' writes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._loaded = False
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._oids: Dict[str, str] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._trie = _TrieNode()
+        self._grams: Dict[str, Set[str]] = {}
+        self._watcher: Optional[threading.Thread] = None
+        # Bumped on every change so derived indexes (e.g. the crafting graph) know to rebuild
+        self.version = 0
+        # Indexes updated alongside this one (e.g. the full-text index): callback(event, payload)
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def ensure_loaded(self) -> None:
+        """Load every item once; concurrent callers wait for the same load"""
+        if self._loaded:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded:
+                return
+            docs = await Database("items").read_many({})
+            self.load(docs)
+            if ITEM_CATALOG_WATCH:
+                self.start_watcher()
+
+    def load(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """Replace the whole index with docs"""
+        with self._lock:
+            self._items.clear()
+            self._oids.clear()
+            self._by_name.clear()
+            self._trie = _TrieNode()
+            self._grams.clear()
+            for doc in docs:
+                self._add(doc)
+            self._loaded = True
+            self.version += 1
+            self._notify("load", list(self._items.values()))
+        logger.info(f"Item catalog loaded {len(self._items)} items")
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """Index a created or updated item, replacing any previous version"""
+        if not doc or not doc.get("item_id"):
+            return
+        with self._lock:
+            self._discard(doc["item_id"])
+            self._add(doc)
+            self.version += 1
+            self._notify("upsert", self._items[doc["item_id"]])
+
+    def remove(self, item_id: str) -> None:
+        with self._lock:
+            self._discard(item_id)
+            self.version += 1
+            self._notify("remove", item_id)
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._items.get(item_id)
+        self._count(doc is not None)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def subscribe(self, listener: Callable[[str, Any], None]) -> None:
+        """Call listener("load", docs), ("upsert", doc) or ("remove", item_id) on every change, under the catalog lock"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._loaded:
+                listener("load", list(self._items.values()))
+
+    def _notify(self, event: str, payload: Any) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event, payload)
+            except Exception as e:
+                logger.error(f"Item catalog listener failed on {event}: {e}")
+
+    def snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Current version and a copy of every item, taken atomically"""
+        with self._lock:
+            return self.version, copy.deepcopy(list(self._items.values()))
+
+    def find_by_name(self, name: str, server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Case- and punctuation-insensitive exact name lookup"""
+        with self._lock:
+            docs = self._docs(self._by_name.get(normalize_item_name(name), ()), server_id)
+        self._count(bool(docs))
+        return docs
+
+    def prefix(self, prefix: str, server_id: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Items whose normalized name starts with prefix, shortest names first"""
+        key = normalize_item_name(prefix)
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            node = self._trie
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            # Breadth-first walk: shorter completions come before longer ones
+            frontier = [node]
+            while frontier and len(results) < limit:
+                next_frontier = []
+                for current in frontier:
+                    for name in sorted(current.names):
+                        results.extend(self._docs(self._by_name.get(name, ()), server_id))
+                    next_frontier.extend(current.children[c] for c in sorted(current.children))
+                frontier = next_frontier
+        return results[:limit]
+
+    def fuzzy(self, query: str, server_id: Optional[str] = None, limit: int = 10, max_distance: Optional[int] = None) -> List[Tuple[Dict[str, Any], int]]:
+        """
+        Typo-tolerant lookup.
+
+        Candidates share at least one trigram with the query (via the trigram
+        index, not a full scan) and are ranked by edit distance.
+        """
+        key = normalize_item_name(query)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = 1 if len(key) <= 4 else 2
+        with self._lock:
+            candidates: Dict[str, int] = {}
+            for gram in _trigrams(key):
+                for name in self._grams.get(gram, ()):
+                    candidates[name] = candidates.get(name, 0) + 1
+            scored = []
+            for name in candidates:
+                distance = edit_distance(key, name, max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, -candidates[name], name))
+            scored.sort()
+            results: List[Tuple[Dict[str, Any], int]] = []
+            for distance, _, name in scored:
+                results.extend((doc, distance) for doc in self._docs(self._by_name.get(name, ()), server_id))
+                if len(results) >= limit:
+                    break
+        return results[:limit]
+
+    def search(self, query: str, server_id: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """Exact name match, then prefix completions, then fuzzy matches"""
+        exact = self.find_by_name(query, server_id)
+        if exact:
+            return {"match": "exact", "items": exact[:limit]}
+        completions = self.prefix(query, server_id, limit)
+        if completions:
+            return {"match": "prefix", "items": completions}
+        fuzzy = self.fuzzy(query, server_id, limit)
+        if fuzzy:
+            return {"match": "fuzzy", "items": [{**doc, "distance": distance} for doc, distance in fuzzy]}
+        return {"match": None, "items": []}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._loaded,
+            "items": len(self._items),
+            "names": len(self._by_name),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _docs(self, item_ids: Iterable[str], server_id: Optional[str]) -> List[Dict[str, Any]]:
+        docs = [self._items[i] for i in item_ids if i in self._items]
+        if server_id:
+            docs = [d for d in docs if d.get("server_id") == server_id]
+        return copy.deepcopy(sorted(docs, key=lambda d: d["item_id"]))
+
+    def _add(self, doc: Dict[str, Any]) -> None:
+        doc = dict(doc)
+        oid = doc.pop("_id", None)
+        item_id = doc["item_id"]
+        if oid is not None:
+            self._oids[str(oid)] = item_id
+        self._items[item_id] = doc
+        name = normalize_item_name(doc.get("item_name", ""))
+        if name not in self._by_name:
+            self._by_name[name] = set()
+            node = self._trie
+            for char in name:
+                node = node.children.setdefault(char, _TrieNode())
+            node.names.add(name)
+            for gram in _trigrams(name):
+                self._grams.setdefault(gram, set()).add(name)
+        self._by_name[name].add(item_id)
+
+    def _discard(self, item_id: str) -> None:
+        doc = self._items.pop(item_id, None)
+        if doc is None:
+            return
+        name = normalize_item_name(doc.get("item_name", ""))
+        ids = self._by_name.get(name)
+        if ids is None:
+            return
+        ids.discard(item_id)
+        if ids:
+            return
+        # Last item with this name: drop the name from the trie and trigram index
+        del self._by_name[name]
+        node = self._trie
+        for char in name:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            node.names.discard(name)
+        for gram in _trigrams(name):
+            names = self._grams.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._grams[gram]
+
+    def start_watcher(self) -> None:
+        """Follow the items change stream so writes from other processes reach this index"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_changes, name="item-catalog-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch_changes(self) -> None:
+        collection = mongo_registry.get_collection("items")
+        try:
+            with collection.watch(full_document="updateLookup") as stream:
+                for change in stream:
+                    oid = str(change.get("documentKey", {}).get("_id"))
+                    if change.get("operationType") == "delete":
+                        item_id = self._oids.pop(oid, None)
+                        if item_id:
+                            self.remove(item_id)
+                    elif change.get("fullDocument"):
+                        self.upsert(change["fullDocument"])
+        except Exception as e:
+            logger.warning(f"Item catalog change stream stopped: {e}")
+
+
+# Global item catalog shared by the item tools
+item_catalog = ItemCatalog()
@@ -0,0 +1,294 @@
+"""
+Precomputed crafting graph.
+
+Every item with a non-empty `recipe` becomes a node whose edges point at its
+ingredients. The graph is built from the in-memory item catalog and ordered
+topologically with graphlib. In that order, each recipe's bill of materials
+(the raw ingredients needed once intermediate ingredients are crafted too)
+folds into a single matrix row. Two matrices come out of this:
+
+- `direct`: recipes x ingredients, the quantities a recipe lists
+- `raw`: recipes x ingredients, the fully expanded raw quantities
+
+Both are stored sparse (CSR), since a recipe only lists a few ingredients.
+
+A character's inventory becomes one count vector over the same ingredient
+columns. "What can I craft right now" is then one vectorized comparison
+against every recipe. The index listens to the item catalog and only marks the
+graph stale when a change can affect it (a recipe, an ingredient, or an item
+whose name a recipe refers to); the graph is rebuilt lazily on the next query.
+"""
+import logging
+import threading
+from graphlib import CycleError, TopologicalSorter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog import item_catalog, normalize_item_name
+from ..Mechanics.derived_stats import INVENTORY_SECTIONS
+
+logger = logging.getLogger(__name__)
+
+_UNRESOLVED = "unresolved:"
+
+
+def recipe_ingredients(recipe: Any) -> Dict[str, int]:
+    """Ingredient -> quantity from an item's recipe ({"ingredients": {...}} or a flat dict)"""
+    if not isinstance(recipe, dict):
+        return {}
+    ingredients = recipe.get("ingredients", recipe)
+    if isinstance(ingredients, list):
+        # [{"item_id" or "item_name", "quantity"}]
+        ingredients = {
+            entry.get("item_id") or entry.get("item_name"): entry.get("quantity", 1)
+            for entry in ingredients if isinstance(entry, dict)
+        }
+    if not isinstance(ingredients, dict):
+        return {}
+    result: Dict[str, int] = {}
+    for key, quantity in ingredients.items():
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            continue
+        if key and quantity > 0:
+            result[str(key)] = quantity
+    return result
+
+
+class RecipeMatrix:
+    """
+    Sparse recipes x ingredients matrix in CSR form.
+
+    Recipes list a handful of ingredients, so every per-recipe reduction runs over
+    the non-zero entries only (np.*.reduceat), not over a dense recipes x items grid.
+    Every row has at least one entry.
+    """
+
+    def __init__(self, rows: List[Dict[int, int]]):
+        self.starts = np.zeros(len(rows), dtype=np.int64)
+        columns: List[int] = []
+        quantities: List[int] = []
+        for i, row in enumerate(rows):
+            self.starts[i] = len(columns)
+            for j in sorted(row):
+                columns.append(j)
+                quantities.append(row[j])
+        self.columns = np.array(columns, dtype=np.int64)
+        self.quantities = np.array(quantities, dtype=np.int64)
+        self.ends = np.append(self.starts[1:], len(columns)).astype(np.int64)
+
+    def times(self, counts: np.ndarray) -> np.ndarray:
+        """How many times each recipe can be made: min over its ingredients of have // need"""
+        return np.minimum.reduceat(counts[self.columns] // self.quantities, self.starts)
+
+    def shortfall(self, counts: np.ndarray) -> np.ndarray:
+        """Ingredient units each recipe is missing"""
+        return np.add.reduceat(np.maximum(self.quantities - counts[self.columns], 0), self.starts)
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        span = slice(self.starts[i], self.ends[i])
+        return self.columns[span], self.quantities[span]
+
+
+class CraftingGraph:
+    """One immutable build of the recipe graph"""
+
+    def __init__(self, items: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        names: Dict[Tuple[Optional[str], str], List[str]] = {}
+        for item in items:
+            names.setdefault((item.get("server_id"), normalize_item_name(item.get("item_name", ""))), []).append(item["item_id"])
+        by_id = {item["item_id"]: item for item in items}
+        # (server, name) keys recipes refer to by name; a new or renamed item with one of them can change the graph
+        self.referenced_names: set = set()
+
+        # Step 1: Resolve every recipe's ingredients to item ids (names are looked up on the product's server)
+        edges: Dict[str, Dict[str, int]] = {}
+        for item in items:
+            ingredients = recipe_ingredients(item.get("recipe"))
+            if not ingredients:
+                continue
+            resolved: Dict[str, int] = {}
+            for key, quantity in ingredients.items():
+                if key in by_id:
+                    ingredient_id = key
+                else:
+                    self.referenced_names.add((item.get("server_id"), normalize_item_name(key)))
+                    matches = names.get((item.get("server_id"), normalize_item_name(key)), [])
+                    ingredient_id = matches[0] if len(matches) == 1 else f"{_UNRESOLVED}{normalize_item_name(key)}"
+                resolved[ingredient_id] = resolved.get(ingredient_id, 0) + quantity
+            edges[item["item_id"]] = resolved
+
+        # Step 2: Order ingredients before the things made from them, dropping recipes that form cycles
+        order = self._topological_order(edges)
+        self.recipes = [item_id for item_id in order if item_id in edges]
+        self.items = {item_id: by_id[item_id] for item_id in self.recipes}
+        self.row = {item_id: i for i, item_id in enumerate(self.recipes)}
+        columns = sorted({ingredient for resolved in edges.values() for ingredient in resolved} | set(self.recipes))
+        self.columns = columns
+        self.column = {item_id: j for j, item_id in enumerate(columns)}
+        self.column_names = [
+            column[len(_UNRESOLVED):] if column.startswith(_UNRESOLVED) else by_id[column].get("item_name", column)
+            for column in columns
+        ]
+        self.server_ids = np.array([self.items[item_id].get("server_id") or "" for item_id in self.recipes], dtype=object)
+
+        # Step 3: Direct and fully expanded ingredient rows, filled in topological order
+        direct_rows: List[Dict[int, int]] = []
+        raw_rows: List[Dict[int, int]] = []
+        for item_id in self.recipes:
+            direct: Dict[int, int] = {}
+            raw: Dict[int, int] = {}
+            for ingredient_id, quantity in edges[item_id].items():
+                j = self.column[ingredient_id]
+                direct[j] = direct.get(j, 0) + quantity
+                if ingredient_id in self.row:
+                    # Already expanded: its row precedes this one in topological order
+                    for k, amount in raw_rows[self.row[ingredient_id]].items():
+                        raw[k] = raw.get(k, 0) + quantity * amount
+                else:
+                    raw[j] = raw.get(j, 0) + quantity
+            direct_rows.append(direct)
+            raw_rows.append(raw)
+        self.direct = RecipeMatrix(direct_rows)
+        self.raw = RecipeMatrix(raw_rows)
+
+    @staticmethod
+    def _topological_order(edges: Dict[str, Dict[str, int]]) -> List[str]:
+        graph = {product: set(ingredients) for product, ingredients in edges.items()}
+        while True:
+            try:
+                return list(TopologicalSorter(graph).static_order())
+            except CycleError as e:
+                cycle = e.args[1]
+                logger.warning(f"Ignoring recipes in a crafting cycle: {' -> '.join(cycle)}")
+                for item_id in cycle:
+                    graph.pop(item_id, None)
+                    edges.pop(item_id, None)
+
+    def counts(self, inventory: Dict[str, Any]) -> np.ndarray:
+        """Ingredient count vector for an inventory document"""
+        vector = np.zeros(len(self.columns), dtype=np.int64)
+        for section in INVENTORY_SECTIONS:
+            for entry in (inventory or {}).get(section) or []:
+                j = self.column.get(entry.get("item_id")) if isinstance(entry, dict) else None
+                if j is not None:
+                    vector[j] += int(entry.get("quantity", 1) or 0)
+        return vector
+
+    def craftable(self, counts: np.ndarray, server_id: Optional[str] = None, limit: int = 25) -> Dict[str, Any]:
+        """
+        Every recipe checked against counts in one pass.
+
+        Returns:
+            Dict with `now` (craftable from what is held), `with_intermediates` (craftable by
+            first crafting intermediate ingredients from raw materials) and `almost`
+            (missing at most two ingredient units), each capped at limit
+        """
+        if not self.recipes:
+            return {"now": [], "with_intermediates": [], "almost": []}
+        now = self.direct.times(counts)
+        expanded = self.raw.times(counts)
+        shortfall = self.direct.shortfall(counts)
+        in_scope = (self.server_ids == server_id) if server_id else np.ones(len(self.recipes), dtype=bool)
+
+        def listing(rows: np.ndarray, times: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+            result = []
+            for i in np.flatnonzero(rows)[:limit]:
+                entry = self._summary(self.recipes[i])
+                if times is not None:
+                    entry["times"] = int(times[i])
+                else:
+                    entry["missing"] = self._missing(i, counts)
+                result.append(entry)
+            return result
+
+        return {
+            "now": listing(in_scope & (now > 0), now),
+            "with_intermediates": listing(in_scope & (now == 0) & (expanded > 0), expanded),
+            "almost": listing(in_scope & (now == 0) & (expanded == 0) & (shortfall <= 2)),
+        }
+
+    def recipe(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Direct ingredients and fully expanded raw materials for one craftable item"""
+        i = self.row.get(item_id)
+        if i is None:
+            return None
+        return {
+            **self._summary(item_id),
+            "ingredients": self._named(*self.direct.row(i)),
+            "raw_materials": self._named(*self.raw.row(i)),
+        }
+
+    def _missing(self, i: int, counts: np.ndarray) -> Dict[str, int]:
+        columns, quantities = self.direct.row(i)
+        return self._named(columns, np.maximum(quantities - counts[columns], 0))
+
+    def _named(self, columns: np.ndarray, quantities: np.ndarray) -> Dict[str, int]:
+        return {self.column_names[j]: int(q) for j, q in zip(columns, quantities) if q}
+
+    def _summary(self, item_id: str) -> Dict[str, Any]:
+        item = self.items[item_id]
+        return {"item_id": item_id, "item_name": item.get("item_name"), "item_type": item.get("item_type")}
+
+
+class CraftingIndex:
+    """Crafting graph kept in step with the item catalog, rebuilt only when a change touches it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graph: Optional[CraftingGraph] = None
+        # Set by catalog events under the catalog lock, so it is a plain flag rather than guarded by self._lock
+        self._stale = True
+        self.rebuilds = 0
+        self.skipped_changes = 0
+
+    def on_catalog_change(self, event: str, payload: Any) -> None:
+        graph = self._graph
+        if event == "load" or graph is None or self._affects(graph, event, payload):
+            self._stale = True
+        else:
+            self.skipped_changes += 1
+
+    @staticmethod
+    def _affects(graph: CraftingGraph, event: str, payload: Any) -> bool:
+        if event == "remove":
+            return payload in graph.row or payload in graph.column
+        if event != "upsert" or not isinstance(payload, dict):
+            return True
+        item_id = payload.get("item_id")
+        return bool(
+            recipe_ingredients(payload.get("recipe"))
+            or item_id in graph.row
+            or item_id in graph.column
+            or (payload.get("server_id"), normalize_item_name(payload.get("item_name", ""))) in graph.referenced_names
+        )
+
+    async def graph(self) -> CraftingGraph:
+        await item_catalog.ensure_loaded()
+        if self._graph is None or self._stale:
+            with self._lock:
+                if self._graph is None or self._stale:
+                    # Cleared before the snapshot, so a change landing meanwhile marks it stale again
+                    self._stale = False
+                    version, items = item_catalog.snapshot()
+                    self._graph = CraftingGraph(items, version)
+                    self.rebuilds += 1
+                    logger.info(f"Crafting graph rebuilt: {len(self._graph.recipes)} recipes, {len(self._graph.columns)} ingredients")
+        return self._graph
+
+    def stats(self) -> Dict[str, Any]:
+        graph = self._graph
+        return {
+            "recipes": len(graph.recipes) if graph else 0,
+            "ingredients": len(graph.columns) if graph else 0,
+            "rebuilds": self.rebuilds,
+            "skipped_changes": self.skipped_changes,
+        }
+
+
+# Global crafting index shared by the item tools, fed by the item catalog
+crafting_index = CraftingIndex()
+item_catalog.subscribe(crafting_index.on_catalog_change)
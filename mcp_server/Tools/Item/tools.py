@@ -1,5 +1,10 @@
-from typing import Dict, Any, Optional
-from tools.database_tools import Database
+from typing import Dict, Any, List, Optional
+from ..Mechanics.database import Database
+from ..Mechanics.derived_stats import ITEM_SNAPSHOT_FIELDS, refresh_item_snapshots
+from ..Mechanics.DAO import CharacterDAO
+from .catalog import item_catalog
+from .crafting import crafting_index
+from .search_index import item_search_index
 import uuid
 from datetime import datetime
 import logging
@@ -7,6 +12,60 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Defaults for optional item fields; dict values are copied per item
+ITEM_DEFAULTS: Dict[str, Any] = {
+    "character_id": None,
+    "inventory_id": None,
+    "description": "",
+    "flavor_text": "",
+    "quantity": 1,
+    "value": 0,
+    "weight": 0,
+    "durability": {"current": 100, "max": 100},
+    "effects": {},
+    "requirements": {},
+    "equipped": False,
+    "tradeable": True,
+    "consumable": False,
+    "source": None,
+    "recipe": {},
+}
+REQUIRED_ITEM_FIELDS = ("item_name", "item_type", "rarity", "server_id")
+# Fields update_item_tool may change; item_id and timestamps are managed here
+UPDATABLE_ITEM_FIELDS = frozenset(("item_name", "item_type", "rarity", *ITEM_DEFAULTS))
+# Never hand Mongo's internal ObjectId to agents
+ITEM_PROJECTION = {"_id": 0}
+
+
+def build_item_document(item: dict, current_time: Optional[str] = None) -> dict:
+    """Validate an item payload and fill in defaults; raises ValueError on missing fields"""
+    missing = [field for field in REQUIRED_ITEM_FIELDS if not item.get(field)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    current_time = current_time or datetime.utcnow().isoformat()
+    document = {"item_id": str(uuid.uuid4())}
+    for field in REQUIRED_ITEM_FIELDS:
+        document[field] = item[field]
+    for field, default in ITEM_DEFAULTS.items():
+        value = item.get(field)
+        document[field] = value if value is not None else (dict(default) if isinstance(default, dict) else default)
+    document["created_at"] = current_time
+    document["acquired_at"] = current_time
+    return document
+
+
+def _item_filter(item: dict) -> dict:
+    # item_id is globally unique; names are looked up within a server when one is given
+    if item.get("item_id"):
+        return {"item_id": item["item_id"]}
+    if item.get("item_name"):
+        query = {"item_name": item["item_name"]}
+        if item.get("server_id"):
+            query["server_id"] = item["server_id"]
+        return query
+    raise ValueError("item_id or item_name is required")
+
+
 async def create_item_tool(
     item: dict,
     ) -> dict:
@@ -14,10 +73,11 @@ async def create_item_tool(
     
     Args:
         item: Dict containing item information
+        item_name: Name of the item (required)
+        item_type: Category of item (weapon, armor, consumable, etc.) (required)
+        rarity: Item rarity (common, uncommon, rare, legendary, etc.) (required)
         server_id: Discord server/guild ID (required)
         character_id: ID of character who owns the item (optional)
-        item_type: Category of item (weapon, armor, consumable, etc.)
-        rarity: Item rarity (common, uncommon, rare, legendary, etc.)
         inventory_id: ID of inventory if separate from character
         description: Text description of the item
         flavor_text: Optional lore/flavor text
@@ -37,90 +97,72 @@ async def create_item_tool(
         Dict with the created item ID or error message
     """
     try:
-        # Initialize database connection
-        db = Database(mongo_uri="mongodb://localhost:27017/", db_name="veritas")
-        
-        # Generate unique item ID
-        item_id = str(uuid.uuid4())
+        item_document = build_item_document(item)
+        # Insert item into database over the shared pool
+        await Database("items").create(item_document)
+        item_catalog.upsert(item_document)
+        return {"message": f"Item created successfully with ID: {item_document['item_id']}", "item_id": item_document["item_id"]}
+    
+    except Exception as e:
+        return {"error": f"Error creating item: {str(e)}"}
+
+async def create_items_tool(items: List[dict]) -> dict:
+    """Creates many items in batched inserts (bulk grants, loot drops).
+    
+    Args:
+        items: List of item dicts, each with the same fields as create_item_tool
         
-        # Set timestamps
+    Returns:
+        Dict with the created item IDs and any per-item errors
+    """
+    try:
         current_time = datetime.utcnow().isoformat()
-        
-        # Set default values for optional dictionary fields
-        if durability is None:
-            durability = {"current": 100, "max": 100}
-        
-        if effects is None:
-            effects = {}
-            
-        if requirements is None:
-            requirements = {}
-            
-        if recipe is None:
-            recipe = {}
-        
-        # Create item document
-        item_document = {
-            "item_id": item_id,
-            "item_name": item["item_name"],
-            "item_type": item["item_type"],
-            "rarity": item["rarity"],
-            "server_id": item["server_id"],
-            "character_id": item["character_id"],
-            "inventory_id": item["inventory_id"],
-            "description": item["description"],
-            "flavor_text": item["flavor_text"],
-            "quantity": item["quantity"],
-            "value": item["value"],
-            "weight": item["weight"],
-            "durability": item["durability"],
-            "effects": item["effects"],
-            "requirements": item["requirements"],
-            "created_at": current_time,
-            "acquired_at": current_time,
-            "equipped": item["equipped"],
-            "tradeable": item["tradeable"],
-            "consumable": item["consumable"],
-            "source": item["source"],
-            "recipe": item["recipe"]
-        }
-        
-        # Insert item into database
-        result = await db.create("items", item_document)
-        
-        # Close database connection
-        await db.close()
-        
-        return {"message": f"Item created successfully with ID: {item_id}"}
+        documents, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                documents.append(build_item_document(item, current_time))
+            except ValueError as e:
+                errors.append({"index": index, "message": str(e)})
+        result = await Database("items").create_many(documents)
+        written = set(result["inserted_ids"])
+        errors.extend(result["errors"])
+        item_ids = []
+        for doc in documents:
+            if doc.get("_id") in written:
+                item_catalog.upsert(doc)
+                item_ids.append(doc["item_id"])
+        return {"message": f"Created {len(item_ids)} of {len(items)} items", "item_ids": item_ids, "errors": errors}
     
     except Exception as e:
-        return {"error": f"Error creating item: {str(e)}"}
+        return {"error": f"Error creating items: {str(e)}"}
 
 async def read_item_tool(item: dict) -> dict:
-    """Reads an item from the Veritas database by name (case-insensitive).
+    """Reads an item from the Veritas database by item_id or name.
     
     Args:
         item: Dict containing search parameters, must include either item_name or item_id
+        (server_id narrows a name lookup to one server)
         
     Returns:
         Dict with the found item or error message
     """
     try:
-        # Initialize database connection
-        db = Database(mongo_uri="mongodb://localhost:27017/", db_name="veritas")
-        
-        # Build query based on provided parameters
-        query = {}
-        logger.info(f"item information: {item}")
-        if "item_name" in item and item["item_name"]:
-            query["item_name"] = item["item_name"]
-        logger.info(f"query: {query}")
-        result = await db.read_one("items", query)
-        
-        # Close database connection
-        await db.close()
+        query = _item_filter(item)
+        # Served from the in-memory catalog; MongoDB is only asked on a catalog miss
+        await item_catalog.ensure_loaded()
+        if "item_id" in query:
+            found = item_catalog.get(query["item_id"])
+            matches = [found] if found else []
+        else:
+            matches = item_catalog.find_by_name(query["item_name"], query.get("server_id"))
+        if matches:
+            return {"item": matches[0]}
+        logger.info(f"catalog miss, query: {query}")
+        result = await Database("items").read_one(query)
         
         if result:
+            item_catalog.upsert(result)
+            result.pop("_id", None)
             return {"item": result}
         else:
             return {"error": "Item not found"}
@@ -128,11 +170,153 @@ async def read_item_tool(item: dict) -> dict:
     except Exception as e:
         return {"error": f"Error reading item: {str(e)}"}
 
-def update_item_tool() -> str:
-    # Call your MCP tool or DB logic here
-    return "successfully called update_item tool"
+async def update_item_tool(item: dict) -> dict:
+    """Updates fields of an existing item in one atomic write.
+    
+    Args:
+        item: Dict with item_id (or item_name and server_id) and an `updates` dict of fields to set
+        
+    Returns:
+        Dict with the updated item or error message
+    """
+    try:
+        updates = item.get("updates") or {}
+        invalid = [field for field in updates if field not in UPDATABLE_ITEM_FIELDS]
+        if invalid:
+            return {"error": f"Fields cannot be updated: {', '.join(invalid)}"}
+        if not updates:
+            return {"error": "No updates provided"}
+        result = await Database("items").update(
+            _item_filter(item),
+            {"$set": {**updates, "updated_at": datetime.utcnow().isoformat()}},
+            projection=ITEM_PROJECTION,
+        )
+        if result:
+            item_catalog.upsert(result)
+            # Characters carry a snapshot of the item; refresh it (and their derived stats) when it changed
+            if any(field in updates for field in ITEM_SNAPSHOT_FIELDS):
+                await refresh_item_snapshots(result)
+            return {"message": "Item updated successfully", "item": result}
+        return {"error": "Item not found"}
+    
+    except Exception as e:
+        return {"error": f"Error updating item: {str(e)}"}
 
-def delete_item_tool() -> str:
-    # Call your MCP tool or DB logic here
-    return "successfully called delete_item tool"
-    
\ No newline at end of file
+async def delete_item_tool(item: dict) -> dict:
+    """Deletes an item from the Veritas database.
+    
+    Args:
+        item: Dict with item_id (or item_name and server_id)
+        
+    Returns:
+        Dict with a success message or error message
+    """
+    try:
+        query = _item_filter(item)
+        if "item_id" not in query:
+            # Resolve the name to one item_id so the catalog can drop exactly that item
+            await item_catalog.ensure_loaded()
+            matches = item_catalog.find_by_name(query["item_name"], query.get("server_id"))
+            if len(matches) > 1:
+                return {"error": f"{len(matches)} items are named '{query['item_name']}'; pass item_id"}
+            if matches:
+                query = {"item_id": matches[0]["item_id"]}
+        deleted = await Database("items").delete(query)
+        if deleted:
+            if "item_id" in query:
+                item_catalog.remove(query["item_id"])
+            return {"message": "Item deleted successfully"}
+        return {"error": "Item not found"}
+    
+    except Exception as e:
+        return {"error": f"Error deleting item: {str(e)}"}
+
+async def search_items_tool(query: str, server_id: Optional[str] = None, limit: int = 10) -> dict:
+    """Searches items by name: exact (case-insensitive), then prefix, then typo-tolerant matches.
+    
+    Args:
+        query: Full or partial item name, typos allowed
+        server_id: Only return items from this server (optional)
+        limit: Maximum number of items to return
+        
+    Returns:
+        Dict with the kind of match and the matching items or error message
+    """
+    try:
+        await item_catalog.ensure_loaded()
+        result = item_catalog.search(query, server_id, limit)
+        if not result["items"]:
+            # Not a name at all: try what the items are and do
+            text = await find_items_tool(query, server_id, limit)
+            if text.get("items"):
+                return {"match": "text", "items": text["items"]}
+        return result
+    
+    except Exception as e:
+        return {"error": f"Error searching items: {str(e)}"}
+
+async def find_items_tool(query: str, server_id: Optional[str] = None, limit: int = 10) -> dict:
+    """Finds items by what they are or do (e.g. "fire resistant boots"), ranked by BM25 over
+    names, descriptions, flavor text, effects and requirements.
+    
+    Args:
+        query: Natural-language description of the item
+        server_id: Only return items from this server (optional)
+        limit: Maximum number of items to return
+        
+    Returns:
+        Dict with the matching items, best first, each with its relevance score, or error message
+    """
+    try:
+        await item_catalog.ensure_loaded()
+        items = []
+        for item_id, score in item_search_index.search(query, server_id, limit):
+            item = item_catalog.get(item_id)
+            if item:
+                items.append({**item, "score": round(score, 4)})
+        return {"items": items}
+    
+    except Exception as e:
+        return {"error": f"Error finding items: {str(e)}"}
+
+async def craftable_items_tool(server_id: str, player_id: str, limit: int = 25) -> dict:
+    """Lists what the player's active character can craft from their inventory, checked against every recipe at once.
+    
+    Args:
+        server_id: Discord server/guild ID
+        player_id: Player whose active character's inventory is used
+        limit: Maximum number of items per list
+        
+    Returns:
+        Dict with items craftable now (and how many times), craftable by first crafting
+        intermediate ingredients, and almost craftable (with the missing ingredients), or error message
+    """
+    try:
+        character = await CharacterDAO().get_player(server_id, player_id, projection="inventory")
+        if not character:
+            return {"error": "Character not found"}
+        graph = await crafting_index.graph()
+        counts = graph.counts(character.get("inventory", {}))
+        return graph.craftable(counts, server_id, limit)
+    
+    except Exception as e:
+        return {"error": f"Error finding craftable items: {str(e)}"}
+
+async def get_recipe_tool(item_id: str) -> dict:
+    """Gets an item's recipe: its direct ingredients and the raw materials once intermediates are crafted too.
+    
+    Args:
+        item_id: ID of the craftable item
+        
+    Returns:
+        Dict with the recipe or error message
+    """
+    try:
+        graph = await crafting_index.graph()
+        recipe = graph.recipe(item_id)
+        if recipe:
+            return {"recipe": recipe}
+        return {"error": "Item not found or has no recipe"}
+    
+    except Exception as e:
+        return {"error": f"Error reading recipe: {str(e)}"}
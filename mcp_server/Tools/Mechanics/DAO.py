@@ -1,17 +1,15 @@
 # daos/mongo_character_dao.py
 from typing import Optional, Dict, List, Union
-from pymongo import MongoClient
 from bson import ObjectId
 from datetime import datetime
-
-# MongoDB configuration
-MONGO_URI = "mongodb://localhost:27017/"
-DB_NAME = "Veritas"
+from pymongo import UpdateOne
+from .connection import mongo_registry, MONGO_URI, DB_NAME
+from .character_cache import character_cache
+from .projections import ProjectionSpec, resolve_projection, apply_projection
 
 class MongoCharacterDAO:
     def __init__(self):
-        self._client = MongoClient(MONGO_URI)
-        self._collection = self._client[DB_NAME]["characters"]
+        self._collection = mongo_registry.get_collection("characters")
 
     def get_by_player(self, server_id: str, player_id: str) -> Optional[Dict[str, object]]:
         return self._collection.find_one({"player.server_id": server_id, "player.player_id": player_id, "player.active": True})
@@ -26,34 +24,190 @@ class MongoCharacterDAO:
 
 class CharacterDAO:
     def __init__(self):
-        self._client = MongoClient(MONGO_URI)
-        self._collection = self._client[DB_NAME]["characters"]
+        self._collection = mongo_registry.get_collection("characters")
 
-    async def get_player(self, server_id: str, player_id: str, character_name: Optional[str] = None, character_id: Optional[str] = None) -> Optional[Dict[str, object]]:
+    async def get_player(self, server_id: str, player_id: str, character_name: Optional[str] = None, character_id: Optional[str] = None, projection: ProjectionSpec = None) -> Optional[Dict[str, object]]:
         # Step 1: If character_name, get specified character on server
         if character_name:
-            return self._collection.find_one({"player.server_id": server_id, "character.characters_name": character_name})
+            cache_key = character_cache.key(server_id, None, character_name=character_name)
+            query = {"player.server_id": server_id, "character.characters_name": character_name}
         # Step 2: If character_id, get specified character on the server
         elif character_id:
-            return self._collection.find_one({"player.server_id": server_id, "_id": ObjectId(character_id)})
+            cache_key = character_cache.key(server_id, None, character_id=character_id)
+            query = {"player.server_id": server_id, "_id": ObjectId(character_id)}
         # Step 3: If no character_name or character_id, get active character for player
         else:
-            return self._collection.find_one({"player.server_id": server_id, "player.player_id": player_id, "player.active": True})
+            cache_key = character_cache.key(server_id, player_id)
+            query = {"player.server_id": server_id, "player.player_id": player_id, "player.active": True}
+        # Step 4: Serve from the character cache, falling back to the database
+        fields = resolve_projection(projection)
+        character = character_cache.get(cache_key)
+        if character is not None:
+            return apply_projection(character, fields)
+        character = await mongo_registry.run(self._collection.find_one, query, fields)
+        # Step 5: Only full documents are cached
+        if not fields:
+            character_cache.set(cache_key, character)
+        return character
 
     async def update_player(self, server_id: str, player_id: str, update: Dict[str, object]) -> None:
         # Step 1: Update player
-        self._collection.update_one({"player.server_id": server_id, "player.player_id": player_id}, {"$set": update})
+        await mongo_registry.run(self._collection.update_one, {"player.server_id": server_id, "player.player_id": player_id}, {"$set": update})
+        # Step 2: Drop cached copies of the player's characters
+        character_cache.invalidate(server_id, player_id)
+
+    async def get_by_ids(self, server_id: str, character_ids: List[str], projection: ProjectionSpec = None) -> List[Dict[str, object]]:
+        # Step 1: Serve whatever is already cached
+        fields = resolve_projection(projection)
+        found: Dict[str, Dict[str, object]] = {}
+        missing: List[ObjectId] = []
+        for character_id in character_ids:
+            character = character_cache.get(character_cache.key(server_id, None, character_id=str(character_id)))
+            if character is not None:
+                found[str(character_id)] = apply_projection(character, fields)
+            else:
+                missing.append(ObjectId(character_id))
+        # Step 2: Fetch the rest in a single $in query
+        if missing:
+            cursor = self._collection.find({"player.server_id": server_id, "_id": {"$in": missing}}, fields)
+            for character in await mongo_registry.run(list, cursor):
+                if not fields:
+                    character_cache.set(character_cache.key(server_id, None, character_id=str(character["_id"])), character)
+                found[str(character["_id"])] = character
+        # Step 3: Preserve the requested order
+        return [found[str(i)] for i in character_ids if str(i) in found]
+
+    async def get_combat_preflight(self, server_id: str, player_id: str) -> Optional[Dict[str, object]]:
+        """
+        Fetch the player's active character, its current combat session and its party in one
+        aggregation round trip.
+
+        Returns:
+            {"character": ..., "session": ... or None, "party": ... or None}, or None if the
+            player has no active character
+        """
+        pipeline = [
+            # Step 1: Active character for the player
+            {"$match": {"player.server_id": server_id, "player.player_id": player_id, "player.active": True}},
+            {"$limit": 1},
+            # Step 2: Join the current combat session
+            {"$lookup": {
+                "from": "sessions",
+                "let": {"session_id": {"$convert": {"input": "$instances.session_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$session_id"]}, "players.server_id": server_id}},
+                    {"$limit": 1}
+                ],
+                "as": "_session"
+            }},
+            # Step 3: Join the party
+            {"$lookup": {
+                "from": "sessions",
+                "let": {"party_id": {"$convert": {"input": "$groups.party_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$party_id"]}, "player.server_id": server_id}},
+                    {"$limit": 1}
+                ],
+                "as": "_party"
+            }},
+            # Step 4: Split the joined documents back out of the character
+            {"$project": {
+                "session": {"$arrayElemAt": ["$_session", 0]},
+                "party": {"$arrayElemAt": ["$_party", 0]},
+                "character": "$$ROOT"
+            }},
+            {"$unset": ["character._session", "character._party"]}
+        ]
+        results = await mongo_registry.run(lambda: list(self._collection.aggregate(pipeline)))
+        if not results:
+            return None
+        preflight = results[0]
+        character_cache.set(character_cache.key(server_id, player_id), preflight["character"])
+        return {
+            "character": preflight["character"],
+            "session": preflight.get("session"),
+            "party": preflight.get("party")
+        }
+
+    async def assign_session(self, server_id: str, character_ids: List[str], session_id: Optional[ObjectId]) -> int:
+        """
+        Point every character in character_ids at session_id (None detaches them) in one update_many.
+
+        Returns:
+            Number of characters matched
+        """
+        if not character_ids:
+            return 0
+        # Step 1: Update all party members in a single round trip
+        oids = [ObjectId(i) for i in character_ids]
+        result = await mongo_registry.run(
+            self._collection.update_many,
+            {"player.server_id": server_id, "_id": {"$in": oids}},
+            {"$set": {"instances.session_id": session_id}}
+        )
+        # Step 2: Drop cached copies of the updated characters
+        character_cache.invalidate_ids(character_ids)
+        return result.matched_count
+
+    async def detach_sessions(self, session_ids: List[ObjectId]) -> int:
+        """
+        Clear instances.session_id on every character still pointing at one of session_ids.
+
+        Returns:
+            Number of characters detached
+        """
+        if not session_ids:
+            return 0
+        # Step 1: One update_many across all reaped sessions, served by the instances.session_id index
+        result = await mongo_registry.run(
+            self._collection.update_many,
+            {"instances.session_id": {"$in": session_ids}},
+            {"$set": {"instances.session_id": None}}
+        )
+        return result.modified_count
+
+    async def find_orphaned_session_refs(self, limit: int = 1000) -> List[Dict[str, object]]:
+        """
+        Session ids that characters still point at but whose session document is gone.
+
+        Returns:
+            Dicts with the missing session `_id` and the `character_ids` pointing at it
+        """
+        pipeline = [
+            # Step 1: Only characters attached to a session (partial index on instances.session_id)
+            {"$match": {"instances.session_id": {"$type": "objectId"}}},
+            {"$group": {"_id": "$instances.session_id", "character_ids": {"$push": {"$toString": "$_id"}}}},
+            # Step 2: Keep the ids with no matching session
+            {"$lookup": {"from": "sessions", "localField": "_id", "foreignField": "_id", "as": "session"}},
+            {"$match": {"session": {"$size": 0}}},
+            {"$limit": limit},
+            {"$project": {"session": 0}},
+        ]
+        return await mongo_registry.run(lambda: list(self._collection.aggregate(pipeline)))
+
+    async def set_current_hp(self, server_id: str, hp_by_character: Dict[str, int]) -> int:
+        """Write combat.current_hp for many characters in one bulk_write"""
+        if not hp_by_character:
+            return 0
+        # Step 1: One UpdateOne per character, sent as a single unordered batch
+        operations = [
+            UpdateOne({"player.server_id": server_id, "_id": ObjectId(character_id)}, {"$set": {"combat.current_hp": hp}})
+            for character_id, hp in hp_by_character.items()
+        ]
+        result = await mongo_registry.run(self._collection.bulk_write, operations, ordered=False)
+        # Step 2: Drop cached copies of the updated characters
+        character_cache.invalidate_ids(hp_by_character.keys())
+        return result.matched_count
 
 class SessionDAO:
     def __init__(self):
-        self._client = MongoClient(MONGO_URI)
-        self._collection = self._client[DB_NAME]["sessions"]
+        self._collection = mongo_registry.get_collection("sessions")
 
     async def retrieve_combat_session(self, server_id: str, session_id: str) -> Optional[Dict[str, object]]:
         # Step 1: Get active session
-        session = self._collection.find_one({
+        session = await mongo_registry.run(self._collection.find_one, {
             "_id": ObjectId(session_id),
-            "player.server_id": server_id
+            "players.server_id": server_id
         })
         # Step 2: If session is found, return it
         if session:
@@ -64,7 +218,7 @@ class SessionDAO:
 
     async def retrieve_party(self, server_id: str, party_id: str) -> Optional[Dict[str, object]]:
         # Step 1: Get active session
-        party = self._collection.find_one({
+        party = await mongo_registry.run(self._collection.find_one, {
             "_id": ObjectId(party_id),
             "player.server_id": server_id
         })
@@ -128,13 +282,60 @@ class SessionDAO:
             },
             "instance": "combat",
             "meta": {
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             }
         }
         
         # Step 5: Insert session into database
-        result = self._collection.insert_one(session)
+        result = await mongo_registry.run(self._collection.insert_one, session)
         
         # Step 6: Return session ID
-        return result
\ No newline at end of file
+        return result.inserted_id
+
+    async def save_combat_snapshots(self, snapshots: List[Dict[str, object]]) -> int:
+        """
+        Persist in-memory combat state snapshots in one bulk_write.
+
+        Args:
+            snapshots: Dicts with session_id, server_id and the state to store
+
+        Returns:
+            Number of sessions matched
+        """
+        if not snapshots:
+            return 0
+        # Step 1: One UpdateOne per session, sent as a single unordered batch
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(snapshot["session_id"]), "players.server_id": snapshot["server_id"]},
+                {"$set": {"state": snapshot["state"], "meta.updated_at": now}}
+            )
+            for snapshot in snapshots
+        ]
+        result = await mongo_registry.run(self._collection.bulk_write, operations, ordered=False)
+        # Step 2: Return how many sessions were written
+        return result.matched_count
+
+    async def find_expired_sessions(self, cutoff: datetime, limit: int = 1000) -> List[Dict[str, object]]:
+        """Combat sessions not updated since cutoff, oldest first; only ids and character ids are returned"""
+        # Parties live in this collection too; only combat instances ever expire
+        return await mongo_registry.run(lambda: list(
+            self._collection.find({"instance": "combat", "meta.updated_at": {"$lt": cutoff}}, {"_id": 1, "players.character_ids": 1})
+            .sort("meta.updated_at", 1)
+            .limit(limit)
+        ))
+
+    async def delete_sessions(self, session_ids: List[ObjectId], cutoff: datetime) -> int:
+        """Delete sessions that are still expired; a session touched since it was selected survives"""
+        if not session_ids:
+            return 0
+        result = await mongo_registry.run(
+            self._collection.delete_many,
+            {"_id": {"$in": session_ids}, "instance": "combat", "meta.updated_at": {"$lt": cutoff}}
+        )
+        return result.deleted_count
+
+    async def count_sessions(self) -> int:
+        return await mongo_registry.run(self._collection.estimated_document_count)
@@ -0,0 +1,169 @@
+"""
+Read-through cache for character documents.
+
+Sub-agents fetch, update and re-fetch the same active character many times in one
+run. Entries are keyed by (server_id, player_id, selector) where the selector is the
+character id, the character name or the active character. Writes invalidate every
+entry for the player and every entry holding the written character, then store the
+post-image so the next read is free.
+
+Cross-process invalidation is opt-in (CHARACTER_CACHE_WATCH=true): a daemon thread
+follows a change stream on the characters collection and drops entries touched by
+other processes. Change streams require a replica set.
+"""
+import copy
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+from .connection import mongo_registry
+
+logger = logging.getLogger(__name__)
+
+CHARACTER_CACHE_SIZE = int(os.environ.get("CHARACTER_CACHE_SIZE", "1024"))
+CHARACTER_CACHE_TTL = int(os.environ.get("CHARACTER_CACHE_TTL", "300"))
+CHARACTER_CACHE_WATCH = os.environ.get("CHARACTER_CACHE_WATCH", "").lower() in ["true", "1", "yes", "on"]
+
+CacheKey = Tuple[str, str, Tuple[str, ...]]
+
+
+class CharacterCache:
+    """Bounded LRU+TTL cache of character documents with hit/miss metrics"""
+
+    def __init__(self, maxsize: int = CHARACTER_CACHE_SIZE, ttl: int = CHARACTER_CACHE_TTL, watch: bool = CHARACTER_CACHE_WATCH):
+        # TTLCache evicts least recently used entries once maxsize is reached
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+        self._watch = watch
+        self._watcher: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    @staticmethod
+    def key(server_id: Optional[str], player_id: Optional[str], character_name: Optional[str] = None, character_id: Optional[str] = None) -> CacheKey:
+        """Build the cache key for a lookup; id takes precedence over name, then the active character"""
+        if character_id:
+            selector: Tuple[str, ...] = ("id", str(character_id))
+        elif character_name:
+            selector = ("name", character_name)
+        else:
+            selector = ("active",)
+        return (server_id or "", player_id or "", selector)
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached document, or None on a miss"""
+        if self._watch and self._watcher is None:
+            self.start_watcher()
+        with self._lock:
+            document = self._cache.get(key)
+            if document is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(document)
+
+    def set(self, key: CacheKey, document: Optional[Dict[str, Any]]) -> None:
+        """Store a copy of document; None results are never cached"""
+        if document is None:
+            return
+        document = copy.deepcopy(document)
+        with self._lock:
+            self._cache[key] = document
+
+    def invalidate(
+        self,
+        server_id: Optional[str] = None,
+        player_id: Optional[str] = None,
+        character_id: Optional[str] = None,
+        character_name: Optional[str] = None,
+    ) -> int:
+        """
+        Drop every entry holding a character owned by (server_id, player_id), the given
+        character id, or (server_id, character_name). Returns the number of entries removed.
+        """
+        character_id = str(character_id) if character_id else None
+        with self._lock:
+            stale = []
+            for key, document in list(self._cache.items()):
+                player = document.get("player", {})
+                if (server_id and player_id and player.get("server_id") == server_id
+                        and player.get("player_id") == player_id):
+                    stale.append(key)
+                elif character_id and str(document.get("_id")) == character_id:
+                    stale.append(key)
+                elif (character_name and player.get("server_id") == server_id
+                      and document.get("character", {}).get("characters_name") == character_name):
+                    stale.append(key)
+            for key in stale:
+                self._cache.pop(key, None)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_ids(self, character_ids) -> int:
+        """Drop every entry holding any of character_ids in a single pass"""
+        wanted = {str(character_id) for character_id in character_ids}
+        with self._lock:
+            stale = [key for key, document in list(self._cache.items()) if str(document.get("_id")) in wanted]
+            for key in stale:
+                self._cache.pop(key, None)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def refresh(self, document: Dict[str, Any]) -> None:
+        """Write-through: invalidate everything for the character's player and cache the post-image by id and by ref"""
+        player = document.get("player", {})
+        server_id = player.get("server_id")
+        player_id = player.get("player_id")
+        character_id = str(document.get("_id"))
+        self.invalidate(server_id, player_id, character_id)
+        self.set(self.key(server_id, player_id, character_id=character_id), document)
+        self.set(self.key(None, None, character_id=character_id), document)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "remote_invalidations": self.remote_invalidations,
+            }
+
+    def start_watcher(self) -> None:
+        """Start following the characters change stream to invalidate across processes"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_changes, name="character-cache-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch_changes(self) -> None:
+        collection = mongo_registry.get_collection("characters")
+        try:
+            with collection.watch() as stream:
+                for change in stream:
+                    character_id = change.get("documentKey", {}).get("_id")
+                    if character_id is None:
+                        continue
+                    removed = self.invalidate(character_id=str(character_id))
+                    with self._lock:
+                        self.remote_invalidations += removed
+        except Exception as e:
+            logger.warning(f"Character cache change stream stopped: {e}")
+
+
+# Global character cache shared by the character tools and CharacterDAO
+character_cache = CharacterCache()
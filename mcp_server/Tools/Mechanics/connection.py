@@ -0,0 +1,200 @@
+"""
+Process-wide MongoDB client registry.
+
+Every tool module and DAO shares one lazily created MongoClient per URI instead of
+opening (and tearing down) a client per call. pymongo clients are thread-safe and
+maintain their own connection pool, so a single instance serves the whole process.
+
+pymongo is blocking, so async callers go through `mongo_registry.run(...)`, which
+offloads the call to a bounded thread pool sized to the connection pool. This keeps
+the event loop serving A2A traffic while database round trips are in flight.
+"""
+import asyncio
+import atexit
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from pymongo import MongoClient, monitoring
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# MongoDB configuration
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = os.environ.get("MONGO_DB_NAME", "Veritas")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Threads used to offload blocking pymongo calls; defaults to the pool size so a
+# worker never waits on a connection checkout
+MONGO_IO_WORKERS = int(os.environ.get("MONGO_IO_WORKERS", str(MONGO_MAX_POOL_SIZE)))
+
+
+class PoolUsageListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so pool pressure can be observed at runtime"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "checkout_failures": 0,
+            "pool_clears": 0,
+            "checked_out": 0,
+        }
+
+    def _bump(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    def pool_created(self, event):
+        logger.debug(f"Mongo pool created for {event.address}")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._bump("pool_clears")
+
+    def pool_closed(self, event):
+        logger.debug(f"Mongo pool closed for {event.address}")
+
+    def connection_created(self, event):
+        self._bump("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._bump("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._bump("checkout_failures")
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.counters["checkouts"] += 1
+            self.counters["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.counters["checkins"] += 1
+            self.counters["checked_out"] -= 1
+
+
+class MongoClientRegistry:
+    """Lazily creates and caches one pooled MongoClient per URI"""
+
+    def __init__(self, max_pool_size: int = MONGO_MAX_POOL_SIZE, min_pool_size: int = MONGO_MIN_POOL_SIZE, io_workers: int = MONGO_IO_WORKERS):
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.io_workers = io_workers
+        self._clients: Dict[str, MongoClient] = {}
+        self._listeners: Dict[str, PoolUsageListener] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get_client(self, uri: Optional[str] = None) -> MongoClient:
+        """Return the shared client for uri, creating it on first use"""
+        uri = uri or MONGO_URI
+        client = self._clients.get(uri)
+        if client is not None:
+            return client
+        with self._lock:
+            # Re-check under the lock so concurrent callers share one client
+            client = self._clients.get(uri)
+            if client is None:
+                listener = PoolUsageListener()
+                client = MongoClient(
+                    uri,
+                    maxPoolSize=self.max_pool_size,
+                    minPoolSize=self.min_pool_size,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    event_listeners=[listener],
+                )
+                self._clients[uri] = client
+                self._listeners[uri] = listener
+                logger.info(f"Created pooled MongoClient (maxPoolSize={self.max_pool_size})")
+            return client
+
+    def get_database(self, db_name: Optional[str] = None, uri: Optional[str] = None) -> Database:
+        return self.get_client(uri)[db_name or DB_NAME]
+
+    def get_collection(self, collection_name: str, db_name: Optional[str] = None, uri: Optional[str] = None) -> Collection:
+        return self.get_database(db_name, uri)[collection_name]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        executor = self._executor
+        if executor is not None:
+            return executor
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="mongo-io")
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking pymongo call on the bounded I/O pool without stalling the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    def ping(self, uri: Optional[str] = None) -> bool:
+        """Health check: True if the server answers a ping"""
+        try:
+            self.get_client(uri).admin.command("ping")
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB health check failed: {e}")
+            return False
+
+    def health_check(self) -> Dict[str, Any]:
+        """Ping every registered client and report pool usage"""
+        with self._lock:
+            uris = list(self._clients.keys())
+        return {
+            "healthy": all(self.ping(uri) for uri in uris) if uris else self.ping(),
+            "clients": len(self._clients),
+            "pools": self.stats(),
+        }
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Pool usage counters per registered URI"""
+        with self._lock:
+            return {uri: listener.snapshot() for uri, listener in self._listeners.items()}
+
+    def close_all(self):
+        """Close every registered client; safe to call more than once"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._listeners.clear()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Error closing MongoClient: {e}")
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled MongoClient(s)")
+
+
+# Global registry instance shared by all tool modules
+mongo_registry = MongoClientRegistry()
+atexit.register(mongo_registry.close_all)
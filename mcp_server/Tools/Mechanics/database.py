@@ -0,0 +1,140 @@
+"""
+Async CRUD layer over the shared MongoDB pool.
+
+`Database` wraps one collection and exposes create / create_many / read_one /
+read_many / update / delete as coroutines. It never opens a client of its own:
+every call borrows a pooled connection from `mongo_registry` and runs on its I/O
+executor, so constructing a Database per request is free and `close()` is a no-op.
+create_many splits large batches into insert_many chunks so bulk grants and loot
+drops cost one round trip per chunk rather than one per document.
+"""
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from .connection import mongo_registry
+
+logger = logging.getLogger(__name__)
+
+DATABASE_INSERT_BATCH_SIZE = int(os.environ.get("DATABASE_INSERT_BATCH_SIZE", "1000"))
+
+Projection = Optional[Union[Mapping[str, Any], Sequence[str]]]
+Sort = Optional[List[Tuple[str, int]]]
+
+
+class Database:
+    """Pooled async access to one collection"""
+
+    def __init__(self, collection_name: str, db_name: Optional[str] = None, mongo_uri: Optional[str] = None):
+        self.collection_name = collection_name
+        self._collection = mongo_registry.get_collection(collection_name, db_name, mongo_uri)
+
+    @property
+    def collection(self):
+        return self._collection
+
+    async def create(self, document: Dict[str, Any]) -> Any:
+        """Insert one document; returns its _id"""
+        result = await mongo_registry.run(self._collection.insert_one, document)
+        return result.inserted_id
+
+    async def create_many(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        batch_size: int = DATABASE_INSERT_BATCH_SIZE,
+        ordered: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Insert many documents in insert_many chunks of batch_size.
+
+        With ordered=False the server keeps inserting past a failed document (e.g. a
+        duplicate key), so one bad entry does not drop the rest of a loot batch.
+
+        Returns:
+            Dict with inserted_ids and a list of per-document errors
+        """
+        documents = list(documents)
+        inserted_ids: List[Any] = []
+        errors: List[Dict[str, Any]] = []
+        for start in range(0, len(documents), batch_size):
+            chunk = documents[start:start + batch_size]
+            try:
+                result = await mongo_registry.run(self._collection.insert_many, chunk, ordered=ordered)
+                inserted_ids.extend(result.inserted_ids)
+            except BulkWriteError as e:
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                for error in e.details.get("writeErrors", []):
+                    errors.append({"index": start + error["index"], "code": error.get("code"), "message": error.get("errmsg")})
+                # insert_many sets _id on every document it was given; keep the ones that were written
+                written = [doc["_id"] for i, doc in enumerate(chunk) if i not in failed]
+                if ordered:
+                    # An ordered batch stops at the first error
+                    stop = min(failed) if failed else len(chunk)
+                    inserted_ids.extend(written[:stop])
+                    break
+                inserted_ids.extend(written)
+        return {"inserted_ids": inserted_ids, "errors": errors}
+
+    async def read_one(self, filter: Dict[str, Any], projection: Projection = None) -> Optional[Dict[str, Any]]:
+        return await mongo_registry.run(self._collection.find_one, filter, projection)
+
+    async def read_many(
+        self,
+        filter: Dict[str, Any],
+        projection: Projection = None,
+        sort: Sort = None,
+        limit: int = 0,
+        skip: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Read matching documents in one cursor drain on the I/O executor"""
+        def _read() -> List[Dict[str, Any]]:
+            cursor = self._collection.find(filter, projection, skip=skip, limit=limit)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor)
+        return await mongo_registry.run(_read)
+
+    async def update(
+        self,
+        filter: Dict[str, Any],
+        update: Union[Dict[str, Any], List[Dict[str, Any]]],
+        many: bool = False,
+        upsert: bool = False,
+        projection: Projection = None,
+    ) -> Union[Optional[Dict[str, Any]], int]:
+        """
+        Apply an update document or pipeline.
+
+        Returns:
+            The updated document for single updates (None if nothing matched), or the
+            number of modified documents when many=True
+        """
+        if many:
+            result = await mongo_registry.run(self._collection.update_many, filter, update, upsert=upsert)
+            return result.modified_count
+        return await mongo_registry.run(
+            self._collection.find_one_and_update,
+            filter,
+            update,
+            projection=projection,
+            upsert=upsert,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def delete(self, filter: Dict[str, Any], many: bool = False) -> int:
+        """Delete one (or every, with many=True) matching document; returns the count deleted"""
+        if many:
+            result = await mongo_registry.run(self._collection.delete_many, filter)
+        else:
+            result = await mongo_registry.run(self._collection.delete_one, filter)
+        return result.deleted_count
+
+    async def count(self, filter: Dict[str, Any]) -> int:
+        return await mongo_registry.run(self._collection.count_documents, filter)
+
+    async def close(self) -> None:
+        """Kept for callers written against a per-call client; the shared pool stays open"""
+        return None
@@ -0,0 +1,170 @@
+"""
+Derived equipment stats stored on the character document.
+
+`derived` holds the effective damage and defense (base `combat` values plus the
+numeric effects of everything in `equipped`), the effective base stats (`stats`
+plus equipment bonuses to the same keys, e.g. an item with {"str": 2}) and the
+per-stat equipment bonuses. It is recomputed server-side, in the same update,
+whenever its inputs change: equip/unequip, an edit of the base or combat stats,
+or an edit of an item somebody has equipped. Inventory entries embed each item's effects, so the recompute only
+reads the eight slots already in the document and never joins the items
+collection. Combat setup and the stats display just read `derived`.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+from .connection import mongo_registry
+from .character_cache import character_cache
+
+logger = logging.getLogger(__name__)
+
+EQUIPMENT_SLOTS = ("head", "chest", "legs", "arms", "accessory1", "accessory2", "left_hand", "right_hand")
+# Sections of the character's inventory document ("cratable" is the schema's spelling)
+INVENTORY_SECTIONS = ("equipment", "consumables", "misc", "cratable", "key_items")
+
+# Effect keys that count towards effective damage / defense
+DERIVED_EFFECT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "damage": ("damage", "attack"),
+    "defense": ("defense", "armor"),
+}
+DEFAULT_BASE = {"damage": 5, "defense": 5}
+# Base stats carried into derived.stats, with the defaults create_character_tool writes
+BASE_STATS = {"hp": 100, "str": 5, "def": 5, "spe": 5, "dex": 5, "cha": 5}
+# Updating any of these paths must recompute `derived`
+DERIVED_STAT_SOURCES = ("combat.damage", "combat.defense", "equipped", *(f"stats.{stat}" for stat in BASE_STATS))
+# Item fields snapshotted into inventory entries
+ITEM_SNAPSHOT_FIELDS = ("item_name", "item_type", "effects")
+
+
+def _derived_expression() -> Dict[str, Any]:
+    # Every numeric effect of every equipped item as {k, v} pairs
+    slot_effects = [
+        {"$cond": [
+            {"$eq": [{"$type": f"$equipped.{slot}.effects"}, "object"]},
+            {"$objectToArray": f"$equipped.{slot}.effects"},
+            [],
+        ]}
+        for slot in EQUIPMENT_SLOTS
+    ]
+    numeric = {"$filter": {"input": {"$concatArrays": slot_effects}, "as": "e", "cond": {"$isNumber": "$$e.v"}}}
+
+    def total(keys: Any) -> Dict[str, Any]:
+        return {"$sum": {"$map": {
+            "input": {"$filter": {"input": "$$fx", "as": "e", "cond": {"$in": ["$$e.k", keys]}}},
+            "as": "e",
+            "in": "$$e.v",
+        }}}
+
+    return {"$let": {"vars": {"fx": numeric}, "in": {
+        **{
+            stat: {"$add": [{"$ifNull": [f"$combat.{stat}", DEFAULT_BASE[stat]]}, total(list(keys))]}
+            for stat, keys in DERIVED_EFFECT_KEYS.items()
+        },
+        "stats": {
+            stat: {"$add": [{"$ifNull": [f"$stats.{stat}", default]}, total([stat])]}
+            for stat, default in BASE_STATS.items()
+        },
+        "bonuses": {"$arrayToObject": {"$map": {
+            "input": {"$setUnion": ["$$fx.k"]},
+            "as": "stat",
+            "in": {"k": "$$stat", "v": total(["$$stat"])},
+        }}},
+    }}}
+
+
+# Pipeline stage appended to every update that changes an input of `derived`
+DERIVED_STATS_STAGE: Dict[str, Any] = {"$set": {"derived": _derived_expression()}}
+
+
+def compute_derived_stats(character: Dict[str, Any]) -> Dict[str, Any]:
+    """Python twin of DERIVED_STATS_STAGE, for documents written before `derived` existed"""
+    bonuses: Dict[str, float] = {}
+    for entry in (character.get("equipped") or {}).values():
+        if not isinstance(entry, dict) or not isinstance(entry.get("effects"), dict):
+            continue
+        for stat, value in entry["effects"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                bonuses[stat] = bonuses.get(stat, 0) + value
+    combat = character.get("combat") or {}
+    derived: Dict[str, Any] = {
+        stat: (combat.get(stat) if combat.get(stat) is not None else DEFAULT_BASE[stat]) + sum(bonuses.get(key, 0) for key in keys)
+        for stat, keys in DERIVED_EFFECT_KEYS.items()
+    }
+    stats = character.get("stats") or {}
+    derived["stats"] = {
+        stat: (stats.get(stat) if stats.get(stat) is not None else default) + bonuses.get(stat, 0)
+        for stat, default in BASE_STATS.items()
+    }
+    derived["bonuses"] = bonuses
+    return derived
+
+
+def derived_stats(character: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored derived stats, computed locally only if the document predates them"""
+    derived = character.get("derived")
+    if isinstance(derived, dict) and all(stat in derived for stat in (*DERIVED_EFFECT_KEYS, "stats")):
+        return derived
+    return compute_derived_stats(character)
+
+
+def touches_derived_sources(paths: List[str]) -> bool:
+    # A write to a parent (e.g. "stats") replaces the source paths below it too
+    return any(
+        path == source or path.startswith(f"{source}.") or source.startswith(f"{path}.")
+        for path in paths for source in DERIVED_STAT_SOURCES
+    )
+
+
+def item_holder_filter(item_id: str) -> Dict[str, Any]:
+    """Characters holding or wearing item_id; served by the characters' item-id wildcard index"""
+    return {"$or": [
+        *({f"equipped.{slot}.item_id": item_id} for slot in EQUIPMENT_SLOTS),
+        *({f"inventory.{section}.item_id": item_id} for section in INVENTORY_SECTIONS),
+    ]}
+
+
+async def refresh_item_snapshots(item: Dict[str, Any]) -> int:
+    """
+    Push an edited item's name/type/effects into every inventory entry and equipped
+    slot that embeds it, recomputing `derived` for those characters in the same write.
+
+    Returns:
+        Number of characters updated
+    """
+    item_id = item.get("item_id")
+    if not item_id:
+        return 0
+    snapshot = {field: item[field] for field in ITEM_SNAPSHOT_FIELDS if field in item}
+    if not snapshot:
+        return 0
+    collection = mongo_registry.get_collection("characters")
+    # Step 1: Find the holders, so exactly their cache entries are dropped afterwards
+    holders = item_holder_filter(item_id)
+    ids = [doc["_id"] for doc in await mongo_registry.run(lambda: list(collection.find(holders, {"_id": 1})))]
+    if not ids:
+        return 0
+
+    # Step 2: Rewrite the embedded copies and recompute derived stats in one update_many
+    def refreshed(entry: str) -> Dict[str, Any]:
+        return {"$cond": [
+            {"$eq": [f"{entry}.item_id", {"$literal": item_id}]},
+            {"$mergeObjects": [entry, {"$literal": snapshot}]},
+            entry,
+        ]}
+
+    pipeline = [
+        {"$set": {
+            **{f"equipped.{slot}": refreshed(f"$equipped.{slot}") for slot in EQUIPMENT_SLOTS},
+            **{
+                f"inventory.{section}": {"$map": {
+                    "input": {"$ifNull": [f"$inventory.{section}", []]}, "as": "e", "in": refreshed("$$e"),
+                }}
+                for section in INVENTORY_SECTIONS
+            },
+        }},
+        DERIVED_STATS_STAGE,
+    ]
+    result = await mongo_registry.run(collection.update_many, {"_id": {"$in": ids}}, pipeline)
+    # Step 3: Drop the stale cached copies
+    character_cache.invalidate_ids(ids)
+    return result.modified_count
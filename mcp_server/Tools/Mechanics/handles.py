@@ -0,0 +1,44 @@
+"""
+Short opaque character references.
+
+Tools hand the model a `character_ref` instead of the full character record, and
+take the ref back when they need to act on that character. A ref only names the
+character; tools that act on it scope the lookup to the calling player with
+`character_ref_filter`, so a ref cannot be used to reach somebody else's character
+and the model never has to echo a whole document through a function call.
+"""
+import base64
+import binascii
+from typing import Any, Dict, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+CHARACTER_REF_PREFIX = "chr_"
+
+
+def encode_character_ref(character_id: Union[str, ObjectId]) -> str:
+    """Encode a character ObjectId as a 20 character reference"""
+    raw = ObjectId(character_id).binary
+    return CHARACTER_REF_PREFIX + base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_character_ref(character_ref: str) -> ObjectId:
+    """Decode a reference produced by encode_character_ref"""
+    if not isinstance(character_ref, str) or not character_ref.startswith(CHARACTER_REF_PREFIX):
+        raise ValueError(f"Invalid character_ref: {character_ref}")
+    encoded = character_ref[len(CHARACTER_REF_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        return ObjectId(raw)
+    except (binascii.Error, InvalidId, TypeError) as e:
+        raise ValueError(f"Invalid character_ref: {character_ref}") from e
+
+
+def character_ref_filter(character_ref: str, server_id: str, player_id: str) -> Dict[str, Any]:
+    """Filter matching the referenced character only if it belongs to player_id on server_id"""
+    return {
+        "_id": decode_character_ref(character_ref),
+        "player.server_id": server_id,
+        "player.player_id": player_id,
+    }
@@ -0,0 +1,259 @@
+"""
+Index bootstrap and query-plan verification for the Veritas database.
+
+INDEX_SPECS declares the indexes every collection needs; `ensure_indexes` creates
+any that are missing (create_indexes is idempotent). QUERY_SHAPES lists every
+filter the DAOs and tools issue, and `verify_query_plans` explains each one and
+raises QueryPlanError if the winning plan falls back to a collection scan.
+
+Run as a migration with:
+    python -m mcp_server.Tools.Mechanics.indexes [--verify]
+"""
+import argparse
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid
+
+from .connection import mongo_registry
+from .derived_stats import EQUIPMENT_SLOTS, INVENTORY_SECTIONS, item_holder_filter
+
+logger = logging.getLogger(__name__)
+
+# Index names are referenced by code that needs to tell DuplicateKeyErrors apart
+CHARACTER_ACTIVE_INDEX = "player_active_lookup"
+CHARACTER_NAME_INDEX = "server_character_name_unique"
+CHARACTER_ACTIVE_UNIQUE_INDEX = "one_active_character_per_player"
+ITEM_NAME_INDEX = "item_name_lookup"
+ITEM_ID_INDEX = "item_id_unique"
+CHARACTER_SESSION_INDEX = "character_session_lookup"
+CHARACTER_ITEM_INDEX = "character_item_ids"
+SESSION_TTL_INDEX = "session_updated_ttl"
+
+# Backstop for the combat session reaper: MongoDB deletes sessions idle this long on its own.
+# Kept well above the reaper's cutoff so the reaper normally detaches characters first.
+SESSION_TTL_SECONDS = int(os.environ.get("COMBAT_SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+COMBAT_EVENT_INDEX = "combat_event_tail"
+
+# Collections that must exist as capped collections (name -> size in bytes)
+CAPPED_COLLECTIONS: Dict[str, int] = {
+    "combat_events": int(os.environ.get("COMBAT_EVENT_LOG_BYTES", str(256 * 1024 * 1024))),
+}
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "characters": [
+        IndexModel(
+            [("player.server_id", ASCENDING), ("player.player_id", ASCENDING), ("player.active", ASCENDING)],
+            name=CHARACTER_ACTIVE_INDEX,
+        ),
+        IndexModel(
+            [("player.server_id", ASCENDING), ("character.characters_name", ASCENDING)],
+            name=CHARACTER_NAME_INDEX,
+            unique=True,
+        ),
+        # At most one active character per player; lets creation decide the active flag in the write
+        IndexModel(
+            [("player.server_id", ASCENDING), ("player.player_id", ASCENDING)],
+            name=CHARACTER_ACTIVE_UNIQUE_INDEX,
+            unique=True,
+            partialFilterExpression={"player.active": True},
+        ),
+        # Only characters attached to a session are indexed, so the index stays tiny
+        IndexModel(
+            [("instances.session_id", ASCENDING)],
+            name=CHARACTER_SESSION_INDEX,
+            partialFilterExpression={"instances.session_id": {"$type": "objectId"}},
+        ),
+        # One wildcard index over the 13 embedded item_id paths; every branch of the
+        # "who holds this item" $or run by item edits is an index scan
+        IndexModel(
+            [("$**", ASCENDING)],
+            name=CHARACTER_ITEM_INDEX,
+            wildcardProjection={
+                **{f"equipped.{slot}.item_id": 1 for slot in EQUIPMENT_SLOTS},
+                **{f"inventory.{section}.item_id": 1 for section in INVENTORY_SECTIONS},
+            },
+        ),
+    ],
+    "sessions": [
+        # TTL index over combat instances only (parties share the collection); also serves the reaper's range scan
+        IndexModel(
+            [("meta.updated_at", ASCENDING)],
+            name=SESSION_TTL_INDEX,
+            expireAfterSeconds=SESSION_TTL_SECONDS,
+            partialFilterExpression={"instance": "combat"},
+        ),
+    ],
+    "combat_events": [
+        # Serves "last N events of a session" when a ring buffer is restored
+        IndexModel([("session_id", ASCENDING), ("seq", DESCENDING)], name=COMBAT_EVENT_INDEX),
+    ],
+    "items": [
+        IndexModel([("item_name", ASCENDING)], name=ITEM_NAME_INDEX),
+        IndexModel([("item_id", ASCENDING)], name=ITEM_ID_INDEX, unique=True, sparse=True),
+    ],
+}
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when a DAO query shape is not served by an index"""
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """A filter issued by the DAO layer; values are placeholders, only the keys matter"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+
+
+_SAMPLE_ID = ObjectId()
+_SAMPLE = "query-shape-check"
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("active_character", "characters",
+               {"player.server_id": _SAMPLE, "player.player_id": _SAMPLE, "player.active": True}),
+    QueryShape("character_by_name", "characters",
+               {"player.server_id": _SAMPLE, "character.characters_name": _SAMPLE}),
+    QueryShape("character_by_id", "characters",
+               {"player.server_id": _SAMPLE, "_id": _SAMPLE_ID}),
+    QueryShape("player_character_by_id", "characters",
+               {"player.player_id": _SAMPLE, "player.server_id": _SAMPLE, "_id": _SAMPLE_ID}),
+    QueryShape("player_character_by_name", "characters",
+               {"character.characters_name": _SAMPLE, "player.player_id": _SAMPLE, "player.server_id": _SAMPLE}),
+    QueryShape("player_characters", "characters",
+               {"player.server_id": _SAMPLE, "player.player_id": _SAMPLE}),
+    QueryShape("characters_by_ids", "characters",
+               {"player.server_id": _SAMPLE, "_id": {"$in": [_SAMPLE_ID]}}),
+    QueryShape("session_by_id", "sessions",
+               {"_id": _SAMPLE_ID, "players.server_id": _SAMPLE}),
+    QueryShape("expired_sessions", "sessions",
+               {"instance": "combat", "meta.updated_at": {"$lt": datetime.utcnow()}}),
+    QueryShape("characters_by_session", "characters",
+               {"instances.session_id": {"$in": [_SAMPLE_ID]}}),
+    QueryShape("item_holders", "characters",
+               item_holder_filter(_SAMPLE)),
+    QueryShape("combat_event_tail", "combat_events",
+               {"session_id": _SAMPLE}),
+    QueryShape("item_by_name", "items",
+               {"item_name": _SAMPLE}),
+]
+
+
+def ensure_indexes(db_name: Optional[str] = None) -> Dict[str, List[str]]:
+    """Create the capped collections and every index in INDEX_SPECS that does not exist yet"""
+    db = mongo_registry.get_database(db_name)
+    for collection_name in CAPPED_COLLECTIONS:
+        _ensure_capped(db, collection_name)
+    created: Dict[str, List[str]] = {}
+    for collection_name, models in INDEX_SPECS.items():
+        if not models:
+            continue
+        created[collection_name] = db[collection_name].create_indexes(models)
+        _ensured_collections.add((db_name, collection_name))
+        logger.info(f"Ensured indexes on {collection_name}: {', '.join(created[collection_name])}")
+    return created
+
+
+def _ensure_capped(db: Any, collection_name: str) -> None:
+    # An insert into a missing collection would create it uncapped, so create or convert it first
+    size = CAPPED_COLLECTIONS[collection_name]
+    if collection_name not in db.list_collection_names(filter={"name": collection_name}):
+        try:
+            db.create_collection(collection_name, capped=True, size=size)
+            logger.info(f"Created capped collection {collection_name} ({size} bytes)")
+            return
+        except CollectionInvalid:
+            # Created concurrently by another process
+            pass
+    if not db[collection_name].options().get("capped"):
+        db.command("convertToCapped", collection_name, size=size)
+        logger.warning(f"Converted {collection_name} to a capped collection ({size} bytes)")
+
+
+# Collections whose indexes this process has already ensured
+_ensured_collections: set = set()
+
+
+def ensure_collection_indexes(collection_name: str, db_name: Optional[str] = None) -> None:
+    """
+    Ensure one collection is set up (capped if listed in CAPPED_COLLECTIONS, with its
+    INDEX_SPECS) before code that depends on that writes to it.
+
+    Runs once per process and collection, so tools whose correctness rests on a unique
+    index or a capped collection do not depend on bootstrap_database having run first.
+    """
+    key = (db_name, collection_name)
+    if key in _ensured_collections:
+        return
+    db = mongo_registry.get_database(db_name)
+    if collection_name in CAPPED_COLLECTIONS:
+        _ensure_capped(db, collection_name)
+    models = INDEX_SPECS.get(collection_name)
+    if models:
+        db[collection_name].create_indexes(models)
+        logger.info(f"Ensured indexes on {collection_name} before first use")
+    _ensured_collections.add(key)
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Collect every 'stage' in an explain plan tree (classic and SBE layouts)"""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def verify_query_plans(db_name: Optional[str] = None, shapes: Optional[List[QueryShape]] = None) -> Dict[str, List[str]]:
+    """
+    Explain every query shape and fail loudly if any winning plan is a COLLSCAN.
+
+    Returns:
+        Mapping of shape name to the stages in its winning plan
+    """
+    db = mongo_registry.get_database(db_name)
+    plans: Dict[str, List[str]] = {}
+    failures: List[str] = []
+    for shape in shapes or QUERY_SHAPES:
+        explain = db[shape.collection].find(shape.filter).explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        plans[shape.name] = stages
+        if "COLLSCAN" in stages:
+            logger.error(f"Query shape '{shape.name}' on {shape.collection} uses a COLLSCAN: {shape.filter}")
+            failures.append(shape.name)
+    if failures:
+        raise QueryPlanError(f"Query shapes without index support: {', '.join(failures)}")
+    logger.info(f"Verified {len(plans)} query shapes, none use a COLLSCAN")
+    return plans
+
+
+def bootstrap_database(verify: Optional[bool] = None) -> None:
+    """
+    Startup hook: ensure indexes, then optionally verify query plans.
+    Verification defaults to the MONGO_VERIFY_QUERY_PLANS environment variable.
+    """
+    if verify is None:
+        verify = os.environ.get("MONGO_VERIFY_QUERY_PLANS", "").lower() in ["true", "1", "yes", "on"]
+    ensure_indexes()
+    if verify:
+        verify_query_plans()
+
+
+if __name__ == "__main__":
+    from config.logging_config import setup_logging
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Create Veritas indexes and verify DAO query plans")
+    parser.add_argument("--verify", action="store_true", help="explain every DAO query shape and fail on COLLSCAN")
+    args = parser.parse_args()
+    bootstrap_database(verify=args.verify)
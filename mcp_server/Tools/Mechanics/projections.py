@@ -0,0 +1,87 @@
+"""
+Named projections for character reads.
+
+Most sub-agents only need one slice of a character (stats for a stat check, the
+inventory for an inventory request). Passing a preset to get_character_tool or
+CharacterDAO.get_player sends the projection to MongoDB, so less BSON is decoded
+and far less JSON is fed back into the model context.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+# Every preset keeps the name and owner so results stay identifiable
+_IDENTITY = {"character.characters_name": 1, "player": 1}
+
+CHARACTER_PROJECTIONS: Dict[str, Dict[str, int]] = {
+    "stats": {
+        **_IDENTITY,
+        "character.class_name": 1,
+        "character.level": 1,
+        "character.experience": 1,
+        "character.experience_to_next_level": 1,
+        "stats": 1,
+    },
+    "combat": {
+        **_IDENTITY,
+        "character.level": 1,
+        "stats": 1,
+        "combat": 1,
+        "derived": 1,
+        "instances": 1,
+        "groups.party_id": 1,
+    },
+    "inventory": {
+        **_IDENTITY,
+        "inventory": 1,
+        "equipped": 1,
+        "derived": 1,
+        "stats": 1,
+        "combat.damage": 1,
+        "combat.defense": 1,
+    },
+    "profile": {
+        **_IDENTITY,
+        "character": 1,
+        "groups": 1,
+    },
+}
+
+ProjectionSpec = Optional[Union[str, List[str], Dict[str, int]]]
+
+
+def resolve_projection(projection: ProjectionSpec) -> Optional[Dict[str, int]]:
+    """
+    Turn a preset name, list of field paths or projection dict into a MongoDB projection.
+    None, "" and "full" mean the whole document.
+    """
+    if not projection or projection == "full":
+        return None
+    if isinstance(projection, str):
+        if projection not in CHARACTER_PROJECTIONS:
+            raise ValueError(f"Unknown projection: {projection}. Available projections: full, {', '.join(CHARACTER_PROJECTIONS)}")
+        return CHARACTER_PROJECTIONS[projection]
+    if isinstance(projection, list):
+        return {**_IDENTITY, **{field: 1 for field in projection}}
+    if isinstance(projection, dict):
+        return projection
+    raise ValueError(f"Unsupported projection type: {type(projection).__name__}")
+
+
+def apply_projection(document: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Apply an inclusion projection to an already loaded document (e.g. a cached one)"""
+    if not projection:
+        return document
+    projected: Dict[str, Any] = {"_id": document.get("_id")}
+    for path in projection:
+        parts = path.split(".")
+        # Resolve the whole source path first; like MongoDB, a missing path adds no empty parents
+        source: Any = document
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source
+    return projected
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the repository root importable, as test_logging.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,34 @@
+"""Character references and in-process projections."""
+import pytest
+from bson import ObjectId
+
+from mcp_server.Tools.Mechanics.handles import CHARACTER_REF_PREFIX, character_ref_filter, decode_character_ref, encode_character_ref
+from mcp_server.Tools.Mechanics.projections import apply_projection
+
+
+def test_ref_round_trip():
+    character_id = ObjectId()
+    ref = encode_character_ref(character_id)
+    assert ref.startswith(CHARACTER_REF_PREFIX) and len(ref) == 20
+    assert decode_character_ref(ref) == character_id
+    assert encode_character_ref(str(character_id)) == ref
+
+
+@pytest.mark.parametrize("bad", ["", None, str(ObjectId()), "chr_", "chr_not-base64!!", "xyz_" + "A" * 16])
+def test_decode_rejects_anything_but_refs(bad):
+    with pytest.raises(ValueError):
+        decode_character_ref(bad)
+
+
+def test_ref_filter_is_scoped_to_the_owner():
+    character_id = ObjectId()
+    assert character_ref_filter(encode_character_ref(character_id), "server", "player") == {
+        "_id": character_id, "player.server_id": "server", "player.player_id": "player",
+    }
+
+
+def test_projection_matches_mongodb_for_missing_paths():
+    document = {"_id": 1, "combat": {"damage": 3}, "stats": {"hp": 5}}
+    projected = apply_projection(document, {"combat.missing.deep": 1, "stats.hp": 1, "nope": 1})
+    assert projected == {"_id": 1, "stats": {"hp": 5}}
+    assert apply_projection(document, None) is document
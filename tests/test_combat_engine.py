@@ -0,0 +1,51 @@
+"""Vectorized round resolution: target picking and simultaneous attacks."""
+import numpy as np
+
+from mcp_server.Tools.Combat.engine import AUTO_TARGET, SIDE_MOB, SIDE_PLAYER, pick_targets, resolve_attacks
+
+
+def test_pick_targets_only_picks_living_enemies():
+    hp = np.array([10, 10, 0, 10, 10])
+    side = np.array([SIDE_PLAYER, SIDE_PLAYER, SIDE_MOB, SIDE_MOB, SIDE_MOB], dtype=np.int8)
+    chosen = pick_targets(hp, side, np.random.default_rng(1))
+    assert chosen[2] == -1
+    assert set(chosen[:2]) <= {3, 4}
+    assert set(chosen[3:]) <= {0, 1}
+
+
+def test_pick_targets_keeps_valid_explicit_targets_and_replaces_invalid_ones():
+    hp = np.array([10, 10, 10, 0])
+    side = np.array([SIDE_PLAYER, SIDE_PLAYER, SIDE_MOB, SIDE_MOB], dtype=np.int8)
+    # 0 -> living enemy (kept), 1 -> friendly (replaced), 2 -> dead slot (attacker alive, replaced)
+    explicit = np.array([2, 0, 3, AUTO_TARGET])
+    chosen = pick_targets(hp, side, np.random.default_rng(0), explicit)
+    assert chosen.tolist() == [2, 2, chosen[2], -1]
+    assert chosen[2] in (0, 1)
+
+
+def test_pick_targets_without_enemies():
+    hp = np.array([10, 10])
+    side = np.array([SIDE_PLAYER, SIDE_PLAYER], dtype=np.int8)
+    assert pick_targets(hp, side, np.random.default_rng(0)).tolist() == [-1, -1]
+
+
+def test_resolve_attacks_sums_damage_per_target_and_floors_hp():
+    hp = np.array([100, 100, 5])
+    damage = np.array([20.0, 20.0, 1.0])
+    defense = np.zeros(3)
+    # Very fast attackers always hit (hit chance is clipped to the maximum)
+    speed = np.array([1000.0, 1000.0, 0.0])
+    targets = np.array([2, 2, -1])
+    result = resolve_attacks(hp, damage, defense, speed, targets, np.random.default_rng(3))
+    assert result.targets.tolist() == [2, 2, -1]
+    assert result.dealt[2] == 0 and not result.hits[2]
+    assert result.hp[2] == max(0, 5 - int(result.dealt[result.hits].sum()))
+    assert result.hp[:2].tolist() == [100, 100]
+
+
+def test_resolve_attacks_is_deterministic_for_a_seed():
+    args = (np.array([50, 50]), np.array([8.0, 8.0]), np.array([2.0, 2.0]), np.array([5.0, 5.0]), np.array([1, 0]))
+    first = resolve_attacks(*args, np.random.default_rng(42))
+    second = resolve_attacks(*args, np.random.default_rng(42))
+    assert first.hp.tolist() == second.hp.tolist()
+    assert first.dealt.tolist() == second.dealt.tolist()
@@ -0,0 +1,47 @@
+"""Rule-based parsing of combat requests."""
+from mcp_server.Tools.Combat.rules import parse_action
+from mcp_server.Tools.Combat.state import Combatant
+
+
+def combatants():
+    return [
+        Combatant("p1", "Hero", "player", max_hp=30, hp=30, damage=5, defense=5, speed=5),
+        Combatant.from_mob("m1", "Cave Goblin"),
+        Combatant.from_mob("m2", "Skeleton Archer"),
+    ]
+
+
+def test_attack_with_exact_target_and_skill_is_confident():
+    parsed = parse_action("attack the skeleton archer with fireball", combatants())
+    assert parsed.action == "attack"
+    assert parsed.target == "m2"
+    assert parsed.skill == "fireball"
+    assert parsed.confident
+
+
+def test_partial_target_name_resolves_to_the_unique_match():
+    parsed = parse_action("hit goblin", combatants())
+    assert parsed.target == "m1"
+    assert parsed.confident
+
+
+def test_use_with_item_word_becomes_use_item():
+    parsed = parse_action("use healing potion")
+    assert parsed.action == "use_item"
+    assert parsed.item == "healing potion"
+
+
+def test_hedged_or_compound_requests_fall_through():
+    assert not parse_action("should i attack the goblin?", combatants()).confident
+    assert not parse_action("attack the goblin then flee", combatants()).confident
+
+
+def test_ambiguous_target_is_not_confident():
+    mobs = combatants() + [Combatant.from_mob("m3", "Forest Goblin")]
+    parsed = parse_action("attack goblin", mobs)
+    assert not parsed.confident
+
+
+def test_unknown_verb_or_empty_input():
+    assert parse_action("").action is None
+    assert parse_action("dance wildly").action is None
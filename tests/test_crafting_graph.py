@@ -0,0 +1,61 @@
+"""Crafting graph: topological order, raw-material expansion and the craftable set."""
+from mcp_server.Tools.Item.crafting import CraftingGraph, CraftingIndex
+
+
+ITEMS = [
+    {"item_id": "ore", "item_name": "Iron Ore", "server_id": "s"},
+    {"item_id": "wood", "item_name": "Wood", "server_id": "s"},
+    {"item_id": "bar", "item_name": "Iron Bar", "server_id": "s", "recipe": {"ingredients": {"Iron Ore": 2}}},
+    {"item_id": "sword", "item_name": "Sword", "server_id": "s", "recipe": {"bar": 2, "wood": 1}},
+    {"item_id": "hat", "item_name": "Hat", "server_id": "s"},
+]
+
+
+def inventory(**counts):
+    return {"cratable": [{"item_id": item_id, "quantity": quantity} for item_id, quantity in counts.items()]}
+
+
+def test_recipes_are_ordered_ingredients_first():
+    graph = CraftingGraph(ITEMS)
+    assert graph.recipes.index("bar") < graph.recipes.index("sword")
+
+
+def test_raw_materials_expand_intermediates():
+    recipe = CraftingGraph(ITEMS).recipe("sword")
+    assert recipe["ingredients"] == {"Iron Bar": 2, "Wood": 1}
+    assert recipe["raw_materials"] == {"Iron Ore": 4, "Wood": 1}
+
+
+def test_craftable_now_with_intermediates_and_almost():
+    graph = CraftingGraph(ITEMS)
+    result = graph.craftable(graph.counts(inventory(ore=4, wood=1)), "s")
+    assert [(e["item_id"], e["times"]) for e in result["now"]] == [("bar", 2)]
+    assert [(e["item_id"], e["times"]) for e in result["with_intermediates"]] == [("sword", 1)]
+
+    result = graph.craftable(graph.counts(inventory(bar=1, wood=1)), "s")
+    almost = {e["item_id"]: e["missing"] for e in result["almost"]}
+    assert almost == {"bar": {"Iron Ore": 2}, "sword": {"Iron Bar": 1}}
+
+
+def test_craftable_is_scoped_to_the_server():
+    graph = CraftingGraph(ITEMS)
+    assert graph.craftable(graph.counts(inventory(ore=4)), "other")["now"] == []
+
+
+def test_recipe_cycles_are_dropped():
+    items = [
+        {"item_id": "a", "item_name": "A", "recipe": {"b": 1}},
+        {"item_id": "b", "item_name": "B", "recipe": {"a": 1}},
+        {"item_id": "c", "item_name": "C", "recipe": {"ore": 1}},
+        {"item_id": "ore", "item_name": "Ore"},
+    ]
+    assert CraftingGraph(items).recipes == ["c"]
+
+
+def test_only_relevant_catalog_changes_invalidate_the_graph():
+    graph = CraftingGraph(ITEMS)
+    assert not CraftingIndex._affects(graph, "upsert", {"item_id": "hat", "item_name": "Big Hat", "server_id": "s"})
+    assert not CraftingIndex._affects(graph, "remove", "hat")
+    assert CraftingIndex._affects(graph, "upsert", {"item_id": "wood", "item_name": "Oak", "server_id": "s"})
+    assert CraftingIndex._affects(graph, "upsert", {"item_id": "ore2", "item_name": "iron ore", "server_id": "s"})
+    assert CraftingIndex._affects(graph, "remove", "sword")
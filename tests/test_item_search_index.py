@@ -0,0 +1,44 @@
+"""BM25 item search: ranking, stemming, server scoping and incremental updates."""
+from mcp_server.Tools.Item.search_index import ItemSearchIndex, tokenize
+
+
+def build():
+    index = ItemSearchIndex()
+    index.load([
+        {"item_id": "cloak", "item_name": "Ember Cloak", "server_id": "s", "effects": {"fire_resistance": 10}},
+        {"item_id": "ring", "item_name": "Plain Ring", "server_id": "s", "description": "Offers slight resistance to fire."},
+        {"item_id": "axe", "item_name": "Frost Axe", "server_id": "s", "effects": {"damage": 7}},
+        {"item_id": "other", "item_name": "Fire Charm", "server_id": "t", "effects": {"fire_resistance": 5}},
+    ])
+    return index
+
+
+def test_tokenize_drops_stopwords_and_stems():
+    assert tokenize("The Fire_Resistance of resistant items") == ["fire", "resist", "resist", "item"]
+
+
+def test_field_weighted_ranking():
+    ids = [item_id for item_id, _ in build().search("fire resistance", server_id="s")]
+    # The effect match outweighs a mention in the description
+    assert ids == ["cloak", "ring"]
+
+
+def test_server_scoping_and_unknown_terms():
+    index = build()
+    assert [item_id for item_id, _ in index.search("fire", server_id="t")] == ["other"]
+    assert index.search("dragon") == []
+    assert index.search("fire", server_id="missing") == []
+
+
+def test_upsert_and_remove_update_postings():
+    index = build()
+    index.upsert({"item_id": "axe", "item_name": "Fire Axe", "server_id": "s"})
+    assert "axe" in [item_id for item_id, _ in index.search("fire", server_id="s")]
+    assert index.search("frost") == []
+    index.remove("cloak")
+    assert "cloak" not in [item_id for item_id, _ in index.search("fire")]
+    assert len(index) == 3
+
+
+def test_limit():
+    assert len(build().search("fire", limit=1)) == 1
@@ -0,0 +1,79 @@
+"""Speed-based turn order, round counting and timer-wheel expiry."""
+import numpy as np
+
+from mcp_server.Tools.Combat.scheduler import TURN_BASE_TIME, TurnScheduler
+from mcp_server.Tools.Combat.state import Combatant, CombatStateStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_faster_combatants_act_more_often():
+    scheduler = TurnScheduler()
+    scheduler.register("s", {"fast": 10, "slow": 5})
+    turns = [scheduler.next_turn("s") for _ in range(6)]
+    assert turns[0] == "fast"
+    assert turns.count("fast") == 4 and turns.count("slow") == 2
+
+
+def test_peek_does_not_advance():
+    scheduler = TurnScheduler()
+    scheduler.register("s", {"a": 10, "b": 5})
+    upcoming = scheduler.peek("s", 3)
+    assert [scheduler.next_turn("s") for _ in range(3)] == upcoming
+
+
+def test_removed_combatants_are_skipped():
+    scheduler = TurnScheduler()
+    scheduler.register("s", {"a": 5, "b": 5})
+    scheduler.remove_combatant("s", "a")
+    assert {scheduler.next_turn("s") for _ in range(4)} == {"b"}
+
+
+def test_round_follows_the_clock_and_start_round():
+    scheduler = TurnScheduler()
+    scheduler.register("s", {"a": 5, "b": 5})
+    # Speed 5 acts five times per TURN_BASE_TIME, so ten turns are one round
+    for _ in range(10):
+        scheduler.next_turn("s")
+    assert scheduler.round("s") == 1
+    scheduler.next_turn("s")
+    assert scheduler.round("s") == 2
+    scheduler.start_round("s")
+    assert scheduler.clock("s") == 2 * TURN_BASE_TIME
+    scheduler.next_turn("s")
+    assert scheduler.round("s") == 3
+
+
+def test_idle_sessions_expire_once():
+    clock = FakeClock()
+    scheduler = TurnScheduler(idle_timeout=30, tick_seconds=5, wheel_size=8, clock=clock)
+    expired = []
+    scheduler.on_expire(expired.append)
+    scheduler.register("idle", {"a": 5})
+    scheduler.register("busy", {"a": 5})
+    for _ in range(10):
+        clock.now += 5
+        scheduler.touch("busy")
+    assert expired == ["idle"]
+    assert "idle" not in scheduler and "busy" in scheduler
+
+
+def test_end_turns_and_resolved_rounds_agree_on_the_round():
+    store = CombatStateStore(scheduler=TurnScheduler())
+    player = Combatant("p", "Hero", "player", max_hp=10 ** 6, hp=10 ** 6, damage=1, defense=0, speed=5)
+    mob = Combatant("m", "Rat", "mob", max_hp=10 ** 6, hp=10 ** 6, damage=1, defense=0, speed=5)
+    state = store.create("s", "server", [player, mob])
+    for _ in range(6):
+        store.apply_action("s", {"type": "end_turn"})
+    assert state.round == store.scheduler.round("s") == 1
+    result = store.resolve_round("s", rng=np.random.default_rng(0))
+    assert result["round"] == 1
+    assert state.round == store.scheduler.round("s") == 2
+    store.apply_action("s", {"type": "end_turn"})
+    assert state.round == 2